@@ -1,28 +1,45 @@
 import asyncio
 import os
-import tempfile
+import sys
 import uuid
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import timedelta
 from pathlib import Path
 
 from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
 from pydantic import BaseModel, Field
 
+from backend import metrics
+from backend.session_store import (
+    SessionStore,
+    StoredSession,
+    session_store_from_env,
+    utc_now,
+)
 from backend.utils import ASRMethod, audio_chat_generator
+from campus_plan_bot import tracing
 from campus_plan_bot.interfaces.interfaces import LLMClient, LLMRequestConfig
 from campus_plan_bot.llm_client import InstituteClient
 from campus_plan_bot.pipeline import Pipeline
 from campus_plan_bot.rag import RAG
 from campus_plan_bot.translator import Translator
+from campus_plan_bot.warmup import BackgroundLoader, ProgressCallback
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    tracing.configure_from_env()
+    # Load the models without blocking the startup
+    rag_loader.start()
     # Start background janitor task
     asyncio.create_task(launch_session_janitor())
     yield
@@ -45,49 +62,124 @@ app.mount("/frontend", StaticFiles(directory="frontend"), name="frontend")
 
 database_path = Path("data") / "campusplan_evaluation.csv"
 embeddings_path = Path("data") / "embeddings"
-# We will create a new bot instance for each session
-# but we can pre-load the RAG component to save time.
-rag_component = RAG.from_file(database_path, persist_dir=embeddings_path)
-
-# In-memory storage for bot sessions
 
 
-@dataclass
-class SessionData:
-    pipeline: Pipeline
-    last_used: datetime = field(default_factory=datetime.utcnow)
+# We will create a new bot instance for each session
+# but we can pre-load the RAG component to save time.
+def _load_rag(progress: ProgressCallback) -> RAG:
+    progress("index")
+    rag = RAG.from_file(database_path, persist_dir=embeddings_path)
+    if rag.embedding_cache is not None:
+        metrics.register_cache("query_embedding", rag.embedding_cache)
+    if rag.result_cache is not None:
+        metrics.register_cache("retrieval_result", rag.result_cache)
+    if rag.pair_score_cache is not None:
+        metrics.register_cache("rerank_pair_score", rag.pair_score_cache)
+    progress("reranker")
+    rag.reranker  # loads the cross encoder
+    progress("warm-up")
+    rag.warm_up()
+    return rag
+
+
+rag_loader = BackgroundLoader("RAG", _load_rag)
+
+
+def _require_ready() -> None:
+    if not rag_loader.ready:
+        raise HTTPException(
+            status_code=503,
+            detail="The models are still loading.",
+            headers={"Retry-After": "5"},
+        )
 
 
 # Maximum idle time before a session is cleaned up
 SESSION_TTL = timedelta(hours=1)
-# How often the janitor checks for stale sessions (in seconds)
+# Longest time the janitor sleeps when no session is about to expire
 SWEEP_PERIOD_SECONDS = 10 * 60
+# Upper bound of stored sessions, the least recently used one is evicted first
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+# How many pipelines a worker keeps around for the sessions it served
+MAX_CACHED_PIPELINES = 256
+
+# The sessions are kept in the configured store, every worker builds the
+# pipelines of the sessions it serves from their configuration.
+session_store: SessionStore = session_store_from_env(SESSION_TTL, MAX_SESSIONS)
+pipelines: OrderedDict[str, Pipeline] = OrderedDict()
+
+tracing.add_span_listener(metrics.observe_span)
+metrics.ACTIVE_SESSIONS.set_function(lambda: len(session_store))
+metrics.register_queue(
+    "speculation",
+    lambda: sum(
+        1
+        for pipeline in list(pipelines.values())
+        if pipeline.speculation is not None and not pipeline.speculation.task.done()
+    ),
+)
+
+
+def _whisper_queue_depth() -> int:
+    # local ASR is imported on first use only, before that there is no queue
+    local_asr = sys.modules.get("campus_plan_bot.input.local_asr")
+    return local_asr.WhisperService.total_queue_depth() if local_asr else 0
+
+
+metrics.register_queue("whisper", _whisper_queue_depth)
+
+
+def _load_session(session_id: str) -> tuple[StoredSession, Pipeline]:
+    """Fetch a session from the store together with a pipeline that holds
+    its conversation."""
+    _require_ready()
+    session = session_store.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+    session.last_used = utc_now()
+    _put_session(session_id, session)
+
+    pipeline = pipelines.pop(session_id, None) or _build_pipeline(
+        StartRequest(**session.config)
+    )
+    pipelines[session_id] = pipeline
+    while len(pipelines) > MAX_CACHED_PIPELINES:
+        pipelines.popitem(last=False)
+
+    # another worker may have continued the conversation in the meantime
+    pipeline.bot.conversation_history = session.conversation
+    return session, pipeline
+
 
-pipeline_sessions: dict[str, SessionData] = {}
+def _put_session(session_id: str, session: StoredSession) -> None:
+    """Store a session, dropping the sessions evicted to make room."""
+    evicted = session_store.put(session_id, session)
+    for sid in evicted:
+        logger.warning(f"Session {sid} evicted (more than {MAX_SESSIONS} sessions).")
+        pipelines.pop(sid, None)
+    metrics.SESSION_EVICTIONS.labels("capacity").inc(len(evicted))
 
 
-def _touch(session_id: str) -> None:
-    """Refresh last-use timestamp for the given session, if it exists."""
-    session = pipeline_sessions.get(session_id)
-    if session:
-        session.last_used = datetime.utcnow()
+def _seconds_until_next_expiry() -> float:
+    oldest_use = session_store.oldest_use()
+    if oldest_use is None:
+        return SWEEP_PERIOD_SECONDS
+    deadline = oldest_use + SESSION_TTL - utc_now()
+    return min(SWEEP_PERIOD_SECONDS, max(1.0, deadline.total_seconds()))
 
 
 async def launch_session_janitor() -> None:
-    """Background task that removes stale sessions periodically."""
+    """Background task that removes sessions as soon as they are idle for
+    longer than SESSION_TTL."""
 
     async def janitor() -> None:
         while True:
-            await asyncio.sleep(SWEEP_PERIOD_SECONDS)
-            now = datetime.utcnow()
-            expired = [
-                sid
-                for sid, sess in list(pipeline_sessions.items())
-                if now - sess.last_used > SESSION_TTL
-            ]
+            await asyncio.sleep(_seconds_until_next_expiry())
+            expired = session_store.expire(utc_now() - SESSION_TTL)
             for sid in expired:
                 logger.info(f"Session {sid} expired (idle > {SESSION_TTL}). Removing.")
-                del pipeline_sessions[sid]
+                pipelines.pop(sid, None)
+            metrics.SESSION_EVICTIONS.labels("idle").inc(len(expired))
 
     asyncio.create_task(janitor())
 
@@ -134,11 +226,7 @@ class TranslationResponse(BaseModel):
 translator = Translator()
 
 
-@app.post("/start", response_model=StartResponse)
-def start_session(request: StartRequest):
-    """Starts a new chat session and returns a unique session ID."""
-    session_id = str(uuid.uuid4())
-
+def _build_pipeline(request: StartRequest) -> Pipeline:
     llm_config = LLMRequestConfig(
         temperature=request.temperature,
         max_new_tokens=request.max_new_tokens,
@@ -152,28 +240,38 @@ def start_session(request: StartRequest):
     else:
         raise HTTPException(status_code=400, detail="Invalid model name.")
 
-    pipeline_sessions[session_id] = SessionData(
-        pipeline=Pipeline.from_system_prompt(
-            rag=rag_component,
-            llm_client=llm_client,
-            user_coords_str=request.user_coords_str,
-            allow_complex_mode=(
-                request.allow_complex_mode if GLOBAL_ALLOW_COMPLEX_MODE else False
-            ),
-        )
+    return Pipeline.from_system_prompt(
+        rag=rag_loader.result(),
+        llm_client=llm_client,
+        user_coords_str=request.user_coords_str,
+        allow_complex_mode=(
+            request.allow_complex_mode if GLOBAL_ALLOW_COMPLEX_MODE else False
+        ),
     )
+
+
+@app.post("/start", response_model=StartResponse)
+def start_session(request: StartRequest):
+    """Starts a new chat session and returns a unique session ID."""
+    _require_ready()
+    session_id = str(uuid.uuid4())
+    pipeline = _build_pipeline(request)
+    session = StoredSession(
+        config=request.model_dump(), conversation=pipeline.bot.conversation_history
+    )
+    pipelines[session_id] = pipeline
+    _put_session(session_id, session)
     return StartResponse(session_id=session_id)
 
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Chat with the bot using a session ID."""
-    session = pipeline_sessions.get(request.session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found.")
-    _touch(request.session_id)
+    session, pipeline = _load_session(request.session_id)
 
-    response = await session.pipeline.run(request.query)
+    with tracing.session(request.session_id), tracing.span("backend.chat"):
+        response = await pipeline.run(request.query)
+    _put_session(request.session_id, session)
     return ChatResponse(response=response.answer, link=response.link)
 
 
@@ -198,43 +296,54 @@ async def chat_audio(
 ):
     """Chat with the bot using an audio recording, streaming transcript and
     final response."""
-    session = pipeline_sessions.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found.")
-    _touch(session_id)
+    session, pipeline = _load_session(session_id)
 
     # The UploadFile must be read here, before the function returns
     # and the file handle is closed by FastAPI.
-    fd_in, tmp_in_path = tempfile.mkstemp()
-    os.close(fd_in)
     try:
-        with open(tmp_in_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        content = await file.read()
     finally:
         await file.close()
 
     async def sse_generator():
-        # The generator must clean up the temporary file when it's done.
+        # the response is streamed from its own task, so the session stays
+        # bound to the spans of this request only
+        # the session is stored even if the client disconnects mid-turn, as
+        # the pipeline may already have recorded the turn in its history
         try:
-            async for data in audio_chat_generator(
-                session.pipeline, ASRMethod.REMOTE, tmp_in_path
-            ):
-                if await request.is_disconnected():
-                    logger.warning("Client disconnected.")
-                    break
-                yield f"data: {data}\n\n"
+            with tracing.session(session_id):
+                async for data in audio_chat_generator(
+                    pipeline, ASRMethod.REMOTE, content
+                ):
+                    if await request.is_disconnected():
+                        logger.warning("Client disconnected.")
+                        break
+                    yield f"data: {data}\n\n"
         finally:
-            os.remove(tmp_in_path)
+            pipeline.cancel_speculation()
+            _put_session(session_id, session)
 
     return StreamingResponse(sse_generator(), media_type="text/event-stream")
 
 
+@app.get("/ready")
+def ready():
+    """Readiness probe, reporting the progress of loading the models."""
+    status = rag_loader.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Operational metrics in the Prometheus text format."""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.post("/end")
 def end_session(session_id: str):
     """Ends a chat session and cleans up resources."""
-    if session_id in pipeline_sessions:
-        del pipeline_sessions[session_id]
+    pipelines.pop(session_id, None)
+    if session_store.delete(session_id):
         return {"message": f"Session {session_id} ended."}
     else:
         raise HTTPException(status_code=404, detail="Session not found.")
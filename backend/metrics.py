@@ -0,0 +1,184 @@
+"""Prometheus metrics of the backend, served under `/metrics`.
+
+Latencies are not measured here but taken from the finished tracing spans
+(see campus_plan_bot/tracing.py), so metrics and traces always agree.
+Gauges that describe the current state (sessions, queues) are computed
+when the metrics are scraped.
+"""
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import Protocol
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from campus_plan_bot.tracing import Span
+
+__all__ = ["CONTENT_TYPE_LATEST", "render"]
+
+STAGE_PREFIXES = ("backend.", "pipeline.", "rag.", "translator.")
+
+# the span that is open when the LLM is called identifies the component
+LLM_COMPONENTS = {
+    "pipeline.asr_fix": "asr_fix",
+    "pipeline.rephrase": "rephraser",
+    "pipeline.route": "router",
+    "pipeline.data_picker": "picker",
+    "pipeline.generate": "bot",
+    "translator.translate": "translator",
+}
+
+STAGE_DURATION = Histogram(
+    "campus_plan_bot_stage_duration_seconds",
+    "Duration of the pipeline stages and retrieval steps.",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+STAGE_ERRORS = Counter(
+    "campus_plan_bot_stage_errors_total",
+    "Pipeline stages that raised an exception.",
+    ["stage"],
+)
+LLM_DURATION = Histogram(
+    "campus_plan_bot_llm_request_duration_seconds",
+    "Duration of the LLM requests per calling component.",
+    ["component"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_ERRORS = Counter(
+    "campus_plan_bot_llm_request_errors_total",
+    "Failed LLM requests per calling component.",
+    ["component"],
+)
+LLM_TOKENS = Counter(
+    "campus_plan_bot_llm_tokens_total",
+    "Estimated prompt and completion tokens per calling component.",
+    ["component", "kind"],
+)
+RERANK_BATCH_SIZE = Histogram(
+    "campus_plan_bot_rerank_batch_size",
+    "Number of candidates scored by the cross encoder per query.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+RERANK_CANDIDATES = Counter(
+    "campus_plan_bot_rerank_candidates_total",
+    "Rerank candidates that were scored by the cross encoder or skipped by "
+    "the adaptive reranking.",
+    ["outcome"],
+)
+ACTIVE_SESSIONS = Gauge("campus_plan_bot_active_sessions", "Number of stored sessions.")
+SESSION_EVICTIONS = Counter(
+    "campus_plan_bot_session_evictions_total",
+    "Sessions removed for being idle too long or to stay within MAX_SESSIONS.",
+    ["reason"],
+)
+QUEUE_DEPTH = Gauge(
+    "campus_plan_bot_queue_depth", "Number of items waiting in a queue.", ["queue"]
+)
+
+
+def observe_span(span: Span) -> None:
+    """Span listener that turns finished spans into metrics."""
+    if span.name == "llm.generate":
+        component = LLM_COMPONENTS.get(span.attributes.get("llm.component"), "other")
+        LLM_DURATION.labels(component).observe(span.duration)
+        if span.error:
+            LLM_ERRORS.labels(component).inc()
+        for kind in ("prompt", "completion"):
+            if tokens := span.attributes.get(f"llm.{kind}_tokens"):
+                LLM_TOKENS.labels(component, kind).inc(tokens)
+        return
+
+    if not span.name.startswith(STAGE_PREFIXES):
+        return
+    STAGE_DURATION.labels(span.name).observe(span.duration)
+    if span.error:
+        STAGE_ERRORS.labels(span.name).inc()
+    if span.name == "rag.rerank" and "scored" in span.attributes:
+        candidates, scored = span.attributes["candidates"], span.attributes["scored"]
+        RERANK_BATCH_SIZE.observe(scored)
+        RERANK_CANDIDATES.labels("scored").inc(scored)
+        RERANK_CANDIDATES.labels("skipped").inc(candidates - scored)
+    if "speculation.hit" in span.attributes:
+        SPECULATION.record(span.attributes["speculation.hit"])
+    if "asr_fix.local" in span.attributes:
+        LOCAL_ASR_FIX.record(span.attributes["asr_fix.local"])
+
+
+class CacheStats(Protocol):
+    hits: int
+    misses: int
+
+
+@dataclass
+class HitCounter:
+    """Hit statistics of something that is not a cache object itself."""
+
+    hits: int = 0
+    misses: int = 0
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+
+class CacheCollector(Collector):
+    """Reports the hit and miss counters of the registered caches."""
+
+    def __init__(self) -> None:
+        self.caches: dict[str, CacheStats] = {}
+
+    def collect(self) -> Iterator[CounterMetricFamily | GaugeMetricFamily]:
+        hits = CounterMetricFamily(
+            "campus_plan_bot_cache_hits", "Cache lookups that hit.", labels=["cache"]
+        )
+        misses = CounterMetricFamily(
+            "campus_plan_bot_cache_misses",
+            "Cache lookups that missed.",
+            labels=["cache"],
+        )
+        ratio = GaugeMetricFamily(
+            "campus_plan_bot_cache_hit_ratio",
+            "Share of cache lookups that hit since the start.",
+            labels=["cache"],
+        )
+        for name, cache in self.caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            lookups = cache.hits + cache.misses
+            ratio.add_metric([name], cache.hits / lookups if lookups else 0.0)
+        yield from (hits, misses, ratio)
+
+
+SPECULATION = HitCounter()
+# a hit is an ASR fix without the LLM
+LOCAL_ASR_FIX = HitCounter()
+CACHES = CacheCollector()
+CACHES.caches["speculation"] = SPECULATION
+CACHES.caches["local_asr_fix"] = LOCAL_ASR_FIX
+REGISTRY.register(CACHES)
+
+
+def register_cache(name: str, cache: CacheStats) -> None:
+    """Export the hit ratio of a cache with `hits` and `misses` counters."""
+    CACHES.caches[name] = cache
+
+
+def register_queue(name: str, depth: Callable[[], float]) -> None:
+    """Export the depth of a queue, computed on every scrape."""
+    QUEUE_DEPTH.labels(name).set_function(depth)
+
+
+def render() -> bytes:
+    return generate_latest(REGISTRY)
@@ -0,0 +1,298 @@
+"""Storage of the chat sessions of the backend.
+
+A session consists of the configuration it was started with and the
+conversation so far. Pipelines are rebuilt from the configuration by each
+worker, so with an external store (SQLite file shared by the workers of a
+host, or Redis shared by several hosts) any worker can serve any session.
+Select the store with the `SESSION_STORE` environment variable:
+
+- `memory` (default): sessions live in the worker process
+- `sqlite:///path/to/sessions.db`
+- `redis://host:6379/0` (needs the `redis` package)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Protocol
+
+from loguru import logger
+
+from campus_plan_bot.interfaces.persistence_types import Conversation
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def format_time(time: datetime) -> str:
+    """Serialize a time in UTC with a fixed width, so that the strings sort
+    like the times they represent."""
+    return time.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def parse_time(text: str) -> datetime:
+    time = datetime.fromisoformat(text)
+    # sessions stored before the times were timezone-aware are in UTC
+    return time if time.tzinfo else time.replace(tzinfo=timezone.utc)
+
+
+@dataclass
+class StoredSession:
+    config: dict[str, Any]
+    conversation: Conversation = field(default_factory=Conversation.new)
+    last_used: datetime = field(default_factory=utc_now)
+
+    def to_bytes(self) -> bytes:
+        """Serialize as compressed JSON."""
+        data = {
+            "config": self.config,
+            "conversation": self.conversation.to_dict(),
+            "last_used": format_time(self.last_used),
+        }
+        return zlib.compress(json.dumps(data, separators=(",", ":")).encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "StoredSession":
+        decoded = json.loads(zlib.decompress(data))
+        return cls(
+            config=decoded["config"],
+            conversation=Conversation.from_dict(decoded["conversation"]),
+            last_used=parse_time(decoded["last_used"]),
+        )
+
+
+class SessionStore(Protocol):
+    """Protocol for the storage of the chat sessions."""
+
+    def get(self, session_id: str) -> StoredSession | None: ...
+
+    def put(self, session_id: str, session: StoredSession) -> list[str]:
+        """Insert or update a session and return the IDs of the least
+        recently used sessions that were evicted to stay within capacity."""
+        ...
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session, returning whether it existed."""
+        ...
+
+    def expire(self, idle_since: datetime) -> list[str]:
+        """Remove the sessions that were not used since `idle_since` and
+        return their IDs."""
+        ...
+
+    def oldest_use(self) -> datetime | None:
+        """Last use of the session that will expire next, if it is known."""
+        ...
+
+    def __len__(self) -> int: ...
+
+
+class InMemorySessionStore:
+    """Keeps the sessions in the worker process, without serializing them.
+
+    Sessions are stored right after they were used, so the insertion order
+    is the order of their last use. Both expiring idle sessions and evicting
+    the least recently used one therefore only touch the removed sessions.
+    """
+
+    def __init__(self, max_sessions: int | None = None) -> None:
+        self.max_sessions = max_sessions
+        self.sessions: OrderedDict[str, StoredSession] = OrderedDict()
+
+    def get(self, session_id: str) -> StoredSession | None:
+        return self.sessions.get(session_id)
+
+    def put(self, session_id: str, session: StoredSession) -> list[str]:
+        self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        evicted = []
+        while self.max_sessions is not None and len(self.sessions) > self.max_sessions:
+            evicted.append(self.sessions.popitem(last=False)[0])
+        return evicted
+
+    def delete(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id, None) is not None
+
+    def expire(self, idle_since: datetime) -> list[str]:
+        expired = []
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_used >= idle_since:
+                break
+            del self.sessions[session_id]
+            expired.append(session_id)
+        return expired
+
+    def oldest_use(self) -> datetime | None:
+        if not self.sessions:
+            return None
+        return next(iter(self.sessions.values())).last_used
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+class SQLiteSessionStore:
+    """Stores the sessions in an SQLite database, which can be shared by
+    all workers on a host."""
+
+    def __init__(self, path: str | Path, max_sessions: int | None = None):
+        self.path = Path(path)
+        self.max_sessions = max_sessions
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        # write-ahead logging lets readers of other workers proceed while
+        # one of them writes
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, last_used TEXT NOT NULL, data BLOB NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)"
+        )
+
+    def get(self, session_id: str) -> StoredSession | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return StoredSession.from_bytes(row[0]) if row else None
+
+    def put(self, session_id: str, session: StoredSession) -> list[str]:
+        data = session.to_bytes()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sessions (id, last_used, data) "
+                "VALUES (?, ?, ?)",
+                (session_id, format_time(session.last_used), data),
+            )
+            if self.max_sessions is None:
+                return []
+            rows = self._connection.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?) RETURNING id",
+                (self.max_sessions,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM sessions WHERE id = ?", (session_id,)
+            )
+        return cursor.rowcount > 0
+
+    def expire(self, idle_since: datetime) -> list[str]:
+        with self._lock:
+            rows = self._connection.execute(
+                "DELETE FROM sessions WHERE last_used < ? RETURNING id",
+                (format_time(idle_since),),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def oldest_use(self) -> datetime | None:
+        with self._lock:
+            (oldest,) = self._connection.execute(
+                "SELECT MIN(last_used) FROM sessions"
+            ).fetchone()
+        return parse_time(oldest) if oldest else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM sessions"
+            ).fetchone()
+        return count
+
+
+class RedisSessionStore:
+    """Stores the sessions in Redis (or any server speaking its protocol),
+    which can be shared by several hosts.
+
+    Redis expires idle sessions by itself. A sorted set indexes the
+    sessions by their last use, so that counting them and finding the next
+    one to expire do not scan the keyspace; `expire` removes the expired
+    sessions from it. To bound its memory, configure Redis with
+    `maxmemory-policy allkeys-lru`.
+    """
+
+    def __init__(self, url: str, ttl: timedelta, prefix: str = "campus-plan-bot:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._index = prefix + "last-used"
+
+    def _key(self, session_id: str) -> str:
+        return self.prefix + session_id
+
+    def get(self, session_id: str) -> StoredSession | None:
+        data = self.client.get(self._key(session_id))
+        return StoredSession.from_bytes(data) if data else None
+
+    def put(self, session_id: str, session: StoredSession) -> list[str]:
+        with self.client.pipeline() as pipeline:
+            pipeline.set(self._key(session_id), session.to_bytes(), ex=self.ttl)
+            pipeline.zadd(self._index, {session_id: session.last_used.timestamp()})
+            pipeline.execute()
+        return []
+
+    def delete(self, session_id: str) -> bool:
+        with self.client.pipeline() as pipeline:
+            pipeline.delete(self._key(session_id))
+            pipeline.zrem(self._index, session_id)
+            deleted, _ = pipeline.execute()
+        return bool(deleted)
+
+    def expire(self, idle_since: datetime) -> list[str]:
+        # the transaction hands every expired session to one worker only
+        cutoff = f"({idle_since.timestamp()}"
+        with self.client.pipeline() as pipeline:
+            pipeline.zrangebyscore(self._index, "-inf", cutoff)
+            pipeline.zremrangebyscore(self._index, "-inf", cutoff)
+            expired, _ = pipeline.execute()
+        if expired:
+            self.client.delete(*(self._key(sid.decode()) for sid in expired))
+        return [sid.decode() for sid in expired]
+
+    def oldest_use(self) -> datetime | None:
+        oldest = self.client.zrange(self._index, 0, 0, withscores=True)
+        if not oldest:
+            return None
+        return datetime.fromtimestamp(oldest[0][1], timezone.utc)
+
+    def __len__(self) -> int:
+        # sessions Redis expired but the janitor did not remove yet are
+        # still indexed
+        return self.client.zcount(
+            self._index, (utc_now() - self.ttl).timestamp(), "+inf"
+        )
+
+
+def session_store_from_env(
+    ttl: timedelta, max_sessions: int | None = None
+) -> SessionStore:
+    """Create the session store configured by `SESSION_STORE`."""
+    url = os.getenv("SESSION_STORE", "memory")
+    if url == "memory":
+        return InMemorySessionStore(max_sessions)
+    if url.startswith("sqlite:///"):
+        logger.info(f"Storing sessions in {url}")
+        return SQLiteSessionStore(url.removeprefix("sqlite:///"), max_sessions)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        logger.info(f"Storing sessions in {url}")
+        return RedisSessionStore(url, ttl=ttl)
+    raise ValueError(f"Unsupported SESSION_STORE: {url}")
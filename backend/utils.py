@@ -1,81 +1,104 @@
 import asyncio
 import json
-import os
-import subprocess
-import tempfile
 from collections.abc import AsyncGenerator
 from enum import Enum
+from functools import partial
 
-from loguru import logger
-
-from campus_plan_bot.input.local_asr import LocalASR
 from campus_plan_bot.input.remote_asr import RemoteASR
-from campus_plan_bot.interfaces.interfaces import AutomaticSpeechRecognition
 from campus_plan_bot.pipeline import Pipeline
 
 
-def _convert_to_wav(input_path: str, output_path: str):
-    """Converts an audio file to WAV format using ffmpeg."""
-    command = [
-        "ffmpeg",
-        "-i",
-        input_path,
-        "-acodec",
-        "pcm_s16le",
-        "-ar",
-        "16000",
-        "-ac",
-        "1",
-        "-y",  # Overwrite output file if it exists
-        output_path,
-    ]
-    try:
-        subprocess.run(
-            command,
-            check=True,
-            capture_output=True,
-            text=True,
-        )
-    except FileNotFoundError:
-        logger.error("ffmpeg not found. Make sure it is installed and in your PATH.")
-        raise
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error converting audio file with ffmpeg: {e.stderr}")
-        raise
-
-
 class ASRMethod(str, Enum):
     LOCAL = "local"
     REMOTE = "remote"
 
 
 async def audio_chat_generator(
-    pipeline: Pipeline, asr_method: ASRMethod, input_path: str
+    pipeline: Pipeline, asr_method: ASRMethod, audio: bytes
 ) -> AsyncGenerator[str, None]:
-    """Generator that handles audio processing and yields SSE events."""
-    fd_out, tmp_out_path = tempfile.mkstemp(suffix=".wav")
-    os.close(fd_out)
+    """Generator that handles audio processing and yields SSE events.
 
-    try:
-        _convert_to_wav(input_path, tmp_out_path)
+    The uploaded audio is piped into a single ffmpeg process whose PCM
+    output is fed directly to the ASR, without intermediate files.
+    Partial transcripts are forwarded as soon as the ASR emits them. The
+    pipeline starts retrieving context for a partial transcript once it
+    stayed unchanged for as long as the ASR took for the last segment, or
+    once the VAD detected the end of the utterance, as earlier prefixes
+    are almost never the final transcript.
+    """
+    loop = asyncio.get_running_loop()
+    # partial transcripts, None marks the end of the utterance
+    events: asyncio.Queue[str | None] = asyncio.Queue()
 
-        asr: AutomaticSpeechRecognition = (
-            LocalASR(None) if asr_method == ASRMethod.LOCAL else RemoteASR(None)
-        )
+    def on_segment(transcript: str) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, transcript)
 
-        loop = asyncio.get_event_loop()
-        transcript = await loop.run_in_executor(None, asr.transcribe, tmp_out_path)
+    def on_end_of_utterance() -> None:
+        loop.call_soon_threadsafe(events.put_nowait, None)
 
-        yield json.dumps({"type": "transcript", "data": transcript})
+    if asr_method == ASRMethod.LOCAL:
+        # loads torch and the whisper model, only needed for local ASR
+        from campus_plan_bot.input.local_asr import LocalASR
 
-        response = await pipeline.run(transcript, fix_asr=True)
+        transcribe = partial(LocalASR(None).transcribe_bytes, audio)
+    else:
+        transcribe = partial(
+            RemoteASR(None).transcribe_bytes,
+            audio,
+            on_segment=on_segment,
+            on_end_of_utterance=on_end_of_utterance,
+        )
+    transcription = loop.run_in_executor(None, transcribe)
 
-        yield json.dumps(
-            {
-                "type": "final_response",
-                "data": {"response": response.answer, "link": response.link},
-            }
+    # the latest partial transcript, until it is speculated on
+    prefix: str | None = None
+    segment_seconds: float | None = None
+    last_segment_at: float | None = None
+    while True:
+        next_event = asyncio.ensure_future(events.get())
+        done, _ = await asyncio.wait(
+            {next_event, transcription},
+            timeout=segment_seconds if prefix is not None else None,
+            return_when=asyncio.FIRST_COMPLETED,
         )
+        if next_event not in done:
+            next_event.cancel()
+            if transcription in done:
+                break
+            # timed out, no new segment for as long as the last one took
+            assert prefix is not None
+            pipeline.speculate(prefix, fix_asr=True)
+            prefix = None
+            continue
+
+        event = next_event.result()
+        if event is None:
+            if prefix is not None:
+                pipeline.speculate(prefix, fix_asr=True)
+                prefix = None
+            continue
+
+        now = loop.time()
+        if last_segment_at is not None:
+            segment_seconds = now - last_segment_at
+        last_segment_at = now
+        prefix = event
+        yield json.dumps({"type": "partial_transcript", "data": event})
+
+    # segments that arrived together with the end of the transcription
+    while not events.empty():
+        if (event := events.get_nowait()) is not None:
+            yield json.dumps({"type": "partial_transcript", "data": event})
+
+    transcript = await transcription
+
+    yield json.dumps({"type": "transcript", "data": transcript})
+
+    response = await pipeline.run(transcript, fix_asr=True)
 
-    finally:
-        os.remove(tmp_out_path)
+    yield json.dumps(
+        {
+            "type": "final_response",
+            "data": {"response": response.answer, "link": response.link},
+        }
+    )
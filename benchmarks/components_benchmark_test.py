@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from campus_plan_bot.data_picker import DataPicker
+from campus_plan_bot.interfaces.interfaces import RetrievedDocument, Role
+from campus_plan_bot.interfaces.persistence_types import Conversation
+from campus_plan_bot.link_extractor import (
+    extract_google_maps_link,
+    extract_website_link,
+)
+from campus_plan_bot.pandas_query_engine import PandasQueryEngine
+from campus_plan_bot.prompts.prompt_builder import LLama3PromptBuilder
+
+ANSWER_WITH_LINK = (
+    "Das Gebäude 50.34 befindet sich in der Kaiserstraße 12. "
+    "Hier ist der Link zur Navigation: "
+    "https://www.google.com/maps/dir/?api=1&destination=49.01097,8.41095"
+)
+ANSWER_WITHOUT_LINK = "Das Gebäude befindet sich in der Karl-Wilhelm-Straße. " * 10
+
+
+@pytest.mark.benchmark(group="data picker: field options")
+@pytest.mark.parametrize("num_docs", [5, 50])
+def test_get_field_options(benchmark, database: pd.DataFrame, num_docs: int):
+    picker = DataPicker(prompt_builder=LLama3PromptBuilder(""))
+    docs = [
+        RetrievedDocument(id=str(row["identifikator"]), data=row, relevance_score=1.0)
+        for row in database.head(num_docs).to_dict("records")
+    ]
+    assert benchmark(picker.get_field_options, docs)
+
+
+@pytest.mark.benchmark(group="prompt builder: conversation history")
+@pytest.mark.parametrize("num_turns", [1, 10, 50])
+def test_from_conversation_history(benchmark, num_turns: int):
+    conversation = Conversation.new()
+    for turn in range(num_turns):
+        conversation.add_message_from_content(f"Frage {turn}", Role.USER)
+        conversation.add_message_from_content(ANSWER_WITHOUT_LINK, Role.CODE)
+        conversation.add_message_from_content(ANSWER_WITH_LINK, Role.ASSISTANT)
+
+    prompt = benchmark(
+        LLama3PromptBuilder.from_conversation_history, conversation, "System"
+    )
+    assert prompt.startswith("<|begin_of_text|>")
+
+
+@pytest.mark.benchmark(group="pandas query engine: preprocess")
+def test_preprocess_df(benchmark, scaled_database: pd.DataFrame):
+    df = benchmark.pedantic(
+        PandasQueryEngine._preprocess_df,
+        setup=lambda: ((scaled_database.copy(), 49.01025, 8.41890), {}),
+        rounds=3,
+    )
+    assert "distance_meters" in df.columns
+
+
+@pytest.mark.benchmark(group="link extractors")
+@pytest.mark.parametrize("extractor", [extract_website_link, extract_google_maps_link])
+@pytest.mark.parametrize(
+    "answer", [ANSWER_WITH_LINK, ANSWER_WITHOUT_LINK], ids=["link", "no link"]
+)
+def test_link_extractor(benchmark, extractor, answer: str):
+    benchmark(extractor, answer)
@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import TextNode
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from sentence_transformers import CrossEncoder
+
+from campus_plan_bot.rag import BACKENDS, RAG
+
+database_path = Path("data") / "campusplan_evaluation.csv"
+
+# the embedding dimension of RAG.MODEL
+EMBEDDING_DIM = 768
+
+
+def scale_dataset(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """Repeat the database `factor` times, marking the identifiers of the
+    copies so that they stay unique."""
+    copies = [df]
+    for copy_idx in range(1, factor):
+        copy = df.copy()
+        copy["identifikator"] = copy["identifikator"].astype(str) + f" [{copy_idx}]"
+        copies.append(copy)
+    scaled = pd.concat(copies, ignore_index=True)
+    scaled["id"] = range(1, len(scaled) + 1)
+    return scaled
+
+
+def synthetic_index(
+    df: pd.DataFrame, embed_model: HuggingFaceEmbedding
+) -> VectorStoreIndex:
+    """Build an index like RAG.from_df, but with random document embeddings,
+    so that large datasets don't need to be embedded."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((len(df), EMBEDDING_DIM)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    df = df.assign(name=df["name"].fillna(""))
+    nodes = []
+    for (_, row), embedding in zip(df.iterrows(), embeddings):
+        identifikator = str(row["identifikator"])
+        text = f"{row['name']} {identifikator}" if row["name"] else identifikator
+        nodes.append(
+            TextNode(
+                text=RAG._normalize_text(text),
+                metadata=row.to_dict(),
+                embedding=embedding.tolist(),
+            )
+        )
+    return VectorStoreIndex(nodes, embed_model=embed_model)
+
+
+@pytest.fixture(scope="session")
+def database() -> pd.DataFrame:
+    return pd.read_csv(database_path)
+
+
+@pytest.fixture(scope="session", params=[1, 10, 100], ids=lambda s: f"{s}x")
+def scaled_database(request, database: pd.DataFrame) -> pd.DataFrame:
+    return scale_dataset(database, request.param)
+
+
+@pytest.fixture(scope="session")
+def embed_model() -> HuggingFaceEmbedding:
+    return RAG.load_embed_model("torch")
+
+
+@pytest.fixture(scope="session")
+def reranker() -> CrossEncoder:
+    return RAG.load_reranker("torch")
+
+
+@pytest.fixture(scope="session", params=BACKENDS)
+def rag(request, database: pd.DataFrame, embed_model) -> RAG:
+    """The RAG with each inference backend of the reranker (the ONNX ones
+    need the snapshot exported by `download_models.py --onnx`)."""
+    if request.param != "torch":
+        pytest.importorskip("optimum.onnxruntime")
+    if not RAG.has_reranker_export(request.param):
+        pytest.skip(
+            f"{request.param} needs MODEL_SNAPSHOT_DIR with the reranker "
+            "exported by download_models.py --onnx"
+        )
+    return RAG(
+        synthetic_index(database, embed_model),
+        database,
+        reranker=RAG.load_reranker(request.param),
+        backend=request.param,
+    )
+
+
+@pytest.fixture(scope="session")
+def scaled_rag(scaled_database: pd.DataFrame, embed_model, reranker) -> RAG:
+    return RAG(
+        synthetic_index(scaled_database, embed_model),
+        scaled_database,
+        reranker=reranker,
+    )
@@ -0,0 +1,95 @@
+import pytest
+
+from campus_plan_bot.cache import EmbeddingCache, LRUCache
+from campus_plan_bot.rag import RAG
+
+BUILDING_NUMBER_QUERY = "Wo befindet sich das Gebäude 50.34?"
+SIMILARITY_QUERY = RAG._normalize_text("Wo ist der Egon-Eiermann-Hörsaal?")
+
+
+@pytest.mark.benchmark(group="rag: building number")
+def test_retrieve_by_building_number(benchmark, scaled_rag: RAG):
+    documents = benchmark(
+        scaled_rag._retrieve_by_building_number, BUILDING_NUMBER_QUERY
+    )
+    assert documents
+
+
+@pytest.mark.benchmark(group="rag: embed query")
+def test_embed_query(benchmark, rag: RAG):
+    embedding = benchmark(rag._embed_query, SIMILARITY_QUERY)
+    assert len(embedding) > 0
+
+
+@pytest.mark.benchmark(group="rag: embed query")
+def test_embed_query_cached(benchmark, scaled_rag: RAG):
+    rag = RAG(
+        scaled_rag.index,
+        scaled_rag.database,
+        reranker=scaled_rag.reranker,
+        embedding_cache=EmbeddingCache(),
+    )
+    rag._embed_query(SIMILARITY_QUERY)
+    embedding = benchmark(rag._embed_query, SIMILARITY_QUERY)
+    assert len(embedding) > 0 and rag.embedding_cache.hits > 0
+
+
+@pytest.mark.benchmark(group="rag: vector search")
+def test_vector_search(benchmark, scaled_rag: RAG):
+    embedding = scaled_rag._embed_query(SIMILARITY_QUERY)
+    nodes = benchmark(scaled_rag._vector_search, SIMILARITY_QUERY, embedding, 15)
+    assert len(nodes) == 15
+
+
+@pytest.mark.benchmark(group="rag: name match")
+def test_retrieve_by_name(benchmark, scaled_rag: RAG):
+    scaled_rag.name_index
+    documents = benchmark(
+        scaled_rag._retrieve_by_name, "Kennst dud ie Cafeteria?", set(), 5
+    )
+    assert len(documents) > 0
+
+
+@pytest.mark.benchmark(group="rag: lexical search")
+def test_lexical_search(benchmark, scaled_rag: RAG):
+    scaled_rag.lexical_index
+    nodes = benchmark(scaled_rag._lexical_search, "Egon Eiermann Hörsaal", 15)
+    assert len(nodes) > 0
+
+
+@pytest.mark.benchmark(group="rag: rerank")
+@pytest.mark.parametrize("cached", [False, True], ids=["uncached", "cached"])
+def test_rerank(benchmark, rag: RAG, cached: bool):
+    rag = RAG(
+        rag.index,
+        rag.database,
+        reranker=rag.reranker,
+        pair_score_cache=LRUCache(1024) if cached else None,
+    )
+    embedding = rag._embed_query(SIMILARITY_QUERY)
+    nodes = rag._vector_search(SIMILARITY_QUERY, embedding, 15)
+    reranked = benchmark(rag._rerank, SIMILARITY_QUERY, nodes)
+    assert len(reranked) == 15
+
+
+@pytest.mark.benchmark(group="rag: rerank")
+def test_rerank_adaptively(benchmark, rag: RAG):
+    embedding = rag._embed_query(SIMILARITY_QUERY)
+    nodes = rag._vector_search(SIMILARITY_QUERY, embedding, 15)
+    reranked = benchmark(rag._rerank_adaptively, SIMILARITY_QUERY, nodes, nodes, 5)
+    assert len(reranked) == 15
+
+
+@pytest.mark.benchmark(group="rag: retrieve context")
+@pytest.mark.parametrize("cached", [False, True], ids=["uncached", "cached"])
+@pytest.mark.parametrize("hybrid", [False, True], ids=["dense", "hybrid"])
+def test_retrieve_context(benchmark, scaled_rag: RAG, cached: bool, hybrid: bool):
+    rag = RAG(
+        scaled_rag.index,
+        scaled_rag.database,
+        reranker=scaled_rag.reranker,
+        result_cache=LRUCache(1024) if cached else None,
+        hybrid=hybrid,
+    )
+    documents = benchmark(rag.retrieve_context, "Wo ist der Egon-Eiermann-Hörsaal?")
+    assert len(documents) == 5
@@ -0,0 +1,75 @@
+"""Lexical retrieval with BM25 and fusion of rankings.
+
+Dense retrieval misses queries that hinge on exact tokens (institute names,
+"Mensa", street names). A small in-memory inverted index over the building
+names and facts finds those, and reciprocal rank fusion merges its ranking
+with the vector search without having to calibrate the scores.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from collections.abc import Hashable, Iterable, Sequence
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+# building numbers like 50.34 stay one token
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|\w+")
+
+STOPWORDS = frozenset("""
+    am an auf aus bei bin bis das dem den der des die du ein eine einem einen
+    einer es finde für gibt hat hier ich im in ist kann mir mit nach noch
+    oder sich sie sind und von vom wann was welche welcher wie wo zu zum zur
+    """.split())
+
+
+def tokenize(text: str) -> list[str]:
+    text = re.sub(r"[-_/]", " ", text.lower())
+    return [token for token in TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+class BM25Index(Generic[K]):
+    """Okapi BM25 over short documents, with an inverted index so that a
+    query only touches the documents that contain one of its terms."""
+
+    def __init__(self, documents: Iterable[tuple[K, str]], k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys: list[K] = []
+        self.lengths: list[int] = []
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        for key, text in documents:
+            tokens = tokenize(text)
+            for term, count in Counter(tokens).items():
+                self.postings[term].append((len(self.keys), count))
+            self.keys.append(key)
+            self.lengths.append(len(tokens))
+        self.average_length = sum(self.lengths) / max(1, len(self.lengths))
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.keys) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: int) -> list[tuple[K, float]]:
+        """The `top_k` documents with the highest BM25 score, best first."""
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf(term)
+            for doc, count in self.postings.get(term, ()):
+                norm = 1 - self.b + self.b * self.lengths[doc] / self.average_length
+                scores[doc] += idf * count * (self.k1 + 1) / (count + self.k1 * norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [(self.keys[doc], score) for doc, score in best[:top_k]]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[K]], k: int = 60
+) -> list[tuple[K, float]]:
+    """Merge rankings by summing 1 / (k + rank) over the rankings that
+    contain an item (Cormack et al., 2009)."""
+    scores: dict[K, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from pathlib import Path
+from typing import Generic, TypeVar
+
+import numpy as np
+from loguru import logger
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def content_hash(data: bytes) -> str:
+    """Stable key for a blob of data, e.g. the bytes of an audio file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class NpyDiskCache:
+    """Stores numpy arrays as `.npy` files in a directory.
+
+    Entries are written atomically, so concurrent processes sharing the
+    directory never read partial files. Unreadable entries are treated
+    as misses.
+    """
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.npy"
+
+    def get(self, key: str) -> np.ndarray | None:
+        path = self.path(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        try:
+            array = np.load(path, allow_pickle=False)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring corrupt cache entry {path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return array
+
+    def put(self, key: str, array: np.ndarray) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(tmp_path, self.path(key))
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {key}: {e}")
+            Path(tmp_path).unlink(missing_ok=True)
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded in-memory cache that evicts the least recently used entry
+    and, with a `ttl` in seconds, entries older than that."""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if self.clock() - entry[1] > self.ttl:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class EmbeddingCache:
+    """Caches embeddings of texts per model in memory, optionally backed by
+    a directory that survives restarts and is shared between workers."""
+
+    def __init__(self, max_size: int = 4096, directory: str | Path | None = None):
+        self.memory: LRUCache[str, np.ndarray] = LRUCache(max_size)
+        self.disk = NpyDiskCache(directory) if directory is not None else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return content_hash(f"{model}\0{text}".encode())
+
+    def get(self, model: str, text: str) -> np.ndarray | None:
+        key = self.key(model, text)
+        embedding = self.memory.get(key)
+        if embedding is None and self.disk is not None:
+            embedding = self.disk.get(key)
+            if embedding is not None:
+                self.memory.put(key, embedding)
+        if embedding is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return embedding
+
+    def put(self, model: str, text: str, embedding: np.ndarray) -> None:
+        key = self.key(model, text)
+        self.memory.put(key, embedding)
+        if self.disk is not None:
+            self.disk.put(key, embedding)
@@ -6,12 +6,12 @@ from pathlib import Path
 import click
 from loguru import logger
 
-from campus_plan_bot.input.local_asr import LocalASR
-from campus_plan_bot.input.remote_asr import RemoteASR
+from campus_plan_bot import tracing
 from campus_plan_bot.input.text_input import TextInput
 from campus_plan_bot.interfaces.interfaces import InputMethods, UserInputSource
 from campus_plan_bot.pipeline import Pipeline
 from campus_plan_bot.settings.settings import Settings
+from campus_plan_bot.warmup import BackgroundLoader
 
 database_path = Path("data") / "campusplan_evaluation.csv"
 embeddings_dir = Path("data") / "embeddings"
@@ -47,6 +47,7 @@ def chat(log_level: str, input: str, token: str, file: str):
     """Simple CLI chatbot interface."""
     logger.remove()
     logger.add(sys.stderr, level=log_level.upper())
+    tracing.configure_from_env()
 
     # save new token to settings
     if token is not None:
@@ -62,16 +63,20 @@ def chat(log_level: str, input: str, token: str, file: str):
         nl=False,
     )
 
-    # prepare system components
-    input_method = get_input_method(input, file)
-
     allow_complex_mode = bool(os.getenv("OPENAI_API_KEY"))
     if not allow_complex_mode:
         logger.info("OPENAI_API_KEY not found, complex queries are disabled.")
 
-    pipeline = Pipeline.from_database(
-        database_path, embeddings_dir, allow_complex_mode=allow_complex_mode
-    )
+    # load the models while the user types the first question
+    pipeline_loader = BackgroundLoader(
+        "Pipeline",
+        lambda progress: Pipeline.from_database(
+            database_path, embeddings_dir, allow_complex_mode=allow_complex_mode
+        ),
+    ).start()
+
+    # prepare system components
+    input_method = get_input_method(input, file)
 
     async def run_conversation():
 
@@ -79,6 +84,7 @@ def chat(log_level: str, input: str, token: str, file: str):
         while True:
 
             user_input: str = input_method.get_input()
+            pipeline = pipeline_loader.result()
 
             # input might end conversation
             if user_input.strip().lower() in {"exit", "quit"}:
@@ -110,9 +116,13 @@ def get_input_method(input_choice: str, file: str) -> UserInputSource:
             click.echo("Type 'exit' to quit.")
             return TextInput()
         case InputMethods.LOCAL_ASR.value:
+            from campus_plan_bot.input.local_asr import LocalASR
+
             click.echo("Press 'q' to quit.")
             return LocalASR(file)
         case InputMethods.ASR.value:
+            from campus_plan_bot.input.remote_asr import RemoteASR
+
             click.echo("Press 'q' to quit.")
             return RemoteASR(file)
         case _:
@@ -31,9 +31,12 @@ from pydantic_ai.models import (
 
 from campus_plan_bot.interfaces.interfaces import LLMRequestConfig, Role
 from campus_plan_bot.interfaces.persistence_types import Conversation
+from campus_plan_bot.llm_client import estimate_tokens, llm_span
 from campus_plan_bot.prompts.prompt_builder import LLama3PromptBuilder
 
-CHUTE_API_URL = "https://llm.chutes.ai/v1/chat/completions"
+CHUTE_API_URL = (
+    os.getenv("CHUTE_API_URL") or "https://llm.chutes.ai/v1/chat/completions"
+)
 
 
 def _messages_to_chute_format(
@@ -218,39 +221,41 @@ class ChuteModel(Model):
         if model_settings and model_settings.get("temperature"):
             body["temperature"] = model_settings["temperature"]
 
-        last_exception = None
-        for attempt in range(self.max_retries + 1):
-            try:
-                response = await client.post(
-                    CHUTE_API_URL,
-                    headers=self._build_headers(),
-                    json=body,
-                    timeout=self.timeout,
-                )
-                response.raise_for_status()
-                break  # Success
-            except httpx.RequestError as e:
-                last_exception = e
-                if attempt < self.max_retries:
-                    wait_time = self.backoff_factor * (2**attempt)
-                    await asyncio.sleep(wait_time)
-                else:
+        with llm_span(json.dumps(body["messages"]), body.get("max_tokens")) as span:
+            last_exception = None
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await client.post(
+                        CHUTE_API_URL,
+                        headers=self._build_headers(),
+                        json=body,
+                        timeout=self.timeout,
+                    )
+                    response.raise_for_status()
+                    break  # Success
+                except httpx.RequestError as e:
+                    last_exception = e
+                    if attempt < self.max_retries:
+                        wait_time = self.backoff_factor * (2**attempt)
+                        await asyncio.sleep(wait_time)
+                    else:
+                        raise last_exception
+            else:
+                # This block is executed if the loop completes without a break,
+                # meaning all retries failed.
+                if last_exception:
                     raise last_exception
-        else:
-            # This block is executed if the loop completes without a break,
-            # meaning all retries failed.
-            if last_exception:
-                raise last_exception
-            # This should not be reached if max_retries >= 0
-            raise RuntimeError("Request failed after all retries")
+                # This should not be reached if max_retries >= 0
+                raise RuntimeError("Request failed after all retries")
 
-        data = response.json()
-        choice = data.get("choices", [{}])[0]
-        message = choice.get("message", {})
-        content: str = message.get("content")
+            data = response.json()
+            choice = data.get("choices", [{}])[0]
+            message = choice.get("message", {})
+            content: str = message.get("content")
 
-        if not content:
-            raise UnexpectedModelBehavior("No content in Chute API response")
+            if not content:
+                raise UnexpectedModelBehavior("No content in Chute API response")
+            span.set("llm.completion_tokens", estimate_tokens(content))
 
         response_text = (
             content.replace("<think>", "").replace("</think>", "").strip()
@@ -320,29 +325,33 @@ class ChuteModel(Model):
         if model_settings and model_settings.get("temperature"):
             body["temperature"] = model_settings["temperature"]
 
-        last_exception = None
-        for attempt in range(self.max_retries + 1):
-            try:
-                async with client.stream(
-                    "POST",
-                    CHUTE_API_URL,
-                    headers=self._build_headers(),
-                    json=body,
-                    timeout=self.timeout,
-                ) as response:
-                    response.raise_for_status()
-                    yield ChuteStreamedResponse(response.aiter_lines(), self.model_name)
-                    return  # Exit after successful stream
-            except httpx.RequestError as e:
-                last_exception = e
-                if attempt < self.max_retries:
-                    wait_time = self.backoff_factor * (2**attempt)
-                    await asyncio.sleep(wait_time)
-                else:
-                    raise last_exception
+        # the span covers the whole stream, the response is consumed inside it
+        with llm_span(json.dumps(body["messages"]), body.get("max_tokens")):
+            last_exception = None
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with client.stream(
+                        "POST",
+                        CHUTE_API_URL,
+                        headers=self._build_headers(),
+                        json=body,
+                        timeout=self.timeout,
+                    ) as response:
+                        response.raise_for_status()
+                        yield ChuteStreamedResponse(
+                            response.aiter_lines(), self.model_name
+                        )
+                        return  # Exit after successful stream
+                except httpx.RequestError as e:
+                    last_exception = e
+                    if attempt < self.max_retries:
+                        wait_time = self.backoff_factor * (2**attempt)
+                        await asyncio.sleep(wait_time)
+                    else:
+                        raise last_exception
 
-        if last_exception:
-            raise last_exception
+            if last_exception:
+                raise last_exception
 
     async def query_async(self, prompt: str) -> str:
         """Query the Chute API with a single string, omitting the pydantic
@@ -357,17 +366,19 @@ class ChuteModel(Model):
             "temperature": self.request_config["temperature"],
             "max_tokens": self.request_config["max_new_tokens"],
         }
-        response = await client.post(
-            CHUTE_API_URL,
-            headers=self._build_headers(),
-            json=body,
-            timeout=self.timeout,
-        )
-        response.raise_for_status()
-        data = response.json()
-        choice = data.get("choices", [{}])[0]
-        message = choice.get("message", {})
-        content: str = message.get("content")
+        with llm_span(prompt, self.request_config["max_new_tokens"]) as span:
+            response = await client.post(
+                CHUTE_API_URL,
+                headers=self._build_headers(),
+                json=body,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+            choice = data.get("choices", [{}])[0]
+            message = choice.get("message", {})
+            content: str = message.get("content")
+            span.set("llm.completion_tokens", estimate_tokens(content))
 
         if self.strip_think:
             content = content.replace("<think>", "").replace("</think>", "").strip()
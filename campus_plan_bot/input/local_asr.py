@@ -1,19 +1,199 @@
+import os
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Callable
+
 import click
-import torch
-import torchaudio
-from transformers import WhisperForConditionalGeneration, WhisperProcessor
+from loguru import logger
 
+from campus_plan_bot.cache import NpyDiskCache, content_hash
 from campus_plan_bot.interfaces.interfaces import AutomaticSpeechRecognition
+from campus_plan_bot.streamadapter.vad import EnergyVAD, SpeechSegment
+
+# torch and transformers take seconds to import, they are only imported once
+# audio is actually transcribed
+if TYPE_CHECKING:
+    import torch
+    import torchaudio
+
+# quantize the whisper model to int8 when running on the CPU
+LOCAL_ASR_INT8 = os.getenv("LOCAL_ASR_INT8", "").lower() in {"1", "true", "yes"}
+# directory for cached log-mel features of transcribed audio files (optional)
+LOCAL_ASR_FEATURE_CACHE = os.getenv("LOCAL_ASR_FEATURE_CACHE")
+
+
+@lru_cache(maxsize=8)
+def get_resampler(orig_freq: int) -> "torchaudio.transforms.Resample":
+    """Resampler to 16 kHz, whose sinc kernel is computed once per source
+    rate."""
+    import torchaudio
+
+    return torchaudio.transforms.Resample(orig_freq, 16000)
+
+
+@dataclass
+class TranscriptionRequest:
+    """Log-mel features of a single waveform waiting to be transcribed by
+    the WhisperService."""
+
+    features: "torch.Tensor"
+    language: str
+    result: Future[str] = field(default_factory=Future)
+
+
+class WhisperService:
+    """Process-wide whisper model that batches concurrent transcriptions.
+
+    Requests are queued and a single worker thread collects everything
+    that arrives within `max_wait` seconds (up to `max_batch_size`
+    waveforms) into one `generate` call.
+    """
+
+    _instances: dict[tuple[str, bool], "WhisperService"] = {}
+    _instances_lock = Lock()
+
+    def __init__(
+        self,
+        whisper_model_name: str,
+        quantize: bool = False,
+        max_batch_size: int = 8,
+        max_wait: float = 0.05,
+    ):
+        import torch
+        from transformers import WhisperForConditionalGeneration, WhisperProcessor
+
+        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        start = time.monotonic()
+        self.processor = WhisperProcessor.from_pretrained(whisper_model_name)
+        model = WhisperForConditionalGeneration.from_pretrained(whisper_model_name)
+        model.eval()
+
+        if quantize and self.device == "cpu":
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif quantize:
+            logger.warning("int8 quantization is only supported on CPU, skipping.")
+        self.model = model.to(self.device)
+        logger.debug(
+            f"Loaded {whisper_model_name} (int8={quantize and self.device == 'cpu'}) "
+            f"in {time.monotonic() - start:.1f}s"
+        )
+
+        self._queue: Queue[TranscriptionRequest] = Queue()
+        Thread(target=self._work, daemon=True).start()
+
+    @classmethod
+    def get(cls, whisper_model_name: str, quantize: bool = False) -> "WhisperService":
+        """Return the shared service for a model, loading it on first use."""
+        key = (whisper_model_name, quantize)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(whisper_model_name, quantize=quantize)
+            return cls._instances[key]
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @classmethod
+    def total_queue_depth(cls) -> int:
+        """Requests waiting in the queues of all loaded services."""
+        return sum(service.queue_depth for service in list(cls._instances.values()))
+
+    def features(self, audio: "torch.Tensor") -> "torch.Tensor":
+        """Compute the log-mel features of a 16 kHz mono waveform, padded to
+        whisper's 30 second window."""
+        return self.processor(
+            audio.numpy(), return_tensors="pt", sampling_rate=16000
+        ).input_features[0]
+
+    def transcribe(self, audio: "torch.Tensor", language: str = "german") -> str:
+        """Transcribe a 16 kHz mono waveform, blocking until its batch is
+        done."""
+        return self.transcribe_features([self.features(audio)], language)[0]
+
+    def transcribe_features(
+        self, features: "list[torch.Tensor]", language: str = "german"
+    ) -> list[str]:
+        """Transcribe the features of several waveforms, which are queued
+        together so that they end up in the same batch."""
+        requests = [
+            TranscriptionRequest(features=item, language=language) for item in features
+        ]
+        for request in requests:
+            self._queue.put(request)
+        return [request.result.result() for request in requests]
+
+    def _next_batch(self) -> list[TranscriptionRequest]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except Empty:
+                break
+        return batch
+
+    def _work(self) -> None:
+        while True:
+            batch = self._next_batch()
+            by_language: dict[str, list[TranscriptionRequest]] = {}
+            for request in batch:
+                by_language.setdefault(request.language, []).append(request)
+
+            for language, requests in by_language.items():
+                try:
+                    transcripts = self._generate(
+                        [request.features for request in requests], language
+                    )
+                except Exception as e:
+                    for request in requests:
+                        request.result.set_exception(e)
+                    continue
+                for request, transcript in zip(requests, transcripts):
+                    request.result.set_result(transcript.strip())
+
+    def _generate(self, features: "list[torch.Tensor]", language: str) -> list[str]:
+        """Transcribe a batch of waveforms with a single generate call."""
+        import torch
+
+        logger.debug(f"Transcribing a batch of {len(features)} recordings")
+        with torch.inference_mode():
+            input_features = torch.stack(features).to(self.device)
+            forced_decoder_ids = self.processor.get_decoder_prompt_ids(
+                language=language, task="transcribe"
+            )
+            predicted_ids = self.model.generate(
+                input_features, forced_decoder_ids=forced_decoder_ids
+            )
+        return self.processor.batch_decode(predicted_ids, skip_special_tokens=True)
 
 
 class LocalASR(AutomaticSpeechRecognition):
     """Creating transcript from audio file with local whisper model."""
 
-    def __init__(self, file, whisper_model_name="openai/whisper-base"):
+    def __init__(
+        self,
+        file,
+        whisper_model_name="openai/whisper-base",
+        quantize: bool = LOCAL_ASR_INT8,
+        feature_cache_dir: str | Path | None = LOCAL_ASR_FEATURE_CACHE,
+    ):
 
         super().__init__(file)
 
-        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
         """Several options for local whisper models with associated storage
         sizes When choosing a new model it will be automatically downloaded and
         cached."""
@@ -27,73 +207,108 @@ class LocalASR(AutomaticSpeechRecognition):
         # whisper_model_name = "openai/whisper-medium" # multilingual, ~ 3.06 GB
         # whisper_model_name = "openai/whisper-large-v2" # multilingual, ~ 6.17 GB
 
-        # load the model and the processor
-        self.whisper_processor = WhisperProcessor.from_pretrained(whisper_model_name)
-        self.whisper_model = WhisperForConditionalGeneration.from_pretrained(
-            whisper_model_name
-        ).to(self.device)
+        # the model is loaded once per process and shared by all instances
+        self.whisper = WhisperService.get(whisper_model_name, quantize=quantize)
+        self.vad = EnergyVAD()
+        # speech boundaries detected in the last transcribed recording
+        # (not known if its features came from the cache)
+        self.speech_segments: list[SpeechSegment] = []
+
+        # features depend on the model's feature extractor and the VAD
+        self.feature_cache = (
+            NpyDiskCache(
+                Path(feature_cache_dir) / whisper_model_name.replace("/", "--")
+            )
+            if feature_cache_dir
+            else None
+        )
 
     def load_audio(self, audio_path):
         """Load the audio file & convert to 16,000 sampling rate."""
+        import torchaudio
 
         # load our wav file
         speech, sr = torchaudio.load(audio_path)
-        resampler = torchaudio.transforms.Resample(sr, 16000)
-        speech = resampler(speech)
-        return speech.squeeze()
-
-    def whisper_transcription(
-        self, audio, model, processor, language="english", skip_special_tokens=True
-    ) -> str:
-        """Transcribe the provided torch audio vector with specified whisper
-        model."""
-
-        # get the input features from the audio file
-        input_features = processor(
-            audio,
-            return_tensors="pt",
-            padding="longest",
-            return_attention_mask=True,
-            sampling_rate=16000,
-        ).input_features.to(self.device)
-
-        # get the forced decoder ids
-        forced_decoder_ids = processor.get_decoder_prompt_ids(
-            language=language, task="transcribe"
-        )
+        if sr != 16000:
+            speech = get_resampler(sr)(speech)
+        # mix down to mono
+        return speech.mean(dim=0)
 
-        # NOTE: this attention mask is experimental to silence warning - check that giving all ones does not mess up model prediction
-        attention_mask = torch.ones(input_features.shape, dtype=torch.long)
+    def load_audio_bytes(self, audio: bytes):
+        """Decode an in-memory audio file to a 16,000 Hz mono waveform."""
+        import torch
 
-        # generate the transcription
-        predicted_ids = model.generate(
-            input_features,
-            attention_mask=attention_mask,
-            forced_decoder_ids=forced_decoder_ids,
-        )
-        # decode the predicted ids
-        whisper_transcript = processor.batch_decode(
-            predicted_ids, skip_special_tokens=skip_special_tokens
-        )[0]
-        return whisper_transcript
+        from campus_plan_bot.streamadapter.ffmpeg_stream_adapter import FfmpegStream
+
+        stream = FfmpegStream(volume=1.0, repeat_input=False)
+        stream.set_input(audio)
+        pcm = stream.read_all()
+        return torch.frombuffer(bytearray(pcm), dtype=torch.int16).float() / 32768.0
+
+    def speech_chunks(self, audio: "torch.Tensor") -> "list[torch.Tensor]":
+        """Drop silence and split the recording at pauses into pieces that
+        fit into whisper's 30 second window."""
+        import torch
+
+        self.speech_segments = self.vad.split(audio.numpy(), max_seconds=30.0)
+        if not self.speech_segments:
+            # let whisper decide if there is anything to transcribe
+            return [audio]
+        samples = audio.numpy()
+        return [
+            torch.from_numpy(self.vad.cut(samples, segment).copy())
+            for segment in self.speech_segments
+        ]
+
+    def chunk_features(
+        self, content: Callable[[], bytes], load: "Callable[[], torch.Tensor]"
+    ) -> "list[torch.Tensor]":
+        """Return the features of all speech chunks of a recording.
+
+        They are looked up in the feature cache by the hash of the encoded
+        `content` if possible, otherwise the recording is decoded with
+        `load`.
+        """
+        import torch
+
+        if self.feature_cache is None:
+            return [
+                self.whisper.features(chunk) for chunk in self.speech_chunks(load())
+            ]
+
+        key = content_hash(content())
+        cached = self.feature_cache.get(key)
+        if cached is not None:
+            self.speech_segments = []
+            return list(torch.from_numpy(cached))
+
+        features = [
+            self.whisper.features(chunk) for chunk in self.speech_chunks(load())
+        ]
+        self.feature_cache.put(key, torch.stack(features).numpy())
+        return features
+
+    def _transcribe_features(self, features: "list[torch.Tensor]") -> str:
+        transcripts = self.whisper.transcribe_features(features, language="german")
+        return " ".join(transcript for transcript in transcripts if transcript)
 
     def transcribe(self, audio_path: str) -> str:
         """Create transcript for specified audio file."""
 
-        raise NotImplementedError("Local ASR is not implemented")
-
-        print("Transcribing ...")
+        logger.info(f"Transcribing {audio_path}...")
+        features = self.chunk_features(
+            lambda: Path(audio_path).read_bytes(), lambda: self.load_audio(audio_path)
+        )
+        return self._transcribe_features(features)
 
-        audio = self.load_audio(audio_path)
+    def transcribe_bytes(self, audio: bytes) -> str:
+        """Create transcript for an encoded audio file held in memory."""
 
-        transcript = self.whisper_transcription(
-            audio,
-            self.whisper_model,
-            self.whisper_processor,
-            language="german",
-            skip_special_tokens=True,
+        logger.info(f"Transcribing {len(audio)} bytes of audio...")
+        features = self.chunk_features(
+            lambda: audio, lambda: self.load_audio_bytes(audio)
         )
-        return transcript
+        return self._transcribe_features(features)
 
     def get_input(self) -> str:
         """Get audio input from the user and return the transcript."""
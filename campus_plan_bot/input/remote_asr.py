@@ -3,6 +3,7 @@ import base64
 import json
 import os
 import time
+from collections.abc import Callable
 from threading import Thread
 
 import click
@@ -16,6 +17,17 @@ from campus_plan_bot.settings.settings import Settings
 
 class RemoteASR(AutomaticSpeechRecognition):
 
+    def __init__(self, file=None):
+        super().__init__(file)
+
+        # called with the transcript so far whenever a new segment arrives
+        self.on_segment: Callable[[str], None] | None = None
+        # called once all speech was uploaded, e.g. when the VAD detected the
+        # end of the utterance
+        self.on_end_of_utterance: Callable[[], None] | None = None
+        # speech boundaries the VAD detected in the last transcribed input
+        self.speech_segments: list = []
+
     def get_audio_input(self, args):
 
         from campus_plan_bot.streamadapter.ffmpeg_stream_adapter import FfmpegStream
@@ -26,7 +38,9 @@ class RemoteASR(AutomaticSpeechRecognition):
             ffmpeg_speed=args.ffmpeg_speed,
         )
         input = args.ffmpeg_input
-        if input is None:
+        if isinstance(input, bytes):
+            pass  # encoded audio held in memory, piped into ffmpeg
+        elif input is None:
             logger.warning(
                 "The ffmpeg backend requires an url/file via the '-f' parameter"
             )
@@ -39,6 +53,11 @@ class RemoteASR(AutomaticSpeechRecognition):
 
         stream_adapter.set_input(input)
 
+        if getattr(args, "vad", False):
+            from campus_plan_bot.streamadapter.vad import VadStream
+
+            # only upload speech, optionally stopping after the utterance
+            return VadStream(stream_adapter, end_of_utterance=args.vad_end_of_utterance)
         return stream_adapter
 
     def send_start(self, url, sessionID, streamID, api, token):
@@ -83,6 +102,7 @@ class RemoteASR(AutomaticSpeechRecognition):
         }
 
         while True:
+            sent_at = time.monotonic()
             try:
                 res = requests.post(
                     url + "/" + api + "/" + sessionID + "/" + streamID + "/append",
@@ -98,6 +118,9 @@ class RemoteASR(AutomaticSpeechRecognition):
             logger.error(msg)
             raise ConnectionError(msg)
 
+        # let the stream adapter size the next chunks based on the upload speed
+        audio_source.report_ack(len(chunk), time.monotonic() - sent_at)
+
         return e
 
     def send_end(self, url, sessionID, streamID, api, token):
@@ -148,6 +171,8 @@ class RemoteASR(AutomaticSpeechRecognition):
         except KeyboardInterrupt:
             pass
 
+        if self.on_end_of_utterance is not None:
+            self.on_end_of_utterance()
         time.sleep(1)
         self.send_end(args.url, sessionID, streamID, args.api, args.token)
 
@@ -173,6 +198,8 @@ class RemoteASR(AutomaticSpeechRecognition):
             if printing == -1:
                 if "seq" in data:
                     self.transcript += data["seq"]
+                    if self.on_segment is not None:
+                        self.on_segment(self.transcript.lstrip())
             elif printing == 0:
                 if "controll" in data:
                     if data["controll"] == "INFORMATION":
@@ -294,7 +321,33 @@ class RemoteASR(AutomaticSpeechRecognition):
         """Create transcript for specified audio file."""
 
         logger.info(f"Transcribing {audio_path}...")
+        return self._transcribe_input(audio_path, token)
 
+    def transcribe_bytes(
+        self,
+        audio: bytes,
+        token: str | None = None,
+        on_segment: Callable[[str], None] | None = None,
+        on_end_of_utterance: Callable[[], None] | None = None,
+    ) -> str:
+        """Create transcript for an encoded audio file held in memory.
+
+        If given, on_segment is called from the receiving thread with
+        the transcript so far whenever the server sends a new segment, and
+        on_end_of_utterance once all speech was uploaded and only the
+        remaining segments are outstanding.
+        """
+
+        logger.info(f"Transcribing {len(audio)} bytes of audio...")
+        self.on_segment = on_segment
+        self.on_end_of_utterance = on_end_of_utterance
+        try:
+            return self._transcribe_input(audio, token)
+        finally:
+            self.on_segment = None
+            self.on_end_of_utterance = None
+
+    def _transcribe_input(self, input: str | bytes, token: str | None) -> str:
         token_to_use = token if token is not None else Settings().load_settings("token")
 
         args = argparse.Namespace(
@@ -303,7 +356,7 @@ class RemoteASR(AutomaticSpeechRecognition):
             input="ffmpeg",
             print=-1,
             output_file=None,
-            ffmpeg_input=audio_path,
+            ffmpeg_input=input,
             volume=1.0,
             ffmpeg_speed=-1.0,
             no_logging=False,
@@ -319,12 +372,18 @@ class RemoteASR(AutomaticSpeechRecognition):
             generate_video=None,
             summarize=False,
             api="webapi",
+            vad=True,
+            vad_end_of_utterance=None,
         )
 
         self.transcript = ""
 
         audio_source = self.get_audio_input(args)
-        self.run_session(args, audio_source)
+        try:
+            self.run_session(args, audio_source)
+        finally:
+            audio_source.cleanup()
+        self.speech_segments = getattr(audio_source, "segments", [])
 
         return self.transcript.lstrip()
 
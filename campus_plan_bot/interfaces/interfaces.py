@@ -101,6 +101,17 @@ class AutomaticSpeechRecognition(UserInputSource, Protocol):
         """
         ...
 
+    def transcribe_bytes(self, audio: bytes) -> str:
+        """Convert an encoded audio file held in memory to text.
+
+        Args:
+            audio: Raw bytes of the audio file in any format ffmpeg can decode
+
+        Returns:
+            Transcribed text
+        """
+        ...
+
 
 # --- RAG Component Protocols ---
 
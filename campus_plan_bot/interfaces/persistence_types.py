@@ -37,6 +37,24 @@ class Message(MessageProtocol):
             role=role,
         )
 
+    @classmethod
+    def from_dict(cls, data: dict[str, str]) -> "Message":
+        return cls(
+            id=data["id"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            content=data["content"],
+            role=Role(data["role"]),
+        )
+
+
+def message_to_dict(message: MessageProtocol) -> dict[str, str]:
+    return {
+        "id": message.id,
+        "timestamp": message.timestamp.isoformat(),
+        "content": message.content,
+        "role": str(message.role),
+    }
+
 
 @dataclass
 class Conversation(ConversationProtocol):
@@ -62,3 +80,17 @@ class Conversation(ConversationProtocol):
         """Add a message to the conversation history from content."""
         message = Message.from_content(content, role)
         self.add_message(message)
+
+    def to_dict(self) -> dict:
+        """Convert the conversation to JSON-serializable data."""
+        return {
+            "id": self.id,
+            "messages": [message_to_dict(message) for message in self.messages],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Conversation":
+        return cls(
+            id=data["id"],
+            messages=[Message.from_dict(message) for message in data["messages"]],
+        )
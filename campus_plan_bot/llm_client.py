@@ -1,9 +1,12 @@
 import os
 import re
+from collections.abc import Iterator
+from contextlib import contextmanager
 
 from huggingface_hub import AsyncInferenceClient, InferenceClient
 from loguru import logger
 
+from campus_plan_bot import tracing
 from campus_plan_bot.interfaces.interfaces import LLMClient, LLMRequestConfig
 
 INSTITUTE_URL = (
@@ -11,6 +14,27 @@ INSTITUTE_URL = (
 )
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough token count of the Llama 3 tokenizer (about four characters per
+    token), good enough for tracing without loading the tokenizer."""
+    return (len(text) + 3) // 4
+
+
+@contextmanager
+def llm_span(prompt: str, max_new_tokens: int | None) -> Iterator[tracing.Span]:
+    """Trace an LLM call as a child of the component that makes it."""
+    parent = tracing.current_span()
+    attributes = {
+        "llm.component": parent.name if parent else "unknown",
+        "llm.prompt_chars": len(prompt),
+        "llm.prompt_tokens": estimate_tokens(prompt),
+    }
+    if max_new_tokens is not None:
+        attributes["llm.max_new_tokens"] = max_new_tokens
+    with tracing.span("llm.generate", attributes) as span:
+        yield span
+
+
 class InstituteClient(LLMClient):
     """A client for the Institute API."""
 
@@ -53,17 +77,22 @@ class InstituteClient(LLMClient):
         return answer
 
     def generate(self, prompt: str, config: LLMRequestConfig) -> str:
-        return self.client.text_generation(
-            prompt=prompt,
-            temperature=config["temperature"],
-            max_new_tokens=config["max_new_tokens"],
-            # return_full_text=True,
-        )
+        with llm_span(prompt, config["max_new_tokens"]) as span:
+            answer = self.client.text_generation(
+                prompt=prompt,
+                temperature=config["temperature"],
+                max_new_tokens=config["max_new_tokens"],
+                # return_full_text=True,
+            )
+            span.set("llm.completion_tokens", estimate_tokens(answer))
+        return answer
 
     async def query_async(self, prompt: str) -> str:
-        answer = await self.async_client.text_generation(
-            prompt=prompt,
-            temperature=self.request_config["temperature"],
-            max_new_tokens=self.request_config["max_new_tokens"],
-        )
+        with llm_span(prompt, self.request_config["max_new_tokens"]) as span:
+            answer = await self.async_client.text_generation(
+                prompt=prompt,
+                temperature=self.request_config["temperature"],
+                max_new_tokens=self.request_config["max_new_tokens"],
+            )
+            span.set("llm.completion_tokens", estimate_tokens(answer))
         return self._process_response(answer)
@@ -0,0 +1,162 @@
+"""Fuzzy matching of building and institute names in transcripts.
+
+ASR splits and misspells names ("Kennst dud ie Cafeteria?"), which neither
+an exact token match nor the embedding model handle reliably. The index
+compares character trigrams of the text with all spaces removed, which is
+robust against wrong word boundaries, and German phonetic codes (Kölner
+Phonetik) of the words, which is robust against misheard letters.
+"""
+
+import math
+import re
+from collections import defaultdict
+from collections.abc import Hashable, Iterable
+from typing import Generic, TypeVar
+
+from campus_plan_bot.bm25 import STOPWORDS
+
+K = TypeVar("K", bound=Hashable)
+
+# shorter phonetic codes are too ambiguous ("Mensa" sounds like "Nanos"),
+# such words and numbers have to match literally
+MIN_CODE_LENGTH = 4
+
+
+def trigrams(text: str) -> set[str]:
+    """The character trigrams of the text, ignoring word boundaries."""
+    text = re.sub(r"[^a-zäöüß0-9]", "", text.lower())
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def cologne_phonetics(word: str) -> str:
+    """The Kölner Phonetik code of a word, equal for similar sounding words
+    (e.g. "Maier" and "Meyer")."""
+    word = word.lower().replace("ß", "s")
+    word = word.replace("ä", "a").replace("ö", "o").replace("ü", "u")
+    word = re.sub(r"[^a-z]", "", word)
+
+    codes = []
+    for i, char in enumerate(word):
+        before = word[i - 1] if i > 0 else ""
+        after = word[i + 1] if i + 1 < len(word) else ""
+        if char in "aeijouy":
+            code = "0"
+        elif char == "h":
+            code = ""
+        elif char == "b":
+            code = "1"
+        elif char == "p":
+            code = "3" if after == "h" else "1"
+        elif char in "dt":
+            code = "8" if after in {"c", "s", "z"} else "2"
+        elif char in "fvw":
+            code = "3"
+        elif char in "gkq":
+            code = "4"
+        elif char == "c":
+            if i == 0:
+                code = "4" if after in set("ahkloqrux") else "8"
+            elif before in {"s", "z"}:
+                code = "8"
+            else:
+                code = "4" if after in set("ahkoqux") else "8"
+        elif char == "x":
+            code = "8" if before in {"c", "k", "q"} else "48"
+        elif char == "l":
+            code = "5"
+        elif char in "mn":
+            code = "6"
+        elif char == "r":
+            code = "7"
+        else:  # s, z
+            code = "8"
+        codes.append(code)
+
+    collapsed = ""
+    for code in "".join(codes):
+        if not collapsed or collapsed[-1] != code:
+            collapsed += code
+    return collapsed[:1] + collapsed[1:].replace("0", "")
+
+
+def phonetic_key(word: str) -> str:
+    code = cologne_phonetics(word)
+    return code if len(code) >= MIN_CODE_LENGTH else word
+
+
+def phonetic_words(text: str, join_pairs: bool = False) -> set[str]:
+    """The phonetic keys of the words of the text, with `join_pairs` also
+    of each two adjacent words, as ASR splits words ("dud ie")."""
+    words = [
+        word
+        for word in re.findall(r"[a-zäöüß0-9]+", text.lower())
+        if word not in STOPWORDS
+    ]
+    if join_pairs:
+        words += [a + b for a, b in zip(words, words[1:])]
+    return {phonetic_key(word) for word in words}
+
+
+class NameIndex(Generic[K]):
+    """Finds the names that occur in a text, allowing for ASR errors.
+
+    A name scores the share of its trigrams (weighted by how rare they are
+    among the names) that occur in the text, or the share of its words that
+    sound like a word of the text, whichever is higher. A key may have
+    several names, it scores with the best one.
+    """
+
+    def __init__(self, names: Iterable[tuple[K, str]]):
+        self.keys: list[K] = []
+        self.name_trigrams: list[set[str]] = []
+        self.name_codes: list[set[str]] = []
+        self.trigram_postings: dict[str, list[int]] = defaultdict(list)
+        self.code_postings: dict[str, list[int]] = defaultdict(list)
+        for key, name in names:
+            name_trigrams = trigrams(name)
+            name_codes = phonetic_words(name)
+            if not name_trigrams:
+                continue
+            for trigram in name_trigrams:
+                self.trigram_postings[trigram].append(len(self.keys))
+            for code in name_codes:
+                self.code_postings[code].append(len(self.keys))
+            self.keys.append(key)
+            self.name_trigrams.append(name_trigrams)
+            self.name_codes.append(name_codes)
+
+        self.idf = {
+            trigram: math.log(1 + len(self.keys) / len(postings))
+            for trigram, postings in self.trigram_postings.items()
+        }
+        self.name_weights = [
+            sum(self.idf[trigram] for trigram in name_trigrams)
+            for name_trigrams in self.name_trigrams
+        ]
+
+    def search(
+        self, text: str, top_k: int = 5, min_score: float = 0.0
+    ) -> list[tuple[K, float]]:
+        """The `top_k` keys whose names match the text best, with scores in
+        [0, 1], best first."""
+        trigram_weights: dict[int, float] = defaultdict(float)
+        for trigram in trigrams(text):
+            for name in self.trigram_postings.get(trigram, ()):
+                trigram_weights[name] += self.idf[trigram]
+        code_matches: dict[int, int] = defaultdict(int)
+        for code in phonetic_words(text, join_pairs=True):
+            for name in self.code_postings.get(code, ()):
+                code_matches[name] += 1
+
+        scores: dict[K, float] = {}
+        for name in trigram_weights.keys() | code_matches.keys():
+            score = trigram_weights.get(name, 0.0) / self.name_weights[name]
+            if self.name_codes[name]:
+                score = max(
+                    score, code_matches.get(name, 0) / len(self.name_codes[name])
+                )
+            key = self.keys[name]
+            if score >= min_score and score > scores.get(key, 0.0):
+                scores[key] = score
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return best[:top_k]
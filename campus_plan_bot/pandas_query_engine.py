@@ -1,17 +1,16 @@
 import ast
 import asyncio
 import os
+from typing import TYPE_CHECKING
 
 import pandas as pd
-from geopy.distance import geodesic
-from llama_index.core.prompts import PromptTemplate
-from llama_index.experimental.query_engine import (
-    PandasQueryEngine as LlamaPandasQueryEngine,
-)
 from loguru import logger
 
 from campus_plan_bot.interfaces.interfaces import RetrievedDocument
 
+if TYPE_CHECKING:
+    from llama_index.core.prompts import PromptTemplate
+
 # This will be dynamically generated inside the class now.
 # CUSTOM_PANDAS_PROMPT_TMPL = ...
 
@@ -43,15 +42,21 @@ class PandasQueryEngine:
             logger.error(f"DataFrame file not found at {df_path}")
             self.df = pd.DataFrame()
 
+        from llama_index.experimental.query_engine import (
+            PandasQueryEngine as LlamaPandasQueryEngine,
+        )
+
         prompt = self._create_dynamic_prompt(self.df)
 
         self.query_engine = LlamaPandasQueryEngine(
             df=self.df, verbose=True, pandas_prompt=prompt
         )
 
-    def _create_dynamic_prompt(self, df: pd.DataFrame) -> PromptTemplate:
+    def _create_dynamic_prompt(self, df: pd.DataFrame) -> "PromptTemplate":
         """Dynamically generates a prompt template with a detailed schema
         description."""
+        from llama_index.core.prompts import PromptTemplate
+
         schema_parts = []
         for column in df.columns:
             unique_count = df[column].nunique()
@@ -92,8 +97,8 @@ Expression: """
 
         return PromptTemplate(tmpl)
 
+    @staticmethod
     def _preprocess_df(
-        self,
         df: pd.DataFrame,
         user_lat: float | None = None,
         user_lon: float | None = None,
@@ -129,6 +134,8 @@ Expression: """
 
         # Calculate distance to user
         if user_lat is not None and user_lon is not None:
+            from geopy.distance import geodesic
+
             user_coords = (user_lat, user_lon)
 
             def calculate_distance(row):
@@ -1,11 +1,14 @@
+import asyncio
+from dataclasses import dataclass
 from pathlib import Path
 
 from loguru import logger
 
+from campus_plan_bot import tracing
 from campus_plan_bot.asr_processing import AsrProcessor
 from campus_plan_bot.bot import SimpleTextBot
 from campus_plan_bot.data_picker import DataPicker
-from campus_plan_bot.interfaces.interfaces import LLMClient
+from campus_plan_bot.interfaces.interfaces import LLMClient, RetrievedDocument
 from campus_plan_bot.interfaces.persistence_types import PipelineResult
 from campus_plan_bot.link_extractor import (
     extract_google_maps_link,
@@ -17,6 +20,21 @@ from campus_plan_bot.prompts.util import load_and_format_prompt
 from campus_plan_bot.query_rewriter import QuestionRephraser
 from campus_plan_bot.query_router import QueryRouter, QueryType
 from campus_plan_bot.rag import RAG
+from campus_plan_bot.spoken_numbers import normalize_numbers
+
+
+@dataclass
+class Speculation:
+    """Context retrieval started ahead of time for a transcript prefix."""
+
+    user_input: str
+    fix_asr: bool
+    task: asyncio.Task[list[RetrievedDocument]]
+
+    def matches(self, user_input: str, fix_asr: bool) -> bool:
+        return self.fix_asr == fix_asr and " ".join(
+            self.user_input.split()
+        ) == " ".join(user_input.split())
 
 
 class Pipeline:
@@ -50,6 +68,8 @@ class Pipeline:
             logger.error(f"Error initializing PandasQueryEngine: {e}")
             self.pandas_query_engine = None  # type: ignore[assignment]
 
+        self.speculation: Speculation | None = None
+
     @classmethod
     def from_system_prompt(cls, llm_client: LLMClient | None = None, **kwargs):
         system_prompt = load_and_format_prompt("system_prompt")
@@ -62,33 +82,144 @@ class Pipeline:
         rag = RAG.from_file(database_path, persist_dir=embeddings_dir)
         return cls.from_system_prompt(rag=rag, **kwargs)
 
-    async def run(self, user_input: str, fix_asr: bool = False) -> PipelineResult:
-        # Step 1: fix ASR errors
-        fixed_input = await self.asr_processor.fix_asr(user_input) if fix_asr else ""
+    def speculate(self, user_input: str, fix_asr: bool = False) -> None:
+        """Start retrieving context for a (partial) input in the background.
+
+        A later call to `run` with the same input reuses the result, any
+        other input cancels the speculation. Only stateless steps are
+        executed speculatively, the conversation history is untouched.
+        """
+        if self.speculation is not None:
+            if self.speculation.matches(user_input, fix_asr):
+                return
+            self.speculation.task.cancel()
+
+        logger.debug(f"Speculatively retrieving context for: {user_input}")
+        self.speculation = Speculation(
+            user_input=user_input,
+            fix_asr=fix_asr,
+            task=asyncio.create_task(self._speculative_retrieval(user_input, fix_asr)),
+        )
+
+    def cancel_speculation(self) -> None:
+        """Stop a pending speculation whose input will not be run."""
+        speculation, self.speculation = self.speculation, None
+        if speculation is not None:
+            speculation.task.cancel()
+
+    async def _speculative_retrieval(
+        self, user_input: str, fix_asr: bool
+    ) -> list[RetrievedDocument]:
+        with tracing.span("pipeline.speculate", {"input.chars": len(user_input)}):
+            return await self.retrieve_documents(user_input, fix_asr)
+
+    async def _take_speculation(
+        self, user_input: str, fix_asr: bool
+    ) -> list[RetrievedDocument] | None:
+        """Return the speculated documents if they were computed for this
+        input."""
+        speculation, self.speculation = self.speculation, None
+        if speculation is None:
+            return None
+        if not speculation.matches(user_input, fix_asr):
+            speculation.task.cancel()
+            return None
+
+        try:
+            documents = await speculation.task
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed, retrying: {e}")
+            return None
+        logger.debug("Reusing speculatively retrieved context.")
+        return documents
+
+    async def retrieve_documents(
+        self, user_input: str, fix_asr: bool = False
+    ) -> list[RetrievedDocument]:
+        # Step 1: fix ASR errors, starting with spoken numbers; the rephraser
+        # and the data picker still see the original input
+        fixed_input = ""
+        if fix_asr:
+            with tracing.span("pipeline.asr_fix") as span:
+                normalized_input = normalize_numbers(
+                    user_input, self.rag.building_numbers
+                )
+                local_fix = self._fix_asr_locally(normalized_input)
+                span.set("asr_fix.local", local_fix is not None)
+                if local_fix is None:
+                    fixed_input = await self.asr_processor.fix_asr(normalized_input)
+                else:
+                    fixed_input = local_fix
 
         # Step 2: rephraser the question
-        rephrased_input = await self.rephraser.rephrase(
-            conversation=self.bot.conversation_history, query=user_input
-        )
+        with tracing.span("pipeline.rephrase"):
+            rephrased_input = await self.rephraser.rephrase(
+                conversation=self.bot.conversation_history, query=user_input
+            )
         logger.info(f"Rephrased input: {rephrased_input}")
 
         # Step 3: Classify the query
-        query_type = await self.query_router.classify_query(rephrased_input, user_input)
+        with tracing.span("pipeline.route") as span:
+            query_type = await self.query_router.classify_query(
+                rephrased_input, user_input
+            )
+            span.set("query.type", str(query_type))
 
         # Step 4: Retrieve context based on query type
         if self.pandas_query_engine and query_type == QueryType.COMPLEX:
             # Use Pandas Query Engine for complex queries
-            documents = await self.pandas_query_engine.query_df(rephrased_input)
+            with tracing.span("pipeline.retrieve", {"retriever": "pandas"}) as span:
+                documents = await self.pandas_query_engine.query_df(rephrased_input)
+                span.set("documents.count", len(documents))
         else:
-            # Use RAG for normal queries
-            documents = self.rag.retrieve_context(
-                rephrased_input + " " + fixed_input, limit=5
-            )
-            documents = await self.data_picker.choose_fields(user_input, documents)
+            # Use RAG for normal queries, off the event loop as the models
+            # block while they run
+            with tracing.span("pipeline.retrieve", {"retriever": "rag"}) as span:
+                documents = await asyncio.to_thread(
+                    self.rag.retrieve_context,
+                    rephrased_input + " " + fixed_input,
+                    limit=5,
+                )
+                span.set("documents.count", len(documents))
+            with tracing.span("pipeline.data_picker"):
+                documents = await self.data_picker.choose_fields(user_input, documents)
+
+        return documents
+
+    def _fix_asr_locally(self, user_input: str) -> str | None:
+        """Fix the (number-normalized) input without the LLM. Returns the
+        building numbers of the input, or None if the RAG cannot resolve it
+        with certainty."""
+        if not self.rag.resolves_locally(user_input):
+            return None
+        return " ".join(self.rag.find_building_numbers(user_input))
+
+    async def run(self, user_input: str, fix_asr: bool = False) -> PipelineResult:
+        with tracing.span(
+            "pipeline.run", {"input.chars": len(user_input), "fix_asr": fix_asr}
+        ) as span:
+            result = await self._run(user_input, fix_asr)
+            span.set("response.has_link", result.link is not None)
+            return result
+
+    async def _run(self, user_input: str, fix_asr: bool) -> PipelineResult:
+        # Steps 1-4: fix ASR errors, rephrase, classify, retrieve context
+        speculated = self.speculation is not None
+        documents = await self._take_speculation(user_input, fix_asr)
+        if speculated:
+            tracing.set_attributes({"speculation.hit": documents is not None})
+        if documents is None:
+            documents = await self.retrieve_documents(user_input, fix_asr)
 
         # Step 5: generate an answer to the query
-        response = await self.bot.query(user_input, documents)
+        with tracing.span("pipeline.generate", {"documents.count": len(documents)}):
+            response = await self.bot.query(user_input, documents)
+
+        with tracing.span("pipeline.link_extraction"):
+            return self._extract_links(response)
 
+    @staticmethod
+    def _extract_links(response: str) -> PipelineResult:
         # Step 6: check for links in the response
         link_extraction_result = extract_google_maps_link(response)
         if link_extraction_result:
@@ -1,24 +1,138 @@
+import os
 import re
 from copy import copy
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
-from llama_index.core import (
-    Document,
-    Settings,
-    StorageContext,
-    VectorStoreIndex,
-    load_index_from_storage,
-)
-from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from loguru import logger
-from sentence_transformers import CrossEncoder
 
+from campus_plan_bot import tracing
+from campus_plan_bot.bm25 import BM25Index, reciprocal_rank_fusion
+from campus_plan_bot.cache import EmbeddingCache, LRUCache, content_hash
 from campus_plan_bot.interfaces.interfaces import (
     RAGComponent,
     RetrievedDocument,
 )
+from campus_plan_bot.name_index import NameIndex
+from campus_plan_bot.spoken_numbers import BUILDING_CONTEXT_PATTERN
+
+# llama_index and sentence_transformers import torch and transformers, which
+# takes many seconds, so they are only imported when a RAG is created
+if TYPE_CHECKING:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.core.schema import BaseNode, NodeWithScore
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    from sentence_transformers import CrossEncoder
+
+# Directory with local copies of the models, written by download_models.py,
+# which load without contacting the Hugging Face hub
+MODEL_SNAPSHOT_DIR = os.getenv("MODEL_SNAPSHOT_DIR")
+
+# Inference backend of the reranker: "torch", "onnx" (ONNX Runtime) or
+# "onnx-int8" (ONNX Runtime with dynamically quantized weights, exported by
+# download_models.py --onnx). The embedding model always runs on torch, its
+# nomic-bert architecture is remote code that optimum cannot export.
+RAG_BACKEND = os.getenv("RAG_BACKEND", "torch")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_FILES = {"onnx": "onnx/model.onnx", "onnx-int8": "onnx/model_qint8_avx2.onnx"}
+
+# Setting RAG_EMBEDDING_CACHE to a directory keeps the query embeddings
+# across restarts, in addition to the in-memory LRU cache
+RAG_EMBEDDING_CACHE = os.getenv("RAG_EMBEDDING_CACHE")
+RESULT_CACHE_SIZE = 1024
+RESULT_CACHE_TTL = 24 * 60 * 60
+PAIR_SCORE_CACHE_SIZE = 32768
+
+# data version, retrieval settings, query, ASR-fixed query and limit
+ResultKey = tuple[str, tuple[str, bool, bool, float], str, str, int]
+# hash of the normalized query and ID of the node
+PairKey = tuple[str, str]
+
+# columns of the lexical (BM25) index, which is fused with the vector search
+LEXICAL_FIELDS = ("name", "identifikator", "old_identifikator", "fakten")
+# candidates per requested document that the cross encoder scores; exact
+# token matches found by BM25 need fewer candidates than dense search alone
+RERANK_MULTIPLIER = 3
+HYBRID_RERANK_MULTIPLIER = 2
+# the cross encoder is skipped if the best vector search result is more
+# similar to the query than the second best by this margin (in cosine
+# similarity), tune it with eval/rag_backends.py --decisive-margin
+DECISIVE_MARGIN = float(os.getenv("RAG_DECISIVE_MARGIN", "0.1"))
+# candidates added per step of the progressive reranking
+RERANK_STEP = 2
+
+# building numbers of type 50.34 (1-2 numbers).(1-2 numbers) or 303
+BUILDING_NUMBER_PATTERN = r"(\d{1,2}\.\d{1,2}|\d{3,4})"
+# names that match at least this well are considered found
+NAME_MATCH_THRESHOLD = 0.9
+NUMBER_PATTERN = r"\d+(?:[.,]\d+)*"
+
+WARM_UP_QUERIES = [
+    "Wo ist die Mensa?",
+    "Wann hat die Bibliothek geöffnet?",
+    "Wo befindet sich das Gebäude 50.34?",
+    "Wie komme ich zum Audimax?",
+]
+
+
+def snapshot_path(snapshot_dir: str | Path, model_name: str) -> Path:
+    return Path(snapshot_dir) / model_name.replace("/", "--")
+
+
+def backend_kwargs(backend: str) -> dict:
+    """Keyword arguments that make sentence-transformers use a backend."""
+    if backend == "torch":
+        return {}
+    if backend in ONNX_FILES:
+        try:
+            import optimum.onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                f"RAG_BACKEND={backend} needs optimum[onnxruntime]: {e}"
+            ) from e
+    if backend == "onnx":
+        return {"backend": "onnx"}
+    if backend == "onnx-int8":
+        return {"backend": "onnx", "model_kwargs": {"file_name": ONNX_FILES[backend]}}
+    raise ValueError(f"Unknown RAG backend {backend!r}, choose from {BACKENDS}.")
+
+
+def _words(text: str) -> str:
+    """The lowercased words of a text, separated by single spaces."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+@dataclass
+class RerankStats:
+    """How much work the adaptive reranking saved."""
+
+    queries: int = 0
+    skipped: int = 0
+    candidates: int = 0
+    scored: int = 0
+
+    def record(self, candidates: int, scored: int) -> None:
+        self.queries += 1
+        self.skipped += scored == 0
+        self.candidates += candidates
+        self.scored += scored
+
+    @property
+    def saved(self) -> float:
+        """Share of the candidates that were not scored."""
+        return 1 - self.scored / self.candidates if self.candidates else 0.0
+
+
+def default_caches() -> dict:
+    """The caches of a RAG created by the factory methods."""
+    return {
+        "embedding_cache": EmbeddingCache(directory=RAG_EMBEDDING_CACHE),
+        "result_cache": LRUCache(RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL),
+        "pair_score_cache": LRUCache(PAIR_SCORE_CACHE_SIZE),
+    }
 
 
 class RAG(RAGComponent):
@@ -27,16 +141,199 @@ class RAG(RAGComponent):
 
     def __init__(
         self,
-        index: VectorStoreIndex,
+        index: "VectorStoreIndex",
         database: pd.DataFrame,
         id_column_name: str = "identifikator",
+        reranker: "CrossEncoder | None" = None,
+        backend: str | None = None,
+        embedding_cache: EmbeddingCache | None = None,
+        result_cache: "LRUCache[ResultKey, list[RetrievedDocument]] | None" = None,
+        pair_score_cache: "LRUCache[PairKey, float] | None" = None,
+        hybrid: bool = True,
+        adaptive_rerank: bool = True,
+        decisive_margin: float = DECISIVE_MARGIN,
     ):
-        self.index = index
-        self.database = database
+        self._index = index
+        self._database = database
         self.id_column_name = id_column_name
-        self.reranker = CrossEncoder(self.RERANKER_MODEL)
+        self._update_data_version()
+        self.backend = backend or RAG_BACKEND
+        self._reranker = reranker
+        self.embedding_cache = embedding_cache
+        self.result_cache = result_cache
+        self.pair_score_cache = pair_score_cache
+        self.hybrid = hybrid
+        self.adaptive_rerank = adaptive_rerank
+        self.decisive_margin = decisive_margin
+        self.rerank_stats = RerankStats()
         logger.debug("LlamaIndex RAG initialized.")
 
+    @property
+    def index(self) -> "VectorStoreIndex":
+        return self._index
+
+    @index.setter
+    def index(self, index: "VectorStoreIndex") -> None:
+        self._index = index
+        self._update_data_version()
+
+    @property
+    def database(self) -> pd.DataFrame:
+        return self._database
+
+    @database.setter
+    def database(self, database: pd.DataFrame) -> None:
+        self._database = database
+        self._update_data_version()
+
+    def _update_data_version(self) -> None:
+        """Fingerprint the database and the index, which is part of the keys
+        of cached results, so that results of other data never match."""
+        rows = pd.util.hash_pandas_object(self._database, index=True)
+        index_id = getattr(self._index, "index_id", "")
+        self.data_version = content_hash(rows.values.tobytes() + index_id.encode())
+        self._lexical_index: BM25Index[str] | None = None
+        self._nodes: dict[str, BaseNode] = {}
+        self._name_index: NameIndex[int] | None = None
+        ids = self._database[self.id_column_name].astype(str)
+        self.building_numbers = set(ids[ids.str.fullmatch(BUILDING_NUMBER_PATTERN)])
+
+    @property
+    def lexical_index(self) -> BM25Index[str]:
+        """BM25 index over the nodes of the vector index, built on first use."""
+        if self._lexical_index is None:
+            # the docstore deserializes the nodes on every access
+            self._nodes = self.index.docstore.docs
+            self._lexical_index = BM25Index(
+                (node_id, self._lexical_text(node.metadata))
+                for node_id, node in self._nodes.items()
+            )
+        return self._lexical_index
+
+    @property
+    def name_index(self) -> NameIndex[int]:
+        """Fuzzy index over the names and (non-numeric) identifiers of the
+        database rows, built on first use."""
+        if self._name_index is None:
+            names = []
+            for position, (identifikator, name) in enumerate(
+                zip(self.database[self.id_column_name], self.database["name"])
+            ):
+                if isinstance(name, str) and name:
+                    names.append((position, name))
+                if re.search(r"[^\W\d]{3}", str(identifikator)):
+                    names.append((position, str(identifikator)))
+            self._name_index = NameIndex(names)
+        return self._name_index
+
+    def find_building_numbers(self, text: str) -> list[str]:
+        return list(dict.fromkeys(re.findall(BUILDING_NUMBER_PATTERN, text)))
+
+    def resolves_locally(self, text: str) -> bool:
+        """Whether the text refers to known buildings without doubt: all its
+        numbers follow a building word ("Gebäude 50.34") and are building
+        numbers of the database, or it contains a name of the database
+        verbatim. Fuzzy name matches are left to the LLM."""
+        numbers = re.findall(NUMBER_PATTERN, text)
+        if numbers:
+            in_context = re.findall(
+                BUILDING_CONTEXT_PATTERN + f"({NUMBER_PATTERN})", text, re.IGNORECASE
+            )
+            return len(in_context) == len(numbers) and all(
+                number in self.building_numbers for number in numbers
+            )
+        words = f" {_words(text)} "
+        return any(
+            self._row_name_occurs(position, words)
+            for position, _ in self.name_index.search(text, 5, NAME_MATCH_THRESHOLD)
+        )
+
+    def _row_name_occurs(self, position: int, words: str) -> bool:
+        """Whether the name or identifier of a row occurs in the words."""
+        row = self.database.iloc[position]
+        for name in (row["name"], row[self.id_column_name]):
+            name_words = _words(name) if isinstance(name, str) else ""
+            if name_words and f" {name_words} " in words:
+                return True
+        return False
+
+    @staticmethod
+    def _lexical_text(metadata: dict) -> str:
+        return " ".join(
+            str(metadata[field])
+            for field in LEXICAL_FIELDS
+            if field in metadata and not pd.isna(metadata[field])
+        )
+
+    @property
+    def reranker(self) -> "CrossEncoder":
+        """The cross encoder, loaded on first use."""
+        if self._reranker is None:
+            self._reranker = self.load_reranker(self.backend)
+        return self._reranker
+
+    @classmethod
+    def load_embed_model(cls, backend: str = "torch") -> "HuggingFaceEmbedding":
+        """Load the embedding model, from the snapshot if one is configured."""
+        if backend != "torch":
+            raise ValueError(
+                f"{cls.MODEL} only runs on torch, its nomic-bert architecture "
+                f"cannot be exported to ONNX; {backend} applies to the reranker."
+            )
+
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        from llama_index.embeddings.huggingface.utils import (
+            get_query_instruct_for_model_name,
+            get_text_instruct_for_model_name,
+        )
+
+        if MODEL_SNAPSHOT_DIR is None:
+            return HuggingFaceEmbedding(model_name=cls.MODEL, trust_remote_code=True)
+        # the instructions are looked up by model name, not by path
+        return HuggingFaceEmbedding(
+            model_name=str(snapshot_path(MODEL_SNAPSHOT_DIR, cls.MODEL)),
+            query_instruction=get_query_instruct_for_model_name(cls.MODEL),
+            text_instruction=get_text_instruct_for_model_name(cls.MODEL),
+            trust_remote_code=True,
+        )
+
+    @classmethod
+    def has_reranker_export(cls, backend: str) -> bool:
+        """Whether the snapshot contains the reranker exported for a backend."""
+        if backend not in ONNX_FILES:
+            return True
+        return (
+            MODEL_SNAPSHOT_DIR is not None
+            and (
+                snapshot_path(MODEL_SNAPSHOT_DIR, cls.RERANKER_MODEL)
+                / ONNX_FILES[backend]
+            ).exists()
+        )
+
+    @classmethod
+    def load_reranker(cls, backend: str | None = None) -> "CrossEncoder":
+        """Load the cross encoder, from the snapshot if one is configured."""
+        from sentence_transformers import CrossEncoder
+
+        kwargs = backend_kwargs(backend or RAG_BACKEND)
+        if MODEL_SNAPSHOT_DIR is None:
+            return CrossEncoder(cls.RERANKER_MODEL, **kwargs)
+        return CrossEncoder(
+            str(snapshot_path(MODEL_SNAPSHOT_DIR, cls.RERANKER_MODEL)), **kwargs
+        )
+
+    def warm_up(self) -> None:
+        """Run a few queries through the models, so that lazy initialization
+        does not slow down the first users."""
+        self.name_index
+        if self.hybrid:
+            self.lexical_index
+        for query in WARM_UP_QUERIES:
+            query = self._normalize_text(query)
+            nodes = self._vector_search(query, self._embed_query(query), top_k=15)
+            if nodes:
+                self._rerank(query, nodes)
+
     @classmethod
     def _normalize_text(cls, text: str) -> str:
         """Normalize text by replacing special characters with spaces."""
@@ -48,10 +345,11 @@ class RAG(RAGComponent):
         file_path: Path,
         id_column_name: str = "identifikator",
         persist_dir: Path | None = None,
+        backend: str | None = None,
     ) -> "RAG":
         """Create a RAG instance from a file."""
         df = pd.read_csv(file_path)
-        return cls.from_df(df, id_column_name, persist_dir=persist_dir)
+        return cls.from_df(df, id_column_name, persist_dir=persist_dir, backend=backend)
 
     @classmethod
     def from_df(
@@ -59,10 +357,13 @@ class RAG(RAGComponent):
         df: pd.DataFrame,
         id_column_name: str = "identifikator",
         persist_dir: Path | None = None,
+        backend: str | None = None,
     ) -> "RAG":
         """Create a RAG instance from a DataFrame."""
         if persist_dir and persist_dir.exists():
-            return cls.from_persisted(df, persist_dir, id_column_name)
+            return cls.from_persisted(df, persist_dir, id_column_name, backend=backend)
+
+        from llama_index.core import Document, Settings, VectorStoreIndex
 
         documents = []
         # Ensure 'name' column exists and fill NaN with empty strings
@@ -87,9 +388,7 @@ class RAG(RAGComponent):
             documents.append(doc)
 
         logger.debug(f"Creating {len(documents)} embeddings")
-        Settings.embed_model = HuggingFaceEmbedding(
-            model_name=cls.MODEL, trust_remote_code=True
-        )
+        Settings.embed_model = cls.load_embed_model()
         index = VectorStoreIndex.from_documents(
             documents,
         )
@@ -98,30 +397,42 @@ class RAG(RAGComponent):
             logger.debug(f"Persisting index to {persist_dir}")
             persist_dir.mkdir(parents=True, exist_ok=True)
             index.storage_context.persist(persist_dir=str(persist_dir))
-        return cls(index, df, id_column_name)
+        return cls(index, df, id_column_name, backend=backend, **default_caches())
 
     @classmethod
     def from_persisted(
-        cls, df: pd.DataFrame, persist_dir: Path, id_column_name: str = "identifikator"
+        cls,
+        df: pd.DataFrame,
+        persist_dir: Path,
+        id_column_name: str = "identifikator",
+        backend: str | None = None,
     ) -> "RAG":
         """Load a RAG instance from a persisted index."""
-        logger.debug(f"Loading index from {persist_dir}")
-        Settings.embed_model = HuggingFaceEmbedding(
-            model_name=cls.MODEL, trust_remote_code=True
+        from llama_index.core import (
+            Settings,
+            StorageContext,
+            load_index_from_storage,
         )
+
+        logger.debug(f"Loading index from {persist_dir}")
+        Settings.embed_model = cls.load_embed_model()
         storage_context = StorageContext.from_defaults(persist_dir=str(persist_dir))
         index = load_index_from_storage(storage_context)
         logger.debug("Index loaded.")
-        return cls(index, df, id_column_name)  # type: ignore[arg-type]
+        return cls(
+            index,  # type: ignore[arg-type]
+            df,
+            id_column_name,
+            backend=backend,
+            **default_caches(),
+        )
 
     def _retrieve_by_building_number(
         self, query: str, limit: int = 5, asr_fixed_query: str = ""
     ) -> list[RetrievedDocument]:
         """Retrieve documents by direct building number match."""
 
-        query = query + " " + asr_fixed_query
-        pattern = r"(\d{1,2}\.\d{1,2}|\d{3,4})"
-        building_numbers = list(set(re.findall(pattern, query)))
+        building_numbers = self.find_building_numbers(query + " " + asr_fixed_query)
         if not building_numbers:
             return []
 
@@ -154,42 +465,96 @@ class RAG(RAGComponent):
         )
         return documents[:limit]
 
+    def _retrieve_by_name(
+        self, query: str, existing_document_ids: set[str], limit: int = 5
+    ) -> list[RetrievedDocument]:
+        """Retrieve documents whose name occurs in the query, allowing for
+        ASR errors."""
+        if len(existing_document_ids) >= limit:
+            return []
+
+        matches = self.name_index.search(
+            query, limit + len(existing_document_ids), NAME_MATCH_THRESHOLD
+        )
+        documents = []
+        for position, score in matches:
+            row = self.database.iloc[position]
+            if row[self.id_column_name] in existing_document_ids:
+                continue
+            documents.append(
+                RetrievedDocument(
+                    id=row[self.id_column_name],
+                    data=row.to_dict(),
+                    relevance_score=round(score, 3),
+                )
+            )
+        logger.debug(f"Found {len(documents)} documents by their name.")
+        return documents[: limit - len(existing_document_ids)]
+
     def _retrieve_by_similarity(
         self,
         query: str,
         existing_document_ids: set[str],
         limit: int = 5,
-        rerank_multiplier: int = 3,
+        rerank_multiplier: int = RERANK_MULTIPLIER,
     ) -> list[RetrievedDocument]:
-        """Retrieve documents by cosine similarity and reranking."""
+        """Retrieve documents by cosine similarity, fused with BM25 if the RAG
+        is hybrid, and reranking."""
         existing_document_ids = copy(existing_document_ids)
 
         if len(existing_document_ids) >= limit:
             return []
 
         normalized_query = self._normalize_text(query)
-        retriever = VectorIndexRetriever(
-            index=self.index,
-            similarity_top_k=limit
-            * rerank_multiplier,  # retrieve more documents for reranking
-        )
-        nodes = retriever.retrieve(normalized_query)
+        with tracing.span("rag.embed"):
+            embedding = self._embed_query(normalized_query)
+        # retrieve more documents for reranking
+        top_k = limit * rerank_multiplier
+        with tracing.span("rag.vector_search", {"top_k": top_k}):
+            dense_nodes = self._vector_search(normalized_query, embedding, top_k=top_k)
+        nodes = dense_nodes
+        if self.hybrid:
+            with tracing.span("rag.lexical_search", {"top_k": top_k}):
+                lexical_nodes = self._lexical_search(normalized_query, top_k=top_k)
+            nodes = self._fuse(dense_nodes, lexical_nodes)[:top_k]
+        nodes = [
+            node
+            for node in nodes
+            if node.metadata[self.id_column_name] not in existing_document_ids
+        ]
 
         # Rerank the retrieved documents
         if not nodes:
             return []
-
-        pairs = [(normalized_query, node.get_content()) for node in nodes]
-        scores = self.reranker.predict(pairs)
-
-        # Combine nodes with their new scores and sort
-        reranked_nodes = sorted(zip(nodes, scores), key=lambda x: x[1], reverse=True)
-
+        with tracing.span("rag.rerank", {"candidates": len(nodes)}) as span:
+            if self.adaptive_rerank:
+                reranked_nodes = self._rerank_adaptively(
+                    normalized_query, nodes, dense_nodes, limit
+                )
+                scored = sum(score is not None for _, score in reranked_nodes)
+            else:
+                reranked_nodes = self._rerank(normalized_query, nodes)
+                scored = len(nodes)
+            span.set("scored", scored)
+            self.rerank_stats.record(len(nodes), scored)
+
+        # if the cross encoder was skipped, the nodes keep their cosine
+        # similarity, not their fused rank score (nodes only BM25 found get
+        # 0); otherwise the unscored nodes follow the scored ones and get the
+        # lowest cross encoder score, so that all scores are on one scale
+        dense_scores = {node.node.node_id: node.score for node in dense_nodes}
+        lowest_score = min(
+            (score for _, score in reranked_nodes if score is not None), default=None
+        )
         documents = []
         for node, score in reranked_nodes:
             doc_id = node.metadata[self.id_column_name]
             if doc_id in existing_document_ids:
                 continue
+            if score is None:
+                score = lowest_score
+            if score is None:
+                score = dense_scores.get(node.node.node_id) or 0.0
             documents.append(
                 RetrievedDocument(
                     id=doc_id,
@@ -204,27 +569,181 @@ class RAG(RAGComponent):
         )
         return documents[:limit]
 
+    def _embed_query(self, normalized_query: str) -> list[float]:
+        """Embed the query with the model of the index, unless the embedding
+        is cached."""
+        embed_model = self.index._embed_model
+        if self.embedding_cache is None:
+            return embed_model.get_query_embedding(normalized_query)
+
+        embedding = self.embedding_cache.get(self.MODEL, normalized_query)
+        tracing.set_attributes({"cache.hit": embedding is not None})
+        if embedding is None:
+            embedding = np.asarray(
+                embed_model.get_query_embedding(normalized_query), dtype=np.float32
+            )
+            self.embedding_cache.put(self.MODEL, normalized_query, embedding)
+        return embedding.tolist()
+
+    def _vector_search(
+        self, normalized_query: str, embedding: list[float], top_k: int
+    ) -> list["NodeWithScore"]:
+        """Find the top_k documents closest to the query embedding."""
+        from llama_index.core import QueryBundle
+        from llama_index.core.retrievers import VectorIndexRetriever
+
+        retriever = VectorIndexRetriever(index=self.index, similarity_top_k=top_k)
+        return retriever.retrieve(
+            QueryBundle(query_str=normalized_query, embedding=embedding)
+        )
+
+    def _lexical_search(
+        self, normalized_query: str, top_k: int
+    ) -> list["NodeWithScore"]:
+        """Find the top_k documents with the highest BM25 score."""
+        from llama_index.core.schema import NodeWithScore
+
+        ranking = self.lexical_index.search(normalized_query, top_k)
+        return [
+            NodeWithScore(node=self._nodes[node_id], score=score)
+            for node_id, score in ranking
+        ]
+
+    @staticmethod
+    def _fuse(*rankings: list["NodeWithScore"]) -> list["NodeWithScore"]:
+        """Merge rankings of nodes with reciprocal rank fusion."""
+        from llama_index.core.schema import NodeWithScore
+
+        nodes = {
+            node.node.node_id: node.node for ranking in rankings for node in ranking
+        }
+        fused = reciprocal_rank_fusion(
+            [[node.node.node_id for node in ranking] for ranking in rankings]
+        )
+        return [
+            NodeWithScore(node=nodes[node_id], score=score) for node_id, score in fused
+        ]
+
+    def _rerank(
+        self, normalized_query: str, nodes: list["NodeWithScore"]
+    ) -> list[tuple["NodeWithScore", float]]:
+        """Score the nodes with the cross encoder, best first. Scores of
+        pairs that were scored before are taken from the cache."""
+        if self.pair_score_cache is None:
+            pairs = [(normalized_query, node.get_content()) for node in nodes]
+            scores = list(self.reranker.predict(pairs))
+        else:
+            query_hash = content_hash(normalized_query.encode())
+            keys = [(query_hash, node.node.node_id) for node in nodes]
+            cached = [self.pair_score_cache.get(key) for key in keys]
+            missing = [i for i, score in enumerate(cached) if score is None]
+            tracing.set_attributes({"pair_cache.hits": len(nodes) - len(missing)})
+            computed: dict[int, float] = {}
+            if missing:
+                pairs = [(normalized_query, nodes[i].get_content()) for i in missing]
+                for i, score in zip(missing, self.reranker.predict(pairs)):
+                    computed[i] = float(score)
+                    self.pair_score_cache.put(keys[i], computed[i])
+            scores = [
+                computed[i] if score is None else score
+                for i, score in enumerate(cached)
+            ]
+        return sorted(zip(nodes, scores), key=lambda x: x[1], reverse=True)
+
+    def _rerank_adaptively(
+        self,
+        normalized_query: str,
+        nodes: list["NodeWithScore"],
+        dense_nodes: list["NodeWithScore"],
+        limit: int,
+    ) -> list[tuple["NodeWithScore", float | None]]:
+        """Score only as many nodes with the cross encoder as needed, best
+        first, followed by the unscored nodes (with a score of None).
+
+        If the best vector search result is decisively more similar to the
+        query than the others and also the first candidate, the cross
+        encoder is skipped. Otherwise the first `limit` candidates are scored
+        and more are added in small steps, until a step does not change the
+        best `limit` nodes.
+        """
+        if (
+            len(dense_nodes) > 1
+            and (dense_nodes[0].score or 0.0) - (dense_nodes[1].score or 0.0)
+            >= self.decisive_margin
+            and nodes[0].node.node_id == dense_nodes[0].node.node_id
+        ):
+            return [(node, None) for node in nodes]
+
+        scored = self._rerank(normalized_query, nodes[:limit])
+        end = limit
+        while end < len(nodes):
+            best = {node.node.node_id for node, _ in scored[:limit]}
+            scored = sorted(
+                scored + self._rerank(normalized_query, nodes[end : end + RERANK_STEP]),
+                key=lambda x: x[1],
+                reverse=True,
+            )
+            end += RERANK_STEP
+            if {node.node.node_id for node, _ in scored[:limit]} == best:
+                break
+        return [*scored, *[(node, None) for node in nodes[end:]]]
+
     def retrieve_context(
         self, query: str, limit: int = 5, asr_fixed_query: str = ""
     ) -> list[RetrievedDocument]:
         """Retrieve relevant context based on a query string."""
+        if self.result_cache is None:
+            return self._retrieve_context(query, limit, asr_fixed_query)
+
+        # the settings can be changed on a live instance, e.g. by the evals
+        settings = (
+            self.backend,
+            self.hybrid,
+            self.adaptive_rerank,
+            self.decisive_margin,
+        )
+        key = (self.data_version, settings, query, asr_fixed_query, limit)
+        documents = self.result_cache.get(key)
+        tracing.set_attributes({"result_cache.hit": documents is not None})
+        if documents is None:
+            documents = self._retrieve_context(query, limit, asr_fixed_query)
+            self.result_cache.put(key, documents)
+        # callers may modify the documents, e.g. the data picker
+        return [copy(document) for document in documents]
+
+    def _retrieve_context(
+        self, query: str, limit: int, asr_fixed_query: str
+    ) -> list[RetrievedDocument]:
         documents: list[RetrievedDocument] = []
 
         # 1. check whether building number of type 50.34 (1-2 numbers).(1-2 numbers) do exactly match
-        documents.extend(
-            self._retrieve_by_building_number(
-                query, limit, asr_fixed_query=asr_fixed_query
+        with tracing.span("rag.building_number") as span:
+            documents.extend(
+                self._retrieve_by_building_number(
+                    query, limit, asr_fixed_query=asr_fixed_query
+                )
             )
-        )
+            span.set("documents.count", len(documents))
+
+        # 2. look for (possibly misrecognized) names of buildings and institutes
+        with tracing.span("rag.name_match") as span:
+            documents.extend(
+                self._retrieve_by_name(
+                    query, set(doc.id for doc in documents), limit=limit
+                )
+            )
+            span.set("documents.count", len(documents))
 
         existing_document_ids = set(doc.id for doc in documents)
-        # 2. if not, use cosine similarity to find the most relevant documents
+        # 3. fill up with the documents found by similarity
         documents.extend(
             self._retrieve_by_similarity(
                 query,
                 existing_document_ids,
                 limit=limit - len(documents),
-                rerank_multiplier=3,
+                rerank_multiplier=(
+                    HYBRID_RERANK_MULTIPLIER if self.hybrid else RERANK_MULTIPLIER
+                ),
             )
         )
 
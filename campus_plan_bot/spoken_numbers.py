@@ -0,0 +1,175 @@
+"""Conversion of spoken German numbers in transcripts to building numbers.
+
+The ASR writes building numbers as words ("Gebäude fünfzig Punkt
+vierunddreißig", "neunhundert eins") or splits them ("50 34", "sieben,
+vier, eins"), which the building number lookup of the RAG does not find.
+Normalizing them locally is much faster than asking the LLM.
+"""
+
+import re
+from collections.abc import Callable, Collection
+
+UNITS = {
+    "null": 0,
+    "eins": 1,
+    "zwei": 2,
+    "drei": 3,
+    "vier": 4,
+    "fünf": 5,
+    "sechs": 6,
+    "sieben": 7,
+    "acht": 8,
+    "neun": 9,
+    "zehn": 10,
+    "elf": 11,
+    "zwölf": 12,
+    "dreizehn": 13,
+    "vierzehn": 14,
+    "fünfzehn": 15,
+    "sechzehn": 16,
+    "siebzehn": 17,
+    "achtzehn": 18,
+    "neunzehn": 19,
+}
+TENS = {
+    "zwanzig": 20,
+    "dreißig": 30,
+    "vierzig": 40,
+    "fünfzig": 50,
+    "sechzig": 60,
+    "siebzig": 70,
+    "achtzig": 80,
+    "neunzig": 90,
+}
+# "ein" is mostly the article, it is only a number in compounds
+COMPOUND_UNITS = {**{word: UNITS[word] for word in list(UNITS)[1:10]}, "ein": 1}
+# "vierunddreißig", also with the ASR dropping letters ("neunddreißig")
+COMPOUND = re.compile(
+    rf"({'|'.join(COMPOUND_UNITS)})u?n?d({'|'.join(TENS)})", re.IGNORECASE
+)
+SCALES = (("tausend", 1000), ("hundert", 100))
+
+NUMBER_WORD = re.compile(r"\b[a-zäöüß]+\b", re.IGNORECASE)
+# joined numbers start with a number from 10 to 99
+JOINED_PAIR = re.compile(r"(zehn|elf|zwölf|zig|ßig|ssig).", re.IGNORECASE)
+# matches neither inside numbers nor building numbers
+START = r"(?<![\d.,])\b"
+END = r"\b(?![.,]?\d)"
+# numbers following these words refer to buildings ("Gebäude 50 34")
+BUILDING_CONTEXT_PATTERN = r"\b(?:gebäude|geb\.|bau)(?:\s*(?:nummer|nr\.?))?\s+"
+BUILDING_CONTEXT = re.compile(BUILDING_CONTEXT_PATTERN + "$", re.IGNORECASE)
+# the ASR writes 9651 as "9.651", which is no building number
+THOUSANDS_SEPARATOR = re.compile(START + r"(\d{1,2})\.(\d{3})" + END)
+# "900 1", "800 und 3", "800-3" and "9600 und 7" are 901, 803, 803 and 9607
+HUNDREDS = re.compile(
+    START + r"([1-9]\d?)00(?:,? und |,? |-)([1-9]\d?)" + END, re.IGNORECASE
+)
+# "0 1" is the leading part of building numbers like 01.12, unless it is part
+# of a longer sequence of single digits ("Raum 1 0 1")
+LEADING_ZERO = re.compile(
+    r"(?<!\d )(?<!\d, )" + START + r"0,? ([1-9])" + END + r"(?!,? \d\b)"
+)
+# digits spoken one by one: "7, 4, 1"
+DIGITS = re.compile(START + r"(\d),? (\d),? (\d)(?:,? (\d))?" + END)
+# "50 Punkt 34", but also "2 Komma 5 Kilometer"
+SPOKEN_DECIMAL = re.compile(
+    START + r"(\d{1,2}) (?:punkt|komma) (\d{1,2})" + END, re.IGNORECASE
+)
+DECIMAL = re.compile(START + r"(\d{1,2})[.,](\d{1,2})" + END)
+# two numbers in a row can be a building number, "10 50" and "30-43" are 10.50
+# and 30.43, but "10-14 Uhr" is no building number
+PAIR = re.compile(START + r"(\d{1,2})(?:,? |-)(\d{2})" + END)
+
+
+def parse_number(word: str) -> int | None:
+    """The value of a number word below 10000, e.g. "vierunddreißig" or
+    "neunhundertfünfzehn"."""
+    word = word.lower().replace("ss", "ß")
+    value = 0
+    for scale_word, scale in SCALES:
+        head, found, tail = word.partition(scale_word)
+        if not found:
+            continue
+        if head and head not in COMPOUND_UNITS:
+            return None
+        value += COMPOUND_UNITS.get(head, 1) * scale
+        word = tail.removeprefix("und")
+    if not word:
+        return value or None
+
+    if word in UNITS:
+        return value + UNITS[word]
+    if word in TENS:
+        return value + TENS[word]
+    if value and word == "ein":
+        return value + 1
+    if compound := COMPOUND.fullmatch(word):
+        return value + COMPOUND_UNITS[compound[1]] + TENS[compound[2]]
+    return None
+
+
+def split_pair(word: str) -> tuple[int, int] | None:
+    """The two numbers of a word the ASR joined, e.g. "dreißigsechzig"."""
+    for i in range(3, len(word) - 2):
+        major, minor = parse_number(word[:i]), parse_number(word[i:])
+        if major is not None and minor is not None and 10 <= min(major, minor):
+            if max(major, minor) < 100:
+                return major, minor
+    return None
+
+
+def _building_number(major: str | int, minor: str | int) -> str:
+    return f"{major:0>2}.{minor:0>2}"
+
+
+def _join_numbers(
+    pattern: re.Pattern,
+    join: Callable[[re.Match], str],
+    text: str,
+    building_numbers: Collection[str],
+) -> str:
+    """Join the numbers matched by the pattern if they follow a building word
+    or the result is a known building number, as times ("11 30"), ranges
+    ("10-14") and counts ("20 30 Leute") look the same."""
+
+    def replace(match: re.Match) -> str:
+        joined = join(match)
+        if joined in building_numbers or BUILDING_CONTEXT.search(
+            text, 0, match.start()
+        ):
+            return joined
+        return match.group()
+
+    return pattern.sub(replace, text)
+
+
+def normalize_numbers(text: str, building_numbers: Collection[str] = ()) -> str:
+    """Replace number words by digits and join the parts of split building
+    numbers ("Gebäude fünfzig vierunddreißig" -> "Gebäude 50.34").
+
+    Split numbers are only joined after a building word or if the result is
+    one of the `building_numbers`."""
+
+    def replace(match: re.Match) -> str:
+        if (number := parse_number(match.group())) is not None:
+            return str(number)
+        if JOINED_PAIR.search(match.group()) and (pair := split_pair(match.group())):
+            return _building_number(*pair)
+        return match.group()
+
+    text = NUMBER_WORD.sub(replace, text)
+    text = _join_numbers(
+        THOUSANDS_SEPARATOR, lambda m: m[1] + m[2], text, building_numbers
+    )
+    text = _join_numbers(
+        HUNDREDS, lambda m: str(int(m[1]) * 100 + int(m[2])), text, building_numbers
+    )
+    text = _join_numbers(
+        DIGITS, lambda m: "".join(d for d in m.groups() if d), text, building_numbers
+    )
+    text = LEADING_ZERO.sub(r"0\1", text)
+    for pattern in (SPOKEN_DECIMAL, DECIMAL, PAIR):
+        text = _join_numbers(
+            pattern, lambda m: _building_number(m[1], m[2]), text, building_numbers
+        )
+    return text
@@ -1,28 +1,46 @@
+import os
 import subprocess
-import time
+import tempfile
+from threading import Thread
 from typing import Any, Optional, cast
 
 from campus_plan_bot.streamadapter.input_stream_adapter import BaseAdapter
+from campus_plan_bot.streamadapter.rate_control import FileRatePolicy, LiveRatePolicy
+
+# MP4/M4A/MOV files start with an "ftyp" box; their index (moov atom) may be
+# at the end of the file (e.g. Safari's MediaRecorder), which ffmpeg can only
+# read from a seekable input
+SEEKABLE_SIGNATURES = (b"ftyp",)
 
 
 class FfmpegStream(BaseAdapter):
     def __init__(self, **kwargs) -> None:
         """Requires named parameter pre_input and post_output, volume,
-        repeat_input."""
+        repeat_input.
+
+        Without an explicit rate_policy, files are sent as fast as
+        possible and inputs with an ffmpeg_speed are paced to the wall
+        clock.
+        """
         if "pre_input" not in kwargs or kwargs["pre_input"] is None:
             kwargs["pre_input"] = ""
         if "post_input" not in kwargs or kwargs["post_input"] is None:
             kwargs["post_input"] = ""
         self._process: Optional[subprocess.Popen] = None
         self.url: Optional[str] = None
+        self._input_data: Optional[bytes] = None
+        self._temp_path: Optional[str] = None
         self.pre_opt: list[str] = kwargs["pre_input"].split()
         self.post_opt: list[str] = kwargs["post_input"].split()
         self.volume: float = kwargs["volume"]
         self.repeat_input: bool = kwargs["repeat_input"]
-        super().__init__(format=None)
-
         self.speed = kwargs["ffmpeg_speed"] if "ffmpeg_speed" in kwargs else -1.0
 
+        rate_policy = kwargs.get("rate_policy") or (
+            LiveRatePolicy(speed=self.speed) if self.speed != -1.0 else FileRatePolicy()
+        )
+        super().__init__(format=None, rate_policy=rate_policy)
+
     def available(self) -> bool:
         import shutil
 
@@ -36,9 +54,7 @@ class FfmpegStream(BaseAdapter):
             print("URL is None")
             raise ValueError("self.url must be a valid string.")
         if self._process is None:
-            self.start_time = time.time()
-            self.seconds_returned: float = 0
-            self.chunk_size = 2 * 960 if self.speed != -1.0 else 167 * 2 * 960
+            self.rate_policy.start(bytes_per_second=2 * self.rate)
 
             args: list[str] = [
                 "ffmpeg",
@@ -80,26 +96,42 @@ class FfmpegStream(BaseAdapter):
                 "pcm_s16le",
                 "-",
             ]
+            # ffmpeg reads interactive commands from stdin unless it is the input
             self._process = subprocess.Popen(
-                args, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+                args,
+                stdin=(
+                    subprocess.PIPE
+                    if self._input_data is not None
+                    else subprocess.DEVNULL
+                ),
+                stdout=subprocess.PIPE,
             )
+            if self._input_data is not None:
+                # feed in-memory input from a separate thread so that ffmpeg
+                # can already emit PCM while the rest is still being written
+                Thread(
+                    target=self._feed_stdin,
+                    args=(self._process, self._input_data),
+                    daemon=True,
+                ).start()
         return self._process.stdout
 
+    @staticmethod
+    def _feed_stdin(process: subprocess.Popen, data: bytes) -> None:
+        assert process.stdin is not None
+        try:
+            process.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            pass  # ffmpeg was terminated before it consumed all input
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
     def read(self) -> bytes:
         stream = self.get_stream()
-        if self.speed != -1.0:
-            sleep = self.seconds_returned - (time.time() - self.start_time)
-            if sleep > 0:
-                time.sleep(sleep)
-                if self.chunk_size > 2 * 960:
-                    self.chunk_size -= 2 * 960
-            else:
-                if sleep < -5:
-                    print(
-                        "WARNING: Network is to slow. Having at least 5 seconds of delay!"
-                    )
-                self.chunk_size += 2 * 960
-        chunk = cast(bytes, stream.read(self.chunk_size))
+        chunk = cast(bytes, stream.read(self.rate_policy.next_chunk_size()))
         if self._process is not None and self._process.poll() is not None:
             if self.repeat_input and len(chunk) == 0:
                 self._process = None
@@ -107,9 +139,20 @@ class FfmpegStream(BaseAdapter):
                 # return self.read(self.chunk_size)
             elif not self.repeat_input and self._process.returncode == 0:
                 pass  # first finish returning the rest of chunks and then an empty chunk is send. After the empty chunk the file is over
-        self.seconds_returned += len(chunk) / 2 / self.rate / self.speed
+        self.rate_policy.on_chunk(len(chunk))
         return chunk
 
+    def read_all(self) -> bytes:
+        """Decode the whole input and return it as 16 kHz s16le PCM.
+
+        Only terminates for inputs without repeat_input.
+        """
+        chunks = []
+        while chunk := self.read():
+            chunks.append(chunk)
+        self.cleanup()
+        return b"".join(chunks)
+
     def chunk_modify(self, chunk: bytes) -> bytes:
         return chunk
 
@@ -121,6 +164,31 @@ class FfmpegStream(BaseAdapter):
             except subprocess.TimeoutExpired:
                 self._process.kill()
             self._process = None
+        self._remove_temp_file()
+
+    def _remove_temp_file(self) -> None:
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except FileNotFoundError:
+                pass
+            self._temp_path = None
+
+    def set_input(self, input: str | bytes) -> None:
+        """Set an url/file to decode, or the raw bytes of an encoded audio file
+        which are piped into ffmpeg without touching the disk.
 
-    def set_input(self, input: str) -> None:
-        self.url = input
+        Containers that need a seekable input (MP4/M4A) are written to a
+        temporary file instead, which is removed on cleanup.
+        """
+        self._remove_temp_file()
+        self._input_data = None
+        if not isinstance(input, bytes):
+            self.url = input
+        elif input[4:8] in SEEKABLE_SIGNATURES:
+            with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as file:
+                file.write(input)
+            self.url = self._temp_path = file.name
+        else:
+            self.url = "pipe:0"
+            self._input_data = input
@@ -3,13 +3,26 @@
 from abc import ABCMeta, abstractmethod
 from typing import Any, Optional
 
+from campus_plan_bot.streamadapter.rate_control import FileRatePolicy, RatePolicy
+
 
 class BaseAdapter(metaclass=ABCMeta):
-    def __init__(self, format: Any) -> None:
+    def __init__(self, format: Any, rate_policy: Optional[RatePolicy] = None) -> None:
         self.rate = 16000
         self.format = format
         self.channel_count = 1
         self.chosen_channel: Optional[int] = None
+        self.rate_policy: RatePolicy = rate_policy or FileRatePolicy()
+
+    def set_rate_policy(self, rate_policy: RatePolicy) -> None:
+        """Replace the policy that decides how large the returned chunks
+        are."""
+        self.rate_policy = rate_policy
+
+    def report_ack(self, chunk_size: int, latency: float) -> None:
+        """Should be called by the consumer once a chunk was acknowledged by
+        the receiving side."""
+        self.rate_policy.on_ack(chunk_size, latency)
 
     def available(self) -> bool:
         """Should return if the backend is available and print an error message
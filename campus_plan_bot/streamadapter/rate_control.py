@@ -0,0 +1,151 @@
+import time
+from abc import ABCMeta, abstractmethod
+from typing import Callable, Optional
+
+from loguru import logger
+
+# one frame of 960 samples in s16le
+FRAME_BYTES = 2 * 960
+
+
+class RatePolicy(metaclass=ABCMeta):
+    """Decides how many bytes an adapter returns per read.
+
+    Adapters call ``start`` when a new stream is opened, ask for the
+    size of every chunk via ``next_chunk_size`` and report the bytes
+    they actually returned via ``on_chunk``. Consumers that upload the
+    chunks report the end-to-end acknowledgement latency via ``on_ack``.
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.clock = clock
+        self.sleep = sleep
+        self.bytes_per_second = 2 * 16000
+        self.bytes_returned = 0
+        self.start_time = 0.0
+        self.ack_latency: Optional[float] = None
+        self.ack_throughput: Optional[float] = None
+
+    def start(self, bytes_per_second: int) -> None:
+        """Should be called whenever the underlying stream is (re)opened."""
+        self.bytes_per_second = bytes_per_second
+        self.bytes_returned = 0
+        self.start_time = self.clock()
+
+    @abstractmethod
+    def next_chunk_size(self) -> int:
+        """Should return the number of bytes to read next.
+
+        May block to pace the stream.
+        """
+        pass
+
+    def on_chunk(self, size: int) -> None:
+        """Record that a chunk of ``size`` bytes was handed out."""
+        self.bytes_returned += size
+
+    def on_ack(self, size: int, latency: float, smoothing: float = 0.3) -> None:
+        """Record the latency of an acknowledged upload of ``size`` bytes."""
+        if size <= 0 or latency <= 0:
+            return
+        throughput = size / latency
+        if self.ack_latency is None or self.ack_throughput is None:
+            self.ack_latency = latency
+            self.ack_throughput = throughput
+        else:
+            self.ack_latency += smoothing * (latency - self.ack_latency)
+            self.ack_throughput += smoothing * (throughput - self.ack_throughput)
+
+    @staticmethod
+    def _clamp_frames(size: float, min_frames: int, max_frames: int) -> int:
+        frames = int(size // FRAME_BYTES)
+        return max(min_frames, min(max_frames, frames)) * FRAME_BYTES
+
+
+class FileRatePolicy(RatePolicy):
+    """Sends a recorded file as fast as the uploader can take it.
+
+    Chunks are sized so that one upload takes roughly ``target_latency``
+    seconds according to the measured throughput, which keeps the
+    per-request overhead small without letting single requests grow
+    arbitrarily slow.
+    """
+
+    def __init__(
+        self,
+        target_latency: float = 1.0,
+        initial_frames: int = 167,
+        min_frames: int = 17,
+        max_frames: int = 1000,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.target_latency = target_latency
+        self.initial_frames = initial_frames
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+
+    def next_chunk_size(self) -> int:
+        if self.ack_throughput is None:
+            return self.initial_frames * FRAME_BYTES
+        return self._clamp_frames(
+            self.ack_throughput * self.target_latency, self.min_frames, self.max_frames
+        )
+
+
+class LiveRatePolicy(RatePolicy):
+    """Paces a stream to the wall clock, e.g. for RTSP input.
+
+    Every read returns the audio that accumulated since the last read
+    (the backlog), but at least as much as arrives while one upload is
+    acknowledged, so that slow uploads are amortized over larger chunks
+    instead of building up delay.
+    """
+
+    def __init__(
+        self,
+        speed: float = 1.0,
+        min_frames: int = 1,
+        max_frames: int = 167,
+        warn_backlog: float = 5.0,
+        **kwargs,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.speed = speed
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.warn_backlog = warn_backlog
+        self._warned = False
+
+    def backlog(self) -> float:
+        """Bytes of audio that are available but were not returned yet."""
+        elapsed = self.clock() - self.start_time
+        return elapsed * self.speed * self.bytes_per_second - self.bytes_returned
+
+    def next_chunk_size(self) -> int:
+        bytes_per_wall_second = self.speed * self.bytes_per_second
+
+        wanted = float(self.min_frames * FRAME_BYTES)
+        if self.ack_latency is not None:
+            wanted = max(wanted, self.ack_latency * bytes_per_wall_second)
+        wanted = min(wanted, float(self.max_frames * FRAME_BYTES))
+
+        backlog = self.backlog()
+        if backlog < wanted:
+            self.sleep((wanted - backlog) / bytes_per_wall_second)
+            backlog = wanted
+
+        delay = backlog / bytes_per_wall_second
+        if delay > self.warn_backlog and not self._warned:
+            logger.warning(
+                f"Network is too slow, the stream is {delay:.1f} seconds behind."
+            )
+            self._warned = True
+        elif delay <= self.warn_backlog:
+            self._warned = False
+
+        return self._clamp_frames(backlog, self.min_frames, self.max_frames)
@@ -0,0 +1,289 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from campus_plan_bot.streamadapter.input_stream_adapter import BaseAdapter
+
+
+@dataclass
+class SpeechSegment:
+    """Boundaries of a detected speech region in seconds."""
+
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def pcm_to_samples(pcm: bytes) -> np.ndarray:
+    """Convert s16le PCM to float samples in [-1, 1]."""
+    usable = len(pcm) - len(pcm) % 2
+    return np.frombuffer(pcm[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+class EnergyVAD:
+    """Energy based voice activity detection on 16 kHz mono audio.
+
+    A frame counts as speech if its level is `threshold_db` above the
+    noise floor (or louder than `speech_level_db`). Speech needs to last
+    `min_speech_ms` to open a segment, which is closed after
+    `hangover_ms` of silence and padded by `padding_ms` on both sides.
+    """
+
+    def __init__(
+        self,
+        rate: int = 16000,
+        frame_ms: int = 30,
+        threshold_db: float = 12.0,
+        min_level_db: float = -50.0,
+        speech_level_db: float = -30.0,
+        min_speech_ms: int = 90,
+        hangover_ms: int = 300,
+        padding_ms: int = 150,
+    ):
+        self.rate = rate
+        self.frame_ms = frame_ms
+        self.frame_samples = rate * frame_ms // 1000
+        self.frame_bytes = 2 * self.frame_samples
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.speech_level_db = speech_level_db
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.padding_frames = padding_ms // frame_ms
+
+    def frame_levels(self, samples: np.ndarray) -> np.ndarray:
+        """Return the level of every full frame in dBFS."""
+        num_frames = len(samples) // self.frame_samples
+        frames = samples[: num_frames * self.frame_samples].reshape(
+            num_frames, self.frame_samples
+        )
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        return 20 * np.log10(np.maximum(rms, 1e-6))
+
+    def is_voiced(self, level: Any, noise_floor: float) -> Any:
+        threshold = max(noise_floor + self.threshold_db, self.min_level_db)
+        return (level > threshold) | (level > self.speech_level_db)
+
+    def segments(self, samples: np.ndarray) -> list[SpeechSegment]:
+        """Find all speech segments in a recording."""
+        levels = self.frame_levels(samples)
+        if len(levels) == 0:
+            return []
+        voiced = self.is_voiced(levels, float(np.percentile(levels, 10)))
+
+        frame_ranges: list[tuple[int, int]] = []
+        start: Optional[int] = None
+        silence = 0
+        for index, is_speech in enumerate(voiced):
+            if is_speech:
+                if start is None:
+                    start = index
+                silence = 0
+            elif start is not None:
+                silence += 1
+                if silence > self.hangover_frames:
+                    frame_ranges.append((start, index - silence + 1))
+                    start = None
+        if start is not None:
+            frame_ranges.append((start, len(voiced) - silence))
+
+        duration = len(samples) / self.rate
+        segments: list[SpeechSegment] = []
+        for first, last in frame_ranges:
+            if last - first < self.min_speech_frames:
+                continue
+            segment = SpeechSegment(
+                start=max(0.0, (first - self.padding_frames) * self.frame_ms / 1000),
+                end=min(duration, (last + self.padding_frames) * self.frame_ms / 1000),
+            )
+            if segments and segment.start <= segments[-1].end:
+                segments[-1].end = segment.end
+            else:
+                segments.append(segment)
+        return segments
+
+    def trim(self, samples: np.ndarray) -> np.ndarray:
+        """Cut leading and trailing silence, keeps everything if no speech
+        was detected."""
+        segments = self.segments(samples)
+        if not segments:
+            return samples
+        return self.cut(samples, SpeechSegment(segments[0].start, segments[-1].end))
+
+    def split(
+        self, samples: np.ndarray, max_seconds: float = 30.0
+    ) -> list[SpeechSegment]:
+        """Group speech into chunks of at most max_seconds, cutting at
+        pauses."""
+        chunks: list[SpeechSegment] = []
+        for segment in self.segments(samples):
+            if chunks and segment.end - chunks[-1].start <= max_seconds:
+                chunks[-1].end = segment.end
+                continue
+            # segments without any pause are cut hard
+            start = segment.start
+            while segment.end - start > max_seconds:
+                chunks.append(SpeechSegment(start, start + max_seconds))
+                start += max_seconds
+            chunks.append(SpeechSegment(start, segment.end))
+        return chunks
+
+    def cut(self, samples: np.ndarray, segment: SpeechSegment) -> np.ndarray:
+        return samples[int(segment.start * self.rate) : int(segment.end * self.rate)]
+
+
+class VadStream(BaseAdapter):
+    """Removes silence from the PCM stream of another adapter.
+
+    Leading and trailing silence is dropped and pauses are shortened to
+    `max_pause` seconds. If `end_of_utterance` is set, the stream ends
+    once that many seconds of silence followed speech, so that the
+    consumer can finish without waiting for the input to end.
+    Boundaries of the detected speech are collected in `segments`.
+    """
+
+    def __init__(
+        self,
+        source: BaseAdapter,
+        vad: Optional[EnergyVAD] = None,
+        end_of_utterance: Optional[float] = None,
+        max_pause: float = 0.5,
+    ) -> None:
+        super().__init__(format=source.format, rate_policy=source.rate_policy)
+        self.source = source
+        self.vad = vad or EnergyVAD(rate=source.rate)
+        self.rate = source.rate
+        self.max_pause_frames = int(max_pause * 1000) // self.vad.frame_ms
+        self.end_of_utterance_frames = (
+            int(end_of_utterance * 1000) // self.vad.frame_ms
+            if end_of_utterance is not None
+            else None
+        )
+        self.segments: list[SpeechSegment] = []
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pending = b""
+        self._held: list[bytes] = []
+        self._noise_floor: Optional[float] = None
+        self._position = 0
+        self._voiced_run = 0
+        self._silence_run = 0
+        self._segment_start: Optional[float] = None
+        self._emitted = False
+        self._finished = False
+
+    def available(self) -> bool:
+        return self.source.available()
+
+    def get_stream(self, **kwargs) -> Any:
+        return self.source.get_stream(**kwargs)
+
+    def set_input(self, input: Any) -> None:
+        self.source.set_input(input)
+        self.segments = []
+        self._reset()
+
+    def cleanup(self) -> None:
+        self.source.cleanup()
+
+    @property
+    def speech_detected(self) -> bool:
+        return self._emitted
+
+    def read(self) -> bytes:
+        while not self._finished:
+            chunk = self.source.chunk_modify(self.source.read())
+            if len(chunk) == 0:
+                self._finished = True
+                if self._segment_start is None:
+                    break
+                # keep the trailing padding of the last segment
+                self._close_segment(self._position - self._silence_run)
+                return b"".join(self._held[: self.vad.padding_frames])
+
+            data = self._pending + chunk
+            usable = len(data) - len(data) % self.vad.frame_bytes
+            self._pending = data[usable:]
+
+            output = b"".join(
+                self._process_frame(data[offset : offset + self.vad.frame_bytes])
+                for offset in range(0, usable, self.vad.frame_bytes)
+                if not self._finished
+            )
+            if output:
+                return output
+        return b""
+
+    def _seconds(self, frames: int) -> float:
+        return max(0, frames) * self.vad.frame_ms / 1000
+
+    def _flush(self, keep: int) -> bytes:
+        output = b"".join(self._held[-keep:])
+        self._held.clear()
+        self._emitted = True
+        return output
+
+    def _close_segment(self, last_voiced_frame: int) -> None:
+        if self._segment_start is None:
+            return
+        end = self._seconds(last_voiced_frame + self.vad.padding_frames)
+        self.segments.append(SpeechSegment(self._segment_start, end))
+        self._segment_start = None
+
+    def _process_frame(self, frame: bytes) -> bytes:
+        level = float(self.vad.frame_levels(pcm_to_samples(frame))[0])
+        if self._noise_floor is None or level < self._noise_floor:
+            self._noise_floor = level
+        else:
+            # let the floor follow slowly rising background noise
+            self._noise_floor += 0.01
+
+        self._position += 1
+        self._held.append(frame)
+        if self.vad.is_voiced(level, self._noise_floor):
+            self._voiced_run += 1
+            self._silence_run = 0
+        else:
+            self._voiced_run = 0
+            self._silence_run += 1
+
+        if self._segment_start is None:
+            if self._voiced_run >= self.vad.min_speech_frames:
+                first_voiced = self._position - self._voiced_run
+                self._segment_start = self._seconds(
+                    first_voiced - self.vad.padding_frames
+                )
+                context = self.max_pause_frames if self._emitted else 0
+                return self._flush(
+                    self._voiced_run + max(context, self.vad.padding_frames)
+                )
+
+            if (
+                self._emitted
+                and self.end_of_utterance_frames is not None
+                and self._silence_run >= self.end_of_utterance_frames
+            ):
+                self._finished = True
+
+            limit = (
+                max(self.vad.padding_frames, self.max_pause_frames)
+                + self.vad.min_speech_frames
+            )
+            del self._held[:-limit]
+            return b""
+
+        if self._voiced_run > 0:
+            return self._flush(len(self._held))
+
+        if self._silence_run > self.vad.hangover_frames:
+            self._close_segment(self._position - self._silence_run)
+            # keep the trailing padding of the segment
+            output = b"".join(self._held[: self.vad.padding_frames])
+            del self._held[: self.vad.padding_frames]
+            return output
+        return b""
@@ -0,0 +1,234 @@
+"""Lightweight tracing with OpenTelemetry-compatible spans.
+
+Spans are opened with `span(...)` and nest via context variables, so they
+follow the request through `await`s and into tasks created inside a span.
+Finished spans are passed to all registered listeners. Entry points call
+`configure_from_env()` once at startup to register the exporters that are
+configured in the environment:
+
+- `TRACE_FILE`: append every span as an OTLP/JSON line to this file
+- `OTEL_EXPORTER_OTLP_ENDPOINT`: send spans to an OTLP/HTTP collector
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from queue import Empty, Queue
+from typing import Any
+
+from loguru import logger
+
+SERVICE_NAME = "campus-plan-bot"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    # the wall clock only anchors the span in time, it is measured monotonically
+    start_perf_ns: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds, up to now if the span is still open."""
+        if self.end_ns is not None:
+            return (self.end_ns - self.start_ns) / 1e9
+        return (time.perf_counter_ns() - self.start_perf_ns) / 1e9
+
+    def finish(self) -> None:
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self.start_perf_ns
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def update(self, attributes: dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+
+SpanListener = Callable[[Span], None]
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_session_id: ContextVar[str | None] = ContextVar("session_id", default=None)
+_listeners: list[SpanListener] = []
+
+
+def add_span_listener(listener: SpanListener) -> None:
+    """Register a callback that is called with every finished span."""
+    _listeners.append(listener)
+
+
+def remove_span_listener(listener: SpanListener) -> None:
+    _listeners.remove(listener)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def set_attributes(attributes: dict[str, Any]) -> None:
+    """Add attributes to the current span, if there is one."""
+    span = _current_span.get()
+    if span is not None:
+        span.update(attributes)
+
+
+@contextmanager
+def session(session_id: str) -> Iterator[None]:
+    """Link all spans opened in this context to a session."""
+    token = _session_id.set(session_id)
+    try:
+        yield
+    finally:
+        _session_id.reset(token)
+
+
+@contextmanager
+def span(name: str, attributes: dict[str, Any] | None = None) -> Iterator[Span]:
+    """Time a block of code as a child of the current span."""
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        attributes=dict(attributes or {}),
+    )
+    session_id = _session_id.get()
+    if session_id is not None:
+        current.set("session.id", session_id)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        for listener in _listeners:
+            try:
+                listener(current)
+            except Exception as e:
+                logger.warning(f"Span listener failed: {e}")
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: list[Span]) -> dict[str, Any]:
+    """Convert spans to an OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": _otlp_value(SERVICE_NAME)}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "campus_plan_bot"},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": 1,
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in span.attributes.items()
+                                ],
+                                "status": (
+                                    {"code": 2, "message": span.error}
+                                    if span.error
+                                    else {"code": 1}
+                                ),
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class JsonlFileExporter:
+    """Appends every span as one OTLP/JSON line, the format of the
+    OpenTelemetry collector's file exporter."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        line = json.dumps(to_otlp([span]), ensure_ascii=False)
+        with self._lock, self.path.open("a") as f:
+            f.write(line + "\n")
+
+
+class OtlpHttpExporter:
+    """Sends spans in batches to an OTLP/HTTP collector from a background
+    thread, so that requests never wait for the collector."""
+
+    def __init__(self, endpoint: str, flush_interval: float = 2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.flush_interval = flush_interval
+        self._queue: Queue[Span] = Queue(maxsize=10_000)
+        threading.Thread(target=self._work, daemon=True).start()
+
+    def __call__(self, span: Span) -> None:
+        if self._queue.full():
+            logger.warning("Trace export queue is full, dropping span.")
+            return
+        self._queue.put_nowait(span)
+
+    def _work(self) -> None:
+        import httpx
+
+        with httpx.Client(timeout=10) as client:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except Empty:
+                    continue
+                while not self._queue.empty() and len(batch) < 512:
+                    batch.append(self._queue.get_nowait())
+                try:
+                    client.post(self.url, json=to_otlp(batch)).raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.warning(f"Could not export {len(batch)} spans: {e}")
+
+
+def configure_from_env() -> None:
+    """Register the exporters that are configured in the environment."""
+    if trace_file := os.getenv("TRACE_FILE"):
+        logger.info(f"Writing traces to {trace_file}")
+        add_span_listener(JsonlFileExporter(trace_file))
+    if endpoint := os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        logger.info(f"Exporting traces to {endpoint}")
+        add_span_listener(OtlpHttpExporter(endpoint))
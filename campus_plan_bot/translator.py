@@ -1,3 +1,4 @@
+from campus_plan_bot import tracing
 from campus_plan_bot.interfaces.interfaces import (
     LLMClient,
     LLMRequestConfig,
@@ -40,7 +41,8 @@ class Translator:
         prompt = self.prompt_builder.from_conversation_history_with_system_prompt(
             conversation_history
         )
-        translated_text = await self.llm_client.query_async(prompt)
+        with tracing.span("translator.translate", {"target_language": target_language}):
+            translated_text = await self.llm_client.query_async(prompt)
 
         translated_text = translated_text.replace("---", "").strip()
 
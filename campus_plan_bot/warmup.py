@@ -0,0 +1,89 @@
+"""Loading of models in the background.
+
+Loading the embedding model, the reranker and the index takes tens of
+seconds, most of it in imports of torch and transformers. A
+`BackgroundLoader` runs the loading in a thread right after startup, so
+that the CLI can already greet the user and the backend can answer health
+checks, and reports the progress of its steps.
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# called by the load function with the name of the step it starts next
+ProgressCallback = Callable[[str], None]
+
+
+class BackgroundLoader(Generic[T]):
+    def __init__(self, name: str, load: Callable[[ProgressCallback], T]):
+        self.name = name
+        self.load = load
+        self.step: str | None = None
+        self.completed: dict[str, float] = {}
+        self.error: BaseException | None = None
+        self._result: T | None = None
+        self._done = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+        self._step_started = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    def start(self) -> "BackgroundLoader[T]":
+        if self._thread is None:
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _progress(self, step: str) -> None:
+        self._finish_step()
+        logger.debug(f"{self.name}: {step}")
+        self.step = step
+        self._step_started = time.monotonic()
+
+    def _finish_step(self) -> None:
+        if self.step is not None:
+            self.completed[self.step] = time.monotonic() - self._step_started
+            self.step = None
+
+    def _run(self) -> None:
+        try:
+            self._result = self.load(self._progress)
+            self._finish_step()
+            logger.info(
+                f"{self.name} ready after {time.monotonic() - self._started:.1f}s"
+            )
+        except BaseException as e:
+            logger.exception(f"{self.name} failed during {self.step}: {e}")
+            self.error = e
+        finally:
+            self._done.set()
+
+    def result(self, timeout: float | None = None) -> T:
+        """Wait for the loading to finish, starting it if necessary."""
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} is still loading ({self.step}).")
+        if self.error is not None:
+            raise RuntimeError(f"{self.name} failed to load.") from self.error
+        return self._result  # type: ignore[return-value]
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "step": self.step,
+            "completed": {step: round(s, 2) for step, s in self.completed.items()},
+            "elapsed": (
+                round(time.monotonic() - self._started, 2) if self._thread else 0.0
+            ),
+            "error": repr(self.error) if self.error else None,
+        }
@@ -1,13 +1,140 @@
-from sentence_transformers import CrossEncoder, SentenceTransformer
-
-# Embedding and Reranker models
-print("Downloading embedding and reranker models...")
-SentenceTransformer("nomic-ai/nomic-embed-text-v1", trust_remote_code=True)
-CrossEncoder("ml6team/cross-encoder-mmarco-german-distilbert-base")
-print("Embedding and reranker models downloaded.")
-
-# ASR model (unused in favor for the institute model)
-# print("Downloading ASR model...")
-# WhisperProcessor.from_pretrained("openai/whisper-base")
-# WhisperForConditionalGeneration.from_pretrained("openai/whisper-base")
-# print("ASR model downloaded.")
+"""Download the models of the bot and optionally save a local snapshot.
+
+With `--snapshot-dir`, the embedding model and the reranker are saved as
+safetensors to that directory. The embedding model's architecture is remote
+code from another repository (nomic-ai/nomic-bert-2048), which is copied
+into the snapshot, so that setting `MODEL_SNAPSHOT_DIR` to it makes the bot
+load both models without the Hugging Face hub (e.g. with `HF_HUB_OFFLINE=1`).
+
+`--onnx` additionally exports the reranker to ONNX, plain and with
+dynamically quantized int8 weights, for `RAG_BACKEND=onnx` and
+`RAG_BACKEND=onnx-int8`. The embedding model stays on torch, optimum has no
+ONNX export for its nomic-bert architecture.
+"""
+
+import json
+import shutil
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+from huggingface_hub import hf_hub_download
+from sentence_transformers import (
+    CrossEncoder,
+    SentenceTransformer,
+    export_dynamic_quantized_onnx_model,
+)
+
+from campus_plan_bot.rag import RAG, backend_kwargs, snapshot_path
+
+CHECK_PAIRS = [("wo ist die mensa", "Mensa am Adenauerring 30.41")]
+# exported reranker scores (logits) may differ from the original ones by this
+MAX_EXPORT_SCORE_ERROR = 0.1
+
+
+@click.command()
+@click.option(
+    "--snapshot-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Save a local snapshot of the models to this directory.",
+)
+@click.option(
+    "--onnx",
+    is_flag=True,
+    help="Also export the reranker to ONNX, plain and quantized to int8.",
+)
+def main(snapshot_dir: Path | None, onnx: bool) -> None:
+    # Embedding and Reranker models
+    print("Downloading embedding and reranker models...")
+    embed_model = SentenceTransformer(RAG.MODEL, trust_remote_code=True)
+    reranker = CrossEncoder(RAG.RERANKER_MODEL)
+    print("Embedding and reranker models downloaded.")
+
+    # ASR model (unused in favor for the institute model)
+    # print("Downloading ASR model...")
+    # WhisperProcessor.from_pretrained("openai/whisper-base")
+    # WhisperForConditionalGeneration.from_pretrained("openai/whisper-base")
+    # print("ASR model downloaded.")
+
+    if snapshot_dir is None:
+        if onnx:
+            raise click.UsageError("--onnx requires --snapshot-dir.")
+        return
+
+    embed_path = snapshot_path(snapshot_dir, RAG.MODEL)
+    reranker_path = snapshot_path(snapshot_dir, RAG.RERANKER_MODEL)
+    embed_model.save(str(embed_path), safe_serialization=True)
+    bundle_remote_code(embed_path)
+    reranker.save(str(reranker_path), safe_serialization=True)
+    print(f"Snapshot saved to {snapshot_dir}")
+
+    # make sure the snapshot computes the same scores as the original models
+    start = time.monotonic()
+    snapshot_embed_model = SentenceTransformer(str(embed_path), trust_remote_code=True)
+    snapshot_reranker = CrossEncoder(str(reranker_path))
+    print(f"Snapshot loaded in {time.monotonic() - start:.1f}s")
+
+    texts = [text for pair in CHECK_PAIRS for text in pair]
+    if not np.allclose(
+        embed_model.encode(texts), snapshot_embed_model.encode(texts), atol=1e-5
+    ):
+        raise click.ClickException("Snapshot embeddings differ from the original.")
+    if not np.allclose(
+        reranker.predict(CHECK_PAIRS), snapshot_reranker.predict(CHECK_PAIRS), atol=1e-5
+    ):
+        raise click.ClickException("Snapshot reranker scores differ from the original.")
+    print("Snapshot verified.")
+
+    if onnx:
+        export_onnx(reranker_path)
+
+
+def bundle_remote_code(model_path: Path) -> None:
+    """Copy the remote code a model refers to in its `auto_map` into the
+    model directory and point the `auto_map` there.
+
+    nomic-embed-text-v1 refers to its classes as
+    `nomic-ai/nomic-bert-2048--modeling_hf_nomic_bert.NomicBertModel`, which
+    transformers resolves on the hub even when loading from a directory.
+    """
+    config_path = model_path / "config.json"
+    config = json.loads(config_path.read_text())
+    auto_map = config.get("auto_map", {})
+    for key, references in auto_map.items():
+        local = []
+        for reference in [references] if isinstance(references, str) else references:
+            if reference and "--" in reference:
+                repo_id, reference = reference.split("--")
+                module = reference.rsplit(".", 1)[0]
+                code = hf_hub_download(repo_id, f"{module}.py")
+                shutil.copy(code, model_path / f"{module}.py")
+            local.append(reference)
+        auto_map[key] = local[0] if isinstance(references, str) else local
+    config_path.write_text(json.dumps(config, indent=2) + "\n")
+
+
+def export_onnx(reranker_path: Path) -> None:
+    """Export the snapshot reranker to ONNX and quantize it, then check that
+    the exported models still compute what the original does."""
+    reranker = CrossEncoder(str(reranker_path), backend="onnx")
+    reranker.save_pretrained(str(reranker_path))
+    export_dynamic_quantized_onnx_model(
+        reranker, quantization_config="avx2", model_name_or_path=str(reranker_path)
+    )
+    print("ONNX models exported.")
+
+    scores = CrossEncoder(str(reranker_path)).predict(CHECK_PAIRS)
+    for backend in ("onnx", "onnx-int8"):
+        exported = CrossEncoder(str(reranker_path), **backend_kwargs(backend))
+        score_error = np.abs(exported.predict(CHECK_PAIRS) - scores).max()
+        print(f"{backend}: reranker scores differ from torch by <= {score_error:.4f}")
+        if score_error > MAX_EXPORT_SCORE_ERROR:
+            raise click.ClickException(
+                f"The {backend} reranker scores differ from the original model."
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from loguru import logger
+
+# (precision, recall, f1)
+Scores = tuple[float, float, float]
+
+
+class BatchedBertScorer:
+    """Computes BERTScore once per (candidate, reference) pair.
+
+    Scores are cached, so FScore, Precision and Recall share a single
+    forward pass. `prime` scores all pairs of a report in one call, which
+    bert_score splits into length-sorted, padded batches of `batch_size`.
+    """
+
+    def __init__(
+        self,
+        lang: str = "de",
+        batch_size: int = 64,
+        score_fn: Callable[[list[str], list[str]], tuple[Any, Any, Any]] | None = None,
+    ):
+        self.lang = lang
+        self.batch_size = batch_size
+        self._score_fn = score_fn
+        self._scores: dict[tuple[str, str], Scores] = {}
+
+    def _load(self) -> Callable[[list[str], list[str]], tuple[Any, Any, Any]]:
+        from bert_score import BERTScorer
+
+        # keep the model in memory instead of reloading it for every call
+        logger.debug("Loading Bertscore model")
+        scorer = BERTScorer(lang=self.lang, batch_size=self.batch_size)
+        logger.debug("Bertscore model loaded successfully")
+        return scorer.score
+
+    def prime(self, candidates: Sequence[str], references: Sequence[str]) -> None:
+        """Score all pairs that are not cached yet in one batched call."""
+        missing = list(
+            dict.fromkeys(
+                pair for pair in zip(candidates, references) if pair not in self._scores
+            )
+        )
+        if not missing:
+            return
+        if self._score_fn is None:
+            self._score_fn = self._load()
+
+        logger.debug(f"Computing Bertscore for {len(missing)} pairs")
+        P, R, F = self._score_fn(
+            [candidate for candidate, _ in missing],
+            [reference for _, reference in missing],
+        )
+        for pair, p, r, f in zip(missing, P.tolist(), R.tolist(), F.tolist()):
+            self._scores[pair] = (p, r, f)
+
+    def scores(
+        self, candidates: Sequence[str], references: Sequence[str]
+    ) -> list[Scores]:
+        self.prime(candidates, references)
+        return [self._scores[pair] for pair in zip(candidates, references)]
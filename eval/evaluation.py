@@ -1,28 +1,28 @@
+import asyncio
 import json
 import sys
 from pathlib import Path
 
 import click
 import pandas as pd
-from bert_score import score
+from bert_scoring import BatchedBertScorer
 from loguru import logger
 from pydantic import BaseModel
-from pydantic_evals import Case, Dataset
+from pydantic_evals import Case
 from pydantic_evals.evaluators import (
     Evaluator,
     EvaluatorContext,
     LLMJudge,
 )
 from reporting import report_to_df
+from runner import EvaluationRunner, RateLimiter
 
 from campus_plan_bot.clients.chute_client import ChuteModel
 from campus_plan_bot.pipeline import Pipeline
 from campus_plan_bot.rag import RAG
 
-# Load BertScore model once
-logger.debug("Loading Bertscore model")
-score(["Ich bin ein Test"], ["Ich bin ein Test"], lang="de")
-logger.debug("Bertscore model loaded successfully")
+# shared by all BertScore evaluators, the model is loaded on first use
+BERT_SCORER = BatchedBertScorer(lang="de")
 
 embeddings_dir = Path("data") / "embeddings"
 
@@ -163,20 +163,20 @@ class BertScoreEvaluator(Evaluator[list[str], list[str]]):
 
 class FScore(BertScoreEvaluator):
     def score(self, output: list[str], expected_output: list[str]) -> float:
-        _, _, F = score(output, expected_output, lang="de")
-        return F.mean()
+        scores = BERT_SCORER.scores(output, expected_output)
+        return sum(f for _, _, f in scores) / len(scores)
 
 
 class Precision(BertScoreEvaluator):
     def score(self, output: list[str], expected_output: list[str]) -> float:
-        P, _, _ = score(output, expected_output, lang="de")
-        return P.mean()
+        scores = BERT_SCORER.scores(output, expected_output)
+        return sum(p for p, _, _ in scores) / len(scores)
 
 
 class Recall(BertScoreEvaluator):
     def score(self, output: list[str], expected_output: list[str]) -> float:
-        _, R, _ = score(output, expected_output, lang="de")
-        return R.mean()
+        scores = BERT_SCORER.scores(output, expected_output)
+        return sum(r for _, r, _ in scores) / len(scores)
 
 
 @click.group()
@@ -217,7 +217,20 @@ def cli() -> None:
     "--chunk-size",
     type=int,
     default=None,
-    help="Number of cases per chunk. If not set, all cases are processed at once.",
+    help="Number of cases that are scored and checkpointed together. If not set, all cases are scored at once.",
+)
+@click.option(
+    "--max-concurrency",
+    type=int,
+    default=16,
+    show_default=True,
+    help="Number of conversations that run concurrently.",
+)
+@click.option(
+    "--llm-rate",
+    type=float,
+    default=None,
+    help="Maximum number of LLM requests per second (default: unlimited).",
 )
 def evaluate_single_synthetic(
     test_data_path: Path,
@@ -225,6 +238,8 @@ def evaluate_single_synthetic(
     output_path: Path,
     limit: int | None,
     chunk_size: int | None,
+    max_concurrency: int,
+    llm_rate: float | None,
 ) -> None:
     """Run evaluation for single-turn synthetic test sets."""
     output_path.mkdir(parents=True, exist_ok=True)
@@ -240,7 +255,9 @@ def evaluate_single_synthetic(
             logger.warning(f"Skipping {file.name} because it already exists.")
             continue
 
-        process_file(file, rag, output_path, limit, chunk_size)
+        process_file(
+            file, rag, output_path, limit, chunk_size, max_concurrency, llm_rate
+        )
 
 
 @cli.command()
@@ -275,7 +292,20 @@ def evaluate_single_synthetic(
     "--chunk-size",
     type=int,
     default=None,
-    help="Number of cases per chunk. If not set, all cases are processed at once.",
+    help="Number of cases that are scored and checkpointed together. If not set, all cases are scored at once.",
+)
+@click.option(
+    "--max-concurrency",
+    type=int,
+    default=16,
+    show_default=True,
+    help="Number of conversations that run concurrently.",
+)
+@click.option(
+    "--llm-rate",
+    type=float,
+    default=None,
+    help="Maximum number of LLM requests per second (default: unlimited).",
 )
 def evaluate_file(
     test_path: Path,
@@ -283,15 +313,32 @@ def evaluate_file(
     output_path: Path,
     limit: int | None,
     chunk_size: int | None,
+    max_concurrency: int,
+    llm_rate: float | None,
 ) -> None:
     output_path.mkdir(parents=True, exist_ok=True)
     rag = RAG.from_file(data_path, persist_dir=embeddings_dir)
-    process_file(test_path, rag, output_path, limit, chunk_size)
+    process_file(
+        test_path, rag, output_path, limit, chunk_size, max_concurrency, llm_rate
+    )
 
 
 def process_file(
-    file: Path, rag: RAG, output_path: Path, limit: int | None, chunk_size: int | None
+    file: Path,
+    rag: RAG,
+    output_path: Path,
+    limit: int | None,
+    chunk_size: int | None,
+    max_concurrency: int = 16,
+    llm_rate: float | None = None,
 ) -> None:
+    output_filename = output_path / f"{file.stem}.csv"
+    if output_filename.exists():
+        logger.warning(
+            f"Output file {output_filename} already exists. Skipping evaluation for {file.name}."
+        )
+        return
+
     test_dataset = TestDataSet(file, limit=limit)
     cases = test_dataset.to_cases()
 
@@ -299,94 +346,30 @@ def process_file(
         logger.warning(f"No test cases found in {file.name}, skipping.")
         return
 
-    pipelines: dict[int, Pipeline] = {}  # for each case, store the bot if num_turns > 1
-
-    async def bot_runner(test_case_input: TestCaseInput) -> list[str]:
-        if test_case_input.case_id not in pipelines:
-            logger.debug(f"Creating pipeline for case {test_case_input.case_id}")
-            pipelines[test_case_input.case_id] = Pipeline.from_system_prompt(rag=rag)
-
-        pipeline = pipelines[test_case_input.case_id]
-
-        apply_asr = "asr" in file.name.lower()
-        pipeline_result = await pipeline.run(test_case_input.input, fix_asr=apply_asr)
-
-        # delete bot reference if last turn
-        if test_case_input.turn_idx == test_case_input.num_turns - 1:
-            logger.debug(f"Deleting pipeline for case {test_case_input.case_id}")
-            del pipelines[test_case_input.case_id]
-
-        return [pipeline_result.answer]
-
-    if chunk_size and chunk_size > 0:
-        num_cases = len(cases)
-        num_chunks = (num_cases + chunk_size - 1) // chunk_size
-        logger.info(
-            f"Evaluating {num_cases} cases from {file.name} in {num_chunks} chunks of size {chunk_size}."
-        )
-
-        for i in range(num_chunks):
-            chunk_start = i * chunk_size
-            chunk_end = chunk_start + chunk_size
-            chunk_cases = cases[chunk_start:chunk_end]
-
-            output_filename = (
-                output_path / f"{file.stem}_chunk_{i+1}_of_{num_chunks}.csv"
-            )
-            if output_filename.exists():
-                logger.info(
-                    f"Chunk {i+1}/{num_chunks} for {file.name} already evaluated. Skipping."
-                )
-                continue
-
-            logger.info(
-                f"Evaluating chunk {i+1}/{num_chunks} ({len(chunk_cases)} cases)..."
-            )
-
-            pydantic_dataset = Dataset(
-                cases=chunk_cases,
-                evaluators=[FScore(), Precision(), Recall(), SINGLE_TURN_LLM_JUDGE],
-            )
-
-            report = pydantic_dataset.evaluate_sync(bot_runner, max_concurrency=2)
-            df = report_to_df(report)
-            df.to_csv(output_filename, index=False)
-            logger.info(
-                f"Saved evaluation report for chunk {i+1}/{num_chunks} to {output_filename}"
-            )
-
-        # concatenate all chunks
-        all_chunks = sorted(
-            output_path.glob(f"{file.stem}_chunk_*.csv"),
-            key=lambda x: int(x.stem.split("_")[-3]),
-        )  # sort by chunk number
-        if len(all_chunks) > 1:
-            logger.info(f"Concatenating {len(all_chunks)} chunks for {file.name} ...")
-            df = pd.concat([pd.read_csv(chunk) for chunk in all_chunks])
-            df.to_csv(output_path / f"{file.stem}.csv", index=False)
-            logger.info(
-                f"Saved concatenated evaluation report to {output_path / f'{file.stem}.csv'}"
-            )
-            for chunk in all_chunks:
-                chunk.unlink()
-    else:
-        logger.info(f"Evaluating {len(cases)} cases from {file.name} (no chunking).")
-        output_filename = output_path / f"{file.stem}.csv"
-        if output_filename.exists():
-            logger.warning(
-                f"Output file {output_filename} already exists. Skipping evaluation for {file.name}."
-            )
-            return
-
-        pydantic_dataset = Dataset(
-            cases=cases,
+    logger.info(f"Evaluating {len(cases)} cases from {file.name}.")
+    runner = EvaluationRunner(
+        checkpoint_dir=output_path / "checkpoints",
+        name=file.stem,
+        pipeline_factory=lambda: Pipeline.from_system_prompt(rag=rag),
+        fix_asr="asr" in file.name.lower(),
+        max_concurrency=max_concurrency,
+        limiter=RateLimiter(llm_rate) if llm_rate else None,
+    )
+    rows = asyncio.run(
+        runner.run(
+            cases,
             evaluators=[FScore(), Precision(), Recall(), SINGLE_TURN_LLM_JUDGE],
+            to_rows=lambda report: report_to_df(report).to_dict("records"),
+            chunk_size=chunk_size,
+            judge_limiter=RateLimiter(llm_rate) if llm_rate else None,
+            prime=BERT_SCORER.prime,
         )
+    )
+    if rows is None:
+        raise click.ClickException(f"Evaluation of {file.name} is incomplete.")
 
-        report = pydantic_dataset.evaluate_sync(bot_runner, max_concurrency=4)
-        df = report_to_df(report)
-        df.to_csv(output_filename, index=False)
-        logger.info(f"Saved evaluation report to {output_filename}")
+    pd.DataFrame(rows).to_csv(output_filename, index=False)
+    logger.info(f"Saved evaluation report to {output_filename}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""Measure how often the local number normalization makes the LLM-based ASR
+fix unnecessary.
+
+Uses the transcripts of the audio evaluation (data/evaluation/audio/*.csv)
+and the building numbers the recorded prompts refer to. No models are
+loaded, only the name index and the building numbers of the database:
+
+    python eval/number_normalization.py
+"""
+
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import click
+import pandas as pd
+
+# Add project root to path to allow imports
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from campus_plan_bot.rag import BUILDING_NUMBER_PATTERN, RAG  # noqa: E402
+from campus_plan_bot.spoken_numbers import normalize_numbers  # noqa: E402
+
+AUDIO_DIR = Path("data/evaluation/audio")
+EVALUATION_DIR = Path("data/evaluation")
+DATABASE_PATH = Path("data/campusplan_evaluation.csv")
+# the prompts name buildings by any of these
+NAME_FIELDS = ("name", "old_identifikator")
+
+
+def expected_ids(file_stem: str, prompt_type: str) -> str | None:
+    """The building the recorded prompt refers to, if it is the first turn."""
+    if prompt_type == "single":
+        name, index = file_stem.rsplit("-", 1)
+        path, turn = EVALUATION_DIR / "single_turn" / f"{name}.json", 0
+    else:
+        index, turn_str = file_stem.split("-")
+        path, turn = EVALUATION_DIR / "multi_turn" / "multi_turns.json", int(turn_str)
+    if turn != 0:
+        return None
+    interactions = json.loads(path.read_text())
+    return str(interactions[int(index)]["prompts"][0]["input_data"])
+
+
+def local_matches(rag: RAG, text: str) -> set[str]:
+    """The building numbers, identifiers and names of the buildings found in
+    the text without the LLM."""
+    matches = set(rag.find_building_numbers(text))
+    for document in rag._retrieve_by_name(text, set()):
+        matches |= {document.id}
+        matches |= {str(document.data.get(field)) for field in NAME_FIELDS}
+    return matches
+
+
+@click.command()
+@click.option(
+    "--transcripts",
+    default=None,
+    help="CSV file with transcripts, defaults to all in data/evaluation/audio.",
+)
+@click.option(
+    "--max-wrong-skip-rate",
+    default=0.05,
+    show_default=True,
+    help="Fail if more of the skipped LLM fixes resolved the wrong building.",
+)
+def main(transcripts: str | None, max_wrong_skip_rate: float) -> None:
+    database = pd.read_csv(DATABASE_PATH)
+    rag = RAG(index=None, database=database)  # type: ignore[arg-type]
+    files = [Path(transcripts)] if transcripts else sorted(AUDIO_DIR.glob("*.csv"))
+
+    click.echo(
+        f"\n{'transcripts':<36}{'numbers':>8}{'raw':>8}{'local':>8}"
+        f"{'skipped':>9}{'wrong':>7}{'µs':>7}"
+    )
+    failed = []
+    for path in files:
+        rows = pd.read_csv(path).dropna(subset=["transcription"])
+        numbers = raw_found = found = skipped = wrong = 0
+        durations = []
+        for file_stem, text, prompt_type in zip(
+            rows["file_stem"], rows["transcription"], rows["type"]
+        ):
+            expected = expected_ids(file_stem, prompt_type)
+            if expected is None:
+                continue
+
+            start = time.perf_counter()
+            normalized = normalize_numbers(text, rag.building_numbers)
+            durations.append(time.perf_counter() - start)
+            resolved = rag.resolves_locally(normalized)
+            skipped += resolved
+            wrong += resolved and expected not in local_matches(rag, normalized)
+
+            if not re.fullmatch(BUILDING_NUMBER_PATTERN, expected):
+                continue
+            numbers += 1
+            raw_found += expected in rag.find_building_numbers(text)
+            found += expected in rag.find_building_numbers(normalized)
+
+        wrong_skip_rate = wrong / max(1, skipped)
+        if wrong_skip_rate > max_wrong_skip_rate:
+            failed.append(path.name)
+        click.echo(
+            f"{path.name:<36}{numbers:>8}{raw_found / numbers:>8.1%}"
+            f"{found / numbers:>8.1%}{skipped / len(durations):>9.1%}"
+            f"{wrong_skip_rate:>7.1%}{statistics.median(durations) * 1e6:>7.0f}"
+        )
+    click.echo(
+        "\nnumbers: first turns that refer to a building number, raw/local: share "
+        "of them found without/with the normalization, skipped: share of all first "
+        "turns without the LLM fix, wrong: share of the skipped ones whose building "
+        "was not found locally, µs: median normalization time"
+    )
+    if failed:
+        raise click.ClickException(
+            f"Wrong skips of the LLM fix above {max_wrong_skip_rate:.1%} for "
+            f"{', '.join(failed)}."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Compare the inference backends of the RAG on latency, memory and recall.
+
+The backends only apply to the reranker, the embedding model always runs on
+torch. Every backend is measured in a fresh process, so that the memory of the
+models of one backend does not count towards the next. Recall@5 is
+computed on the raw queries of the RAG evaluation dataset (without LLM
+rephrasing, so the comparison is deterministic):
+
+    python eval/rag_backends.py --backends torch,onnx,onnx-int8
+
+With `--dense-only`, the RAG retrieves without the BM25 index, to compare
+against the hybrid retrieval, and with `--full-rerank` the cross encoder
+scores all candidates instead of as few as needed. `--decisive-margin` sets
+the lead of the best vector search result that skips the cross encoder, tune
+it by comparing recall@5 and the saved reranking with `--full-rerank`. The
+caches are disabled.
+"""
+
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import click
+import pandas as pd
+
+# Add project root to path to allow imports
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from campus_plan_bot.rag import (  # noqa: E402
+    BACKENDS,
+    DECISIVE_MARGIN,
+    RAG,
+)
+
+EVAL_DATA_PATH = Path("data/campusplan_evaluation.csv")
+RAG_EVAL_DATASET_PATH = Path("data/rag_evaluation_dataset.csv")
+EMBEDDINGS_PATH = Path("data/embeddings")
+
+
+def rss_mb() -> float:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def measure(
+    backend: str,
+    repeats: int,
+    hybrid: bool = True,
+    adaptive_rerank: bool = True,
+    decisive_margin: float = DECISIVE_MARGIN,
+) -> dict[str, float]:
+    """Load the RAG with a backend and time its retrieval."""
+    rss_before = rss_mb()
+    start = time.monotonic()
+    rag = RAG.from_file(EVAL_DATA_PATH, persist_dir=EMBEDDINGS_PATH, backend=backend)
+    rag.hybrid = hybrid
+    rag.adaptive_rerank = adaptive_rerank
+    rag.decisive_margin = decisive_margin
+    rag.embedding_cache = rag.result_cache = rag.pair_score_cache = None
+    rag.warm_up()
+    load_time = time.monotonic() - start
+
+    eval_df = pd.read_csv(RAG_EVAL_DATASET_PATH)
+    hits = 0
+    latencies = []
+    for query, expected_id in zip(eval_df["query"], eval_df["expected_identifikator"]):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            documents = rag.retrieve_context(query, limit=5)
+            latencies.append(time.perf_counter() - start)
+        hits += expected_id in [doc.id for doc in documents]
+
+    latencies.sort()
+    return {
+        "recall@5": hits / len(eval_df),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "load_s": load_time,
+        "memory_mb": rss_mb() - rss_before,
+        "rerank_saved": rag.rerank_stats.saved,
+    }
+
+
+@click.command()
+@click.option(
+    "--backends",
+    default=",".join(BACKENDS),
+    show_default=True,
+    help="Comma-separated backends, the first one is the reference.",
+)
+@click.option("--repeats", default=5, show_default=True, help="Runs per query.")
+@click.option(
+    "--max-recall-drop",
+    default=0.0,
+    show_default=True,
+    help="Fail if a backend's recall@5 is lower than the reference's by more.",
+)
+@click.option(
+    "--hybrid/--dense-only",
+    default=True,
+    show_default=True,
+    help="Fuse the vector search with BM25.",
+)
+@click.option(
+    "--adaptive-rerank/--full-rerank",
+    default=True,
+    show_default=True,
+    help="Score only as many candidates with the cross encoder as needed.",
+)
+@click.option(
+    "--decisive-margin",
+    default=DECISIVE_MARGIN,
+    show_default=True,
+    help="Cosine similarity margin of the best result that skips the reranking.",
+)
+def main(
+    backends: str,
+    repeats: int,
+    max_recall_drop: float,
+    hybrid: bool,
+    adaptive_rerank: bool,
+    decisive_margin: float,
+) -> None:
+    selected = backends.split(",")
+    for backend in selected:
+        if backend not in BACKENDS:
+            raise click.BadParameter(f"Unknown backend {backend!r}.")
+
+    if "onnx-int8" in selected and not RAG.has_reranker_export("onnx-int8"):
+        # the quantized model only exists in an exported snapshot
+        raise click.UsageError(
+            f"No int8 export of {RAG.RERANKER_MODEL}, run python "
+            "download_models.py --snapshot-dir models --onnx and set "
+            "MODEL_SNAPSHOT_DIR=models."
+        )
+
+    results = {}
+    for backend in selected:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            results[backend] = executor.submit(
+                measure, backend, repeats, hybrid, adaptive_rerank, decisive_margin
+            ).result()
+
+    click.echo(
+        f"\n{'backend':<12}{'recall@5':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'load s':>10}{'memory MB':>12}{'rerank saved':>14}"
+    )
+    for backend, r in results.items():
+        click.echo(
+            f"{backend:<12}{r['recall@5']:>10.1%}{r['p50_ms']:>10.1f}"
+            f"{r['p95_ms']:>10.1f}{r['load_s']:>10.1f}{r['memory_mb']:>12.0f}"
+            f"{r['rerank_saved']:>14.1%}"
+        )
+
+    reference = results[selected[0]]["recall@5"]
+    worse = [
+        backend
+        for backend, r in results.items()
+        if r["recall@5"] < reference - max_recall_drop
+    ]
+    if worse:
+        raise click.ClickException(
+            f"recall@5 of {', '.join(worse)} dropped below {selected[0]}."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from collections.abc import Awaitable
+from pathlib import Path
+from typing import Any, Callable, Protocol
+
+from loguru import logger
+
+
+class PipelineLike(Protocol):
+    def run(self, user_input: str, fix_asr: bool = False) -> Awaitable[Any]: ...
+
+
+class RateLimiter:
+    """Token bucket that limits the number of LLM requests per second.
+
+    Up to `burst` requests may start at once, afterwards `rate` tokens
+    are refilled per second. Waiting callers are served in order.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.burst
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        tokens = min(tokens, self.burst)
+        async with self._lock:
+            self._refill()
+            if self.tokens < tokens:
+                await self.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class CheckpointLog:
+    """Append-only JSONL file with one record per completed unit of work.
+
+    Every record is flushed to disk before `append` returns. A line that
+    was cut off by a crash is skipped when loading, so that its work is
+    simply redone.
+    """
+
+    def __init__(self, path: Path, key: str):
+        self.path = path
+        self.key = key
+
+    def load(self) -> dict[str, dict]:
+        records: dict[str, dict] = {}
+        if not self.path.exists():
+            return records
+        with self.path.open() as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Skipping incomplete line {line_number} of {self.path}"
+                    )
+                    continue
+                records[str(record[self.key])] = record
+        return records
+
+    def append(self, record: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class EvaluationRunner:
+    """Runs the bot on a test set and evaluates the answers in two stages.
+
+    1. Conversations run concurrently, each with its own pipeline, while
+       the turns of a conversation are sent one after another. Every
+       finished conversation is appended to `<name>.outputs.jsonl`.
+    2. The collected outputs are scored by the pydantic-evals evaluators
+       in chunks, whose report rows are appended to
+       `<name>.evaluated.jsonl`.
+
+    Rerunning with the same checkpoint directory skips all finished
+    conversations and evaluated cases.
+    """
+
+    def __init__(
+        self,
+        checkpoint_dir: Path,
+        name: str,
+        pipeline_factory: Callable[[], PipelineLike],
+        fix_asr: bool = False,
+        max_concurrency: int = 16,
+        limiter: RateLimiter | None = None,
+        llm_calls_per_turn: float = 2.0,
+    ):
+        self.pipeline_factory = pipeline_factory
+        self.fix_asr = fix_asr
+        self.max_concurrency = max_concurrency
+        self.limiter = limiter
+        self.llm_calls_per_turn = llm_calls_per_turn
+        self.outputs = CheckpointLog(
+            checkpoint_dir / f"{name}.outputs.jsonl", key="case_id"
+        )
+        self.evaluated = CheckpointLog(
+            checkpoint_dir / f"{name}.evaluated.jsonl", key="name"
+        )
+
+    async def run_conversation(self, case_id: int, turns: list[Any]) -> dict:
+        """Send all turns of a conversation to a fresh pipeline."""
+        pipeline = self.pipeline_factory()
+        record: dict[str, Any] = {"case_id": case_id, "turns": {}}
+        for case in turns:
+            if self.limiter is not None:
+                await self.limiter.acquire(self.llm_calls_per_turn)
+            start = time.monotonic()
+            result = await pipeline.run(case.inputs.input, fix_asr=self.fix_asr)
+            record["turns"][case.name] = {
+                "output": [result.answer],
+                "duration": time.monotonic() - start,
+            }
+        return record
+
+    async def generate(self, cases: list[Any]) -> dict[str, list[str]]:
+        """Collect the bot outputs for all cases, keyed by case name."""
+        conversations: dict[int, list[Any]] = defaultdict(list)
+        for case in cases:
+            conversations[case.inputs.case_id].append(case)
+
+        done = self.outputs.load()
+        pending = {
+            case_id: sorted(turns, key=lambda case: case.inputs.turn_idx)
+            for case_id, turns in conversations.items()
+            if str(case_id) not in done
+        }
+        logger.info(
+            f"Running {len(pending)} conversations, "
+            f"{len(conversations) - len(pending)} restored from checkpoint."
+        )
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def worker(case_id: int, turns: list[Any]) -> None:
+            async with semaphore:
+                try:
+                    record = await self.run_conversation(case_id, turns)
+                except Exception as e:
+                    logger.error(f"Conversation {case_id} failed: {e}")
+                    return
+            self.outputs.append(record)
+            done[str(case_id)] = record
+
+        await asyncio.gather(*(worker(i, turns) for i, turns in pending.items()))
+
+        return {
+            name: turn["output"]
+            for record in done.values()
+            for name, turn in record["turns"].items()
+        }
+
+    async def evaluate(
+        self,
+        cases: list[Any],
+        outputs: dict[str, list[str]],
+        evaluators: list[Any],
+        to_rows: Callable[[Any], list[dict]],
+        chunk_size: int | None = None,
+        limiter: RateLimiter | None = None,
+        prime: Callable[[list[str], list[str]], None] | None = None,
+    ) -> dict[str, dict]:
+        """Score all cases that have an output, returns the report rows keyed
+        by case name.
+
+        If given, `prime` is called with all outputs and expected outputs
+        of a chunk before it is scored, e.g. to compute metrics batched.
+        """
+        from pydantic_evals import Dataset
+
+        done = self.evaluated.load()
+        pending = [
+            case for case in cases if case.name in outputs and case.name not in done
+        ]
+        names = {
+            (case.inputs.case_id, case.inputs.turn_idx): case.name for case in cases
+        }
+
+        async def replay(inputs: Any) -> list[str]:
+            if limiter is not None:
+                await limiter.acquire()
+            return outputs[names[(inputs.case_id, inputs.turn_idx)]]
+
+        chunk_size = chunk_size or len(pending) or 1
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start : start + chunk_size]
+            logger.info(
+                f"Evaluating cases {start + 1}-{start + len(chunk)} of {len(pending)}"
+            )
+            if prime is not None:
+                pairs = [
+                    pair
+                    for case in chunk
+                    for pair in zip(outputs[case.name], case.expected_output)
+                ]
+                prime(
+                    [output for output, _ in pairs], [expected for _, expected in pairs]
+                )
+            dataset = Dataset(cases=chunk, evaluators=evaluators)
+            report = await dataset.evaluate(
+                replay, max_concurrency=self.max_concurrency
+            )
+            for case, row in zip(report.cases, to_rows(report)):
+                record = {"name": case.name, **row}
+                self.evaluated.append(record)
+                done[case.name] = record
+        return done
+
+    async def run(
+        self,
+        cases: list[Any],
+        evaluators: list[Any],
+        to_rows: Callable[[Any], list[dict]],
+        chunk_size: int | None = None,
+        judge_limiter: RateLimiter | None = None,
+        prime: Callable[[list[str], list[str]], None] | None = None,
+    ) -> list[dict] | None:
+        """Run both stages, returns the report rows in the order of `cases` or
+        None if some cases could not be completed."""
+        outputs = await self.generate(cases)
+        rows = await self.evaluate(
+            cases, outputs, evaluators, to_rows, chunk_size, judge_limiter, prime
+        )
+        missing = [case.name for case in cases if case.name not in rows]
+        if missing:
+            logger.warning(
+                f"{len(missing)} cases are not evaluated yet, rerun to resume."
+            )
+            return None
+        return [
+            {key: value for key, value in rows[case.name].items() if key != "name"}
+            for case in cases
+        ]
@@ -83,15 +83,29 @@ def cli():
     default=None,
     help="Authentication token for remote ASR.",
 )
+@click.option(
+    "--feature-cache",
+    type=click.Path(file_okay=False, writable=True),
+    default=".cache/whisper_features",
+    show_default=True,
+    help="Directory for cached log-mel features of the local ASR, "
+    "pass an empty string to disable.",
+)
 def transcribe(
-    asr_type: str, output_path: str, skip_conversion: bool, token: str | None
+    asr_type: str,
+    output_path: str,
+    skip_conversion: bool,
+    token: str | None,
+    feature_cache: str,
 ):
     """Transcribes all single-turn and multi-turn audio files using the
     specified ASR, and saves the results to a CSV file."""
     logger.remove()
     logger.add(lambda msg: click.echo(msg, err=True), level="INFO")
     logger.add("file_{time}.log", level="DEBUG")  # For detailed logs
-    run_transcription(asr_type, output_path, skip_conversion, token)
+    run_transcription(
+        asr_type, output_path, skip_conversion, token, feature_cache or None
+    )
 
 
 @cli.command()
@@ -206,7 +220,11 @@ def port(
 
 
 def run_transcription(
-    asr_type: str, output_path: str, skip_conversion: bool, token: str | None
+    asr_type: str,
+    output_path: str,
+    skip_conversion: bool,
+    token: str | None,
+    feature_cache: str | None = None,
 ):
     """Transcribe audio files using the specified ASR and save results."""
 
@@ -255,7 +273,11 @@ def run_transcription(
 
     # --- 4. ASR Initialization ---
     asr = (
-        LocalASR(None, whisper_model_name="openai/whisper-medium")
+        LocalASR(
+            None,
+            whisper_model_name="openai/whisper-medium",
+            feature_cache_dir=feature_cache,
+        )
         if asr_type == "local"
         else RemoteASR(None)
     )
@@ -0,0 +1,362 @@
+"""Load generator for the FastAPI backend.
+
+Replays the evaluation conversations as sessions (`/start`, `/chat` or
+`/chat_audio` per turn, `/end`) against a running backend. Sessions
+arrive at a fixed rate (Poisson process), at most `--concurrency` of them
+are active at once. Run it against a backend that uses the mock LLM
+server (see scripts/mock_llm_server.py) to measure the bot's own overhead:
+
+    pixi run uvicorn backend.app:app --port 8000 &
+    python scripts/load_test.py --arrival-rate 2 --concurrency 20 \\
+        --duration 120 --pid $(pgrep -f "uvicorn backend.app")
+"""
+
+import asyncio
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import click
+import httpx
+from loguru import logger
+
+multi_turn_test_data = Path("data") / "evaluation" / "multi_turn" / "multi_turns.json"
+single_turn_test_data = Path("data") / "evaluation" / "single_turn"
+multi_turn_audio = Path("data") / "evaluation" / "audio" / "multi_turn"
+single_turn_audio = Path("data") / "evaluation" / "audio" / "single_turn"
+
+
+@dataclass
+class Turn:
+    query: str
+    audio: Path | None = None
+
+
+@dataclass
+class Conversation:
+    name: str
+    turns: list[Turn]
+
+
+def load_conversations(
+    use_multi_turn: bool, use_single_turn: bool
+) -> list[Conversation]:
+    """Load the evaluation conversations together with their recordings, if
+    any were spoken in."""
+    conversations = []
+    if use_multi_turn:
+        for case_idx, case in enumerate(json.loads(multi_turn_test_data.read_text())):
+            turns = [
+                Turn(prompt["prompt"], multi_turn_audio / f"{case_idx}-{turn_idx}.m4a")
+                for turn_idx, prompt in enumerate(case["prompts"])
+            ]
+            conversations.append(Conversation(f"multi_turn/{case_idx}", turns))
+    if use_single_turn:
+        for file in sorted(single_turn_test_data.glob("*.json")):
+            for case_idx, case in enumerate(json.loads(file.read_text())):
+                audio = single_turn_audio / f"{file.stem}-{case_idx:02d}.m4a"
+                turns = [Turn(case["prompts"][0]["prompt"], audio)]
+                conversations.append(Conversation(f"{file.stem}/{case_idx}", turns))
+
+    for conversation in conversations:
+        for turn in conversation.turns:
+            if turn.audio is not None and not turn.audio.exists():
+                turn.audio = None
+    return conversations
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    sessions_started: int = 0
+    sessions_completed: int = 0
+
+    def record(self, endpoint: str, latency: float, ok: bool) -> None:
+        self.latencies[endpoint].append(latency)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            endpoint: {
+                "requests": len(values),
+                "error_rate": self.errors[endpoint] / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values),
+            }
+            for endpoint, values in sorted(self.latencies.items())
+        }
+
+
+class MemorySampler:
+    """Samples the resident memory of the backend process via /proc."""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.status = Path(f"/proc/{pid}/status")
+        self.interval = interval
+        self.samples: list[tuple[float, int]] = []
+
+    def rss(self) -> int | None:
+        try:
+            for line in self.status.read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    async def run(self) -> None:
+        while True:
+            rss = self.rss()
+            if rss is not None:
+                self.samples.append((time.monotonic(), rss))
+            await asyncio.sleep(self.interval)
+
+    def summary(self, sessions: int) -> dict[str, float]:
+        if not self.samples:
+            return {}
+        values = [rss for _, rss in self.samples]
+        growth = values[-1] - values[0]
+        return {
+            "start_mb": values[0] / 2**20,
+            "peak_mb": max(values) / 2**20,
+            "end_mb": values[-1] / 2**20,
+            "growth_mb": growth / 2**20,
+            "growth_kb_per_session": growth / 1024 / max(1, sessions),
+        }
+
+
+class LoadTest:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        conversations: list[Conversation],
+        audio_ratio: float,
+        think_time: float,
+        rng: random.Random,
+    ):
+        self.client = client
+        self.conversations = conversations
+        self.audio_ratio = audio_ratio
+        self.think_time = think_time
+        self.rng = rng
+        self.stats = Stats()
+
+    async def request(self, endpoint: str, **kwargs) -> httpx.Response | None:
+        start = time.monotonic()
+        try:
+            response = await self.client.post(endpoint, **kwargs)
+        except httpx.HTTPError as e:
+            logger.debug(f"{endpoint} failed: {e!r}")
+            self.stats.record(endpoint, time.monotonic() - start, ok=False)
+            return None
+        self.stats.record(endpoint, time.monotonic() - start, response.is_success)
+        return response
+
+    async def chat_audio(self, session_id: str, audio: Path) -> None:
+        """Upload a recording and read the event stream until it ends."""
+        start = time.monotonic()
+        first_event: float | None = None
+        ok = False
+        try:
+            async with self.client.stream(
+                "POST",
+                "/chat_audio",
+                data={"session_id": session_id},
+                files={"file": (audio.name, audio.read_bytes(), "audio/mp4")},
+            ) as response:
+                async for line in response.aiter_lines():
+                    if first_event is None and line.startswith("data:"):
+                        first_event = time.monotonic() - start
+                    if '"final_response"' in line:
+                        ok = response.is_success
+        except httpx.HTTPError as e:
+            logger.debug(f"/chat_audio failed: {e!r}")
+        self.stats.record("/chat_audio", time.monotonic() - start, ok)
+        if first_event is not None:
+            self.stats.record("/chat_audio (first event)", first_event, True)
+
+    async def session(self, conversation: Conversation) -> None:
+        response = await self.request("/start", json={})
+        if response is None or not response.is_success:
+            return
+        session_id = response.json()["session_id"]
+        self.stats.sessions_started += 1
+
+        for index, turn in enumerate(conversation.turns):
+            if index > 0 and self.think_time > 0:
+                await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+            if turn.audio is not None and self.rng.random() < self.audio_ratio:
+                await self.chat_audio(session_id, turn.audio)
+            else:
+                await self.request(
+                    "/chat", json={"session_id": session_id, "query": turn.query}
+                )
+
+        await self.request("/end", params={"session_id": session_id})
+        self.stats.sessions_completed += 1
+
+    async def run(
+        self, arrival_rate: float, concurrency: int, duration: float, sessions: int
+    ) -> None:
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks: list[asyncio.Task] = []
+
+        async def limited(conversation: Conversation) -> None:
+            async with semaphore:
+                await self.session(conversation)
+
+        end = time.monotonic() + duration
+        while time.monotonic() < end and len(tasks) < sessions:
+            conversation = self.rng.choice(self.conversations)
+            tasks.append(asyncio.create_task(limited(conversation)))
+            await asyncio.sleep(self.rng.expovariate(arrival_rate))
+        logger.info(f"Started {len(tasks)} sessions, waiting for them to finish...")
+        await asyncio.gather(*tasks)
+
+
+def print_report(report: dict) -> None:
+    click.echo(
+        f"\n{'endpoint':<28}{'requests':>9}{'errors':>9}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    )
+    for endpoint, s in report["endpoints"].items():
+        click.echo(
+            f"{endpoint:<28}{s['requests']:>9}{s['error_rate']:>8.1%} "
+            f"{s['p50']:>8.3f} {s['p95']:>8.3f} {s['p99']:>8.3f} {s['max']:>8.3f}"
+        )
+    click.echo(
+        f"\nsessions: {report['sessions_completed']}/{report['sessions_started']} "
+        f"completed in {report['wall_time']:.1f}s"
+    )
+    if report["memory"]:
+        memory = report["memory"]
+        click.echo(
+            f"memory: {memory['start_mb']:.0f} MB -> {memory['end_mb']:.0f} MB "
+            f"(peak {memory['peak_mb']:.0f} MB, "
+            f"{memory['growth_kb_per_session']:.1f} KB per session)"
+        )
+
+
+@click.command()
+@click.option("--url", default="http://127.0.0.1:8000", show_default=True)
+@click.option(
+    "--arrival-rate",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="New sessions per second.",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Maximum number of active sessions.",
+)
+@click.option("--duration", type=float, default=60.0, show_default=True)
+@click.option(
+    "--sessions",
+    type=int,
+    default=1_000_000,
+    help="Stop after starting this many sessions.",
+)
+@click.option(
+    "--audio-ratio",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Share of turns that upload the recorded audio to /chat_audio.",
+)
+@click.option(
+    "--think-time",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Mean pause between the turns of a session in seconds.",
+)
+@click.option("--multi-turn/--no-multi-turn", default=True, show_default=True)
+@click.option("--single-turn/--no-single-turn", default=True, show_default=True)
+@click.option(
+    "--pid",
+    type=int,
+    default=None,
+    help="PID of the backend process to sample its memory usage.",
+)
+@click.option("--timeout", type=float, default=120.0, show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="Write the report as JSON.",
+)
+def main(
+    url: str,
+    arrival_rate: float,
+    concurrency: int,
+    duration: float,
+    sessions: int,
+    audio_ratio: float,
+    think_time: float,
+    multi_turn: bool,
+    single_turn: bool,
+    pid: int | None,
+    timeout: float,
+    seed: int,
+    output: Path | None,
+) -> None:
+    """Replay evaluation conversations against a running backend."""
+    conversations = load_conversations(multi_turn, single_turn)
+    if not conversations:
+        raise click.UsageError("No conversations selected.")
+    logger.info(f"Loaded {len(conversations)} conversations")
+
+    async def run() -> dict:
+        limits = httpx.Limits(max_connections=concurrency + 10)
+        async with httpx.AsyncClient(
+            base_url=url, timeout=timeout, limits=limits
+        ) as client:
+            load_test = LoadTest(
+                client, conversations, audio_ratio, think_time, random.Random(seed)
+            )
+            sampler = MemorySampler(pid) if pid is not None else None
+            sampling = asyncio.create_task(sampler.run()) if sampler else None
+
+            start = time.monotonic()
+            await load_test.run(arrival_rate, concurrency, duration, sessions)
+            wall_time = time.monotonic() - start
+            if sampling is not None:
+                sampling.cancel()
+
+            stats = load_test.stats
+            return {
+                "endpoints": stats.summary(),
+                "sessions_started": stats.sessions_started,
+                "sessions_completed": stats.sessions_completed,
+                "wall_time": wall_time,
+                "memory": sampler.summary(stats.sessions_started) if sampler else {},
+            }
+
+    report = asyncio.run(run())
+    print_report(report)
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
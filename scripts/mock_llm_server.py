@@ -0,0 +1,290 @@
+"""Local stand-in for the LLM services used by the bot.
+
+Serves the HF text-generation API (the `INSTITUTE_URL` endpoint) and the
+OpenAI-compatible chat completions API (the `CHUTE_API_URL` endpoint),
+both with streaming, so that the backend and the evaluation can run
+offline, e.g.
+
+    python scripts/mock_llm_server.py --latency lognormal:-1,0.5 --tokens-per-second 40
+    INSTITUTE_URL=http://127.0.0.1:8001/llm_generate \\
+    CHUTE_API_URL=http://127.0.0.1:8001/v1/chat/completions \\
+        pixi run uvicorn backend.app:app
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import click
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from loguru import logger
+
+
+@dataclass
+class LatencyDistribution:
+    """Time to first token in seconds, parsed from specs like `const:0.5`,
+    `uniform:0.2,1.0`, `normal:0.5,0.1` or `lognormal:-1,0.5`."""
+
+    kind: str
+    params: tuple[float, ...]
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, values = spec.partition(":")
+        params = tuple(float(value) for value in values.split(",") if value)
+        expected = {"const": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency distribution: {spec}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "const":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        else:
+            value = rng.lognormvariate(*self.params)
+        return max(0.0, value)
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+
+def chat_prompt(messages: list[dict[str, Any]]) -> str:
+    """Flatten chat messages into the string that recordings are keyed by."""
+    return "\n".join(f"{m.get('role')}: {m.get('content')}" for m in messages)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split a response into word-like tokens that keep their whitespace."""
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+class MockLLM:
+    """Produces responses with a configurable latency and token rate.
+
+    Responses are replayed from a JSONL file of `{"prompt": ..., "response":
+    ...}` records, keyed by the hash of the prompt. Unknown prompts get
+    `default_response`.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyDistribution,
+        tokens_per_second: float,
+        default_response: str,
+        recordings: Path | None = None,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.default_response = default_response
+        self.rng = random.Random(seed)
+        self.responses: dict[str, str] = {}
+        self.stats: Counter[str] = Counter()
+        if recordings is not None:
+            with recordings.open() as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        key = record.get("key") or prompt_key(record["prompt"])
+                        self.responses[key] = record["response"]
+            logger.info(f"Loaded {len(self.responses)} recorded responses")
+
+    def respond(self, prompt: str) -> str:
+        response = self.responses.get(prompt_key(prompt))
+        self.stats["replayed" if response is not None else "default"] += 1
+        return response if response is not None else self.default_response
+
+    async def stream(self, prompt: str, max_tokens: int | None) -> AsyncIterator[str]:
+        """Yield the tokens of the response at the configured pace."""
+        tokens = tokenize(self.respond(prompt))[:max_tokens]
+        await asyncio.sleep(self.latency.sample(self.rng))
+        for index, token in enumerate(tokens):
+            if index > 0 and self.tokens_per_second > 0:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield token
+
+    async def complete(self, prompt: str, max_tokens: int | None) -> str:
+        return "".join([token async for token in self.stream(prompt, max_tokens)])
+
+
+def sse(data: Any) -> str:
+    return f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+
+
+def create_app(llm: MockLLM) -> FastAPI:
+    app = FastAPI(title="Mock LLM server")
+
+    @app.get("/health")
+    async def health() -> dict[str, Any]:
+        return {"status": "ok", **llm.stats}
+
+    @app.post("/llm_generate")
+    @app.post("/generate")
+    @app.post("/")
+    async def text_generation(request: Request):
+        """HF text-generation-inference API as used by InferenceClient."""
+        body = await request.json()
+        prompt = body["inputs"]
+        max_tokens = body.get("parameters", {}).get("max_new_tokens")
+        llm.stats["text_generation"] += 1
+
+        if not body.get("stream"):
+            text = await llm.complete(prompt, max_tokens)
+            return JSONResponse([{"generated_text": text}])
+
+        async def events() -> AsyncIterator[str]:
+            text = ""
+            index = 0
+            async for token in llm.stream(prompt, max_tokens):
+                text += token
+                yield sse(
+                    {
+                        "index": index,
+                        "token": {
+                            "id": index,
+                            "text": token,
+                            "logprob": 0.0,
+                            "special": False,
+                        },
+                        "generated_text": None,
+                        "details": None,
+                    }
+                )
+                index += 1
+            yield sse(
+                {
+                    "index": index,
+                    "token": {"id": 0, "text": "", "logprob": 0.0, "special": True},
+                    "generated_text": text,
+                    "details": None,
+                }
+            )
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        """OpenAI-compatible chat completions API as used by ChuteModel."""
+        body = await request.json()
+        prompt = chat_prompt(body.get("messages", []))
+        max_tokens = body.get("max_tokens")
+        model = body.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        llm.stats["chat_completions"] += 1
+
+        if not body.get("stream"):
+            text = await llm.complete(prompt, max_tokens)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": len(tokenize(prompt)),
+                    "completion_tokens": len(tokenize(text)),
+                    "total_tokens": len(tokenize(prompt)) + len(tokenize(text)),
+                },
+            }
+
+        def chunk(delta: dict[str, Any], finish_reason: str | None) -> str:
+            return sse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+            )
+
+        async def events() -> AsyncIterator[str]:
+            yield chunk({"role": "assistant"}, None)
+            async for token in llm.stream(prompt, max_tokens):
+                yield chunk({"content": token}, None)
+            yield chunk({}, "stop")
+            yield sse("[DONE]")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8001, show_default=True)
+@click.option(
+    "--latency",
+    default="const:0.2",
+    show_default=True,
+    help="Distribution of the time to first token in seconds: const:S, "
+    "uniform:MIN,MAX, normal:MEAN,STD or lognormal:MU,SIGMA.",
+)
+@click.option(
+    "--tokens-per-second",
+    type=float,
+    default=50.0,
+    show_default=True,
+    help="Generation speed after the first token, 0 for no delay.",
+)
+@click.option(
+    "--recordings",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help='JSONL file with {"prompt": ..., "response": ...} records to replay.',
+)
+@click.option(
+    "--default-response",
+    default="Das Gebäude befindet sich in der Kaiserstraße 12, 76131 Karlsruhe.",
+    show_default=True,
+    help="Response for prompts without a recording.",
+)
+@click.option("--seed", type=int, default=None, help="Seed for the latency samples.")
+def main(
+    host: str,
+    port: int,
+    latency: str,
+    tokens_per_second: float,
+    recordings: Path | None,
+    default_response: str,
+    seed: int | None,
+) -> None:
+    """Run the mock LLM server."""
+    import uvicorn
+
+    llm = MockLLM(
+        LatencyDistribution.parse(latency),
+        tokens_per_second,
+        default_response,
+        recordings,
+        seed,
+    )
+    uvicorn.run(create_app(llm), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import numpy as np
+
+from eval.bert_scoring import BatchedBertScorer
+
+
+def test_pairs_are_scored_once_in_one_batch():
+    """Priming scores every distinct pair in a single call, later lookups
+    are served from the cache."""
+    calls: list[int] = []
+
+    def fake_score(candidates: list[str], references: list[str]):
+        calls.append(len(candidates))
+        lengths = np.array([len(c) / len(r) for c, r in zip(candidates, references)])
+        return lengths, lengths / 2, lengths / 4
+
+    scorer = BatchedBertScorer(score_fn=fake_score)
+    scorer.prime(["aa", "b", "aa"], ["a", "b", "a"])
+
+    assert scorer.scores(["aa"], ["a"]) == [(2.0, 1.0, 0.5)]
+    assert scorer.scores(["b"], ["b"]) == [(1.0, 0.5, 0.25)]
+    assert calls == [2]
@@ -0,0 +1,24 @@
+from campus_plan_bot.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_building_numbers():
+    assert tokenize("Wo ist das Gebäude 50.34?") == ["gebäude", "50.34"]
+    assert tokenize("Egon-Eiermann-Hörsaal") == ["egon", "eiermann", "hörsaal"]
+
+
+def test_search_ranks_exact_tokens_first():
+    index = BM25Index(
+        [
+            ("mensa", "Mensa am Adenauerring 30.95 Essen"),
+            ("library", "KIT-Bibliothek 30.50 Bücher Lernplätze"),
+            ("cafe", "Cafeteria Essen Kaffee"),
+        ]
+    )
+    assert [key for key, _ in index.search("Wo ist die Mensa?", 3)] == ["mensa"]
+    assert [key for key, _ in index.search("Essen", 3)] == ["cafe", "mensa"]
+    assert index.search("Fasanengarten", 3) == []
+
+
+def test_reciprocal_rank_fusion_prefers_items_in_both_rankings():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]])
+    assert [key for key, _ in fused] == ["c", "a", "b", "d"]
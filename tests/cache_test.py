@@ -0,0 +1,55 @@
+import numpy as np
+
+from campus_plan_bot.cache import (
+    EmbeddingCache,
+    LRUCache,
+    NpyDiskCache,
+    content_hash,
+)
+
+
+def test_npy_disk_cache_roundtrip(tmp_path):
+    """Arrays survive a roundtrip and corrupt entries count as misses."""
+    cache = NpyDiskCache(tmp_path)
+    key = content_hash(b"audio")
+    assert cache.get(key) is None
+
+    features = np.random.default_rng(0).random((2, 80, 3000), dtype=np.float32)
+    cache.put(key, features)
+    np.testing.assert_array_equal(NpyDiskCache(tmp_path).get(key), features)
+
+    cache.path(key).write_bytes(b"garbage")
+    assert cache.get(key) is None
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache: LRUCache[str, int] = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_embedding_cache_falls_back_to_disk(tmp_path):
+    embedding = np.arange(4, dtype=np.float32)
+    EmbeddingCache(directory=tmp_path).put("model", "wo ist die mensa", embedding)
+
+    cache = EmbeddingCache(max_size=1, directory=tmp_path)
+    np.testing.assert_array_equal(cache.get("model", "wo ist die mensa"), embedding)
+    assert cache.get("other model", "wo ist die mensa") is None
+    assert len(cache.memory) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_cache_expires_entries_after_ttl():
+    now = [0.0]
+    cache: LRUCache[str, int] = LRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    now[0] = 10
+    assert cache.get("a") == 1
+    now[0] = 10.5
+    assert cache.get("a") is None and len(cache) == 0
@@ -0,0 +1,85 @@
+import asyncio
+import random
+from dataclasses import dataclass
+
+from eval.runner import EvaluationRunner, RateLimiter
+
+
+@dataclass
+class Inputs:
+    input: str
+    case_id: int
+    turn_idx: int
+
+
+@dataclass
+class FakeCase:
+    name: str
+    inputs: Inputs
+
+
+@dataclass
+class FakeResult:
+    answer: str
+
+
+class FakePipeline:
+    def __init__(self, fail_on: str | None = None) -> None:
+        self.history: list[str] = []
+        self.fail_on = fail_on
+
+    async def run(self, user_input: str, fix_asr: bool = False) -> FakeResult:
+        await asyncio.sleep(random.random() / 100)
+        if user_input == self.fail_on:
+            raise RuntimeError("LLM unavailable")
+        self.history.append(user_input)
+        return FakeResult(answer=" > ".join(self.history))
+
+
+def make_cases(conversations: int, turns: int) -> list[FakeCase]:
+    return [
+        FakeCase(f"{c}_turn_{t}", Inputs(f"{c}.{t}", case_id=c, turn_idx=t))
+        for t in range(turns)
+        for c in range(conversations)
+    ]
+
+
+def test_conversations_keep_turn_order_and_resume(tmp_path):
+    """Turns run in order per conversation, finished conversations are not
+    run again."""
+    cases = make_cases(conversations=5, turns=3)
+    runner = EvaluationRunner(
+        tmp_path, "test", lambda: FakePipeline(fail_on="3.1"), max_concurrency=3
+    )
+    outputs = asyncio.run(runner.generate(cases))
+
+    assert outputs["2_turn_2"] == ["2.0 > 2.1 > 2.2"]
+    assert "3_turn_0" not in outputs
+
+    started = []
+
+    def factory() -> FakePipeline:
+        started.append(True)
+        return FakePipeline()
+
+    resumed = EvaluationRunner(tmp_path, "test", factory)
+    outputs = asyncio.run(resumed.generate(cases))
+
+    assert len(started) == 1
+    assert len(outputs) == 15
+
+
+def test_rate_limiter_spaces_requests():
+    """Requests beyond the burst wait for refilled tokens."""
+    now = [0.0]
+
+    async def sleep(seconds: float) -> None:
+        now[0] += seconds
+
+    async def acquire_all() -> None:
+        limiter = RateLimiter(rate=2.0, burst=2.0, clock=lambda: now[0], sleep=sleep)
+        for _ in range(6):
+            await limiter.acquire()
+
+    asyncio.run(acquire_all())
+    assert now[0] == 2.0
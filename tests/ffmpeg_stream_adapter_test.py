@@ -0,0 +1,20 @@
+import os
+
+from campus_plan_bot.streamadapter.ffmpeg_stream_adapter import FfmpegStream
+
+
+def test_bytes_are_piped_unless_the_container_needs_seeking():
+    stream = FfmpegStream(volume=1.0, repeat_input=False)
+
+    stream.set_input(b"OggS\x00\x02" + bytes(32))
+    assert stream.url == "pipe:0"
+
+    mp4 = b"\x00\x00\x00\x1cftypM4A " + bytes(32)
+    stream.set_input(mp4)
+    assert stream.url != "pipe:0"
+    with open(stream.url, "rb") as file:
+        assert file.read() == mp4
+
+    path = stream.url
+    stream.cleanup()
+    assert not os.path.exists(path)
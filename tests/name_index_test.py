@@ -0,0 +1,21 @@
+from campus_plan_bot.name_index import NameIndex, cologne_phonetics
+
+
+def test_cologne_phonetics():
+    assert cologne_phonetics("Müller-Lüdenscheidt") == "65752682"
+    assert cologne_phonetics("Maier") == cologne_phonetics("Meyer") == "67"
+    assert cologne_phonetics("Cafeteria") == cologne_phonetics("Kaffeteria")
+
+
+def test_search_tolerates_asr_errors():
+    index = NameIndex(
+        [
+            ("01.12", "Cafeteria"),
+            ("Audimax", "Audimax"),
+            ("30.10", "Hörsaal 101"),
+            ("10.11", "Hörsaal am Fasanengarten"),
+        ]
+    )
+    assert index.search("Kennst dud ie Cafeteria?", 1) == [("01.12", 1.0)]
+    assert index.search("Wo ist das Audi Max?", 1, min_score=0.9)[0][0] == "Audimax"
+    assert index.search("Wo ist der Hörsaal?", min_score=0.9) == []
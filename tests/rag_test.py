@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from campus_plan_bot.cache import LRUCache
+from campus_plan_bot.interfaces.interfaces import RetrievedDocument
+from campus_plan_bot.rag import RAG
+
+
+def test_result_cache_is_invalidated_by_new_data_and_settings():
+    database = pd.DataFrame({"identifikator": ["50.34", "30.41"], "name": ["", ""]})
+    rag = RAG(index=None, database=database, result_cache=LRUCache(8))  # type: ignore[arg-type]
+    calls = []
+
+    def retrieve(query, limit, asr_fixed_query):
+        calls.append(query)
+        return [RetrievedDocument(id="50.34", data={}, relevance_score=1.0)]
+
+    rag._retrieve_context = retrieve  # type: ignore[method-assign]
+
+    first = rag.retrieve_context("Gebäude 50.34")
+    first[0].data = {"picked": True}
+    second = rag.retrieve_context("Gebäude 50.34")
+    assert calls == ["Gebäude 50.34"]
+    assert second[0].data == {}
+
+    version = rag.data_version
+    rag.database = database.assign(name=["Informatik", "Mensa"])
+    assert rag.data_version != version
+    rag.retrieve_context("Gebäude 50.34")
+    assert len(calls) == 2
+
+    rag.hybrid = False
+    rag.retrieve_context("Gebäude 50.34")
+    rag.decisive_margin += 0.1
+    rag.retrieve_context("Gebäude 50.34")
+    assert len(calls) == 4
+
+
+def test_resolves_locally():
+    database = pd.DataFrame(
+        {"identifikator": ["50.34", "01.12", "Audimax"], "name": ["", "Cafeteria", ""]}
+    )
+    rag = RAG(index=None, database=database)  # type: ignore[arg-type]
+
+    assert rag.resolves_locally("Wo ist Gebäude 50.34?")
+    assert not rag.resolves_locally("Wo ist Gebäude 50.34 oder 800-3?")
+    # numbers without building context and fuzzy names go through the LLM
+    assert not rag.resolves_locally("Wo ist 50.34?")
+    assert rag.resolves_locally("Kennst dud ie Cafeteria?")
+    assert not rag.resolves_locally("Kennst du die Kafeteria?")
+    assert not rag.resolves_locally("Wo kann ich essen?")
+    assert [doc.id for doc in rag._retrieve_by_name("Wo ist das Audimax?", set())] == [
+        "Audimax"
+    ]
+
+
+class LengthReranker:
+    """Scores documents by their length and counts the scored pairs."""
+
+    def __init__(self):
+        self.pairs = 0
+
+    def predict(self, pairs):
+        self.pairs += len(pairs)
+        return [len(document) for _, document in pairs]
+
+
+def node(content: str, score: float) -> SimpleNamespace:
+    return SimpleNamespace(
+        node=SimpleNamespace(node_id=content),
+        score=score,
+        get_content=lambda: content,
+    )
+
+
+def test_adaptive_rerank_stops_when_the_best_are_stable():
+    reranker = LengthReranker()
+    rag = RAG(index=None, database=pd.DataFrame({"identifikator": [], "name": []}), reranker=reranker)  # type: ignore[arg-type]
+    nodes = [node("x" * length, 0.5) for length in (9, 8, 7, 6, 5, 4, 3, 2, 1, 10)]
+
+    reranked = rag._rerank_adaptively("query", nodes, nodes, limit=3)
+    assert reranker.pairs == 5
+    assert [len(n.get_content()) for n, _ in reranked[:3]] == [9, 8, 7]
+    assert [score for _, score in reranked[5:]] == [None] * 5
+
+    decisive = [node("best", 0.9), *nodes]
+    reranked = rag._rerank_adaptively("query", decisive, decisive, limit=3)
+    assert reranker.pairs == 5
+    assert reranked[0][0] is decisive[0]
+
+
+def test_unscored_documents_are_scored_on_one_scale():
+    rag = RAG(index=None, database=pd.DataFrame({"identifikator": [], "name": []}), reranker=LengthReranker())  # type: ignore[arg-type]
+    dense = [node("best", 0.9), node("second", 0.7)]
+    lexical = node("lexical", 12.0)
+    rag._embed_query = lambda query: []  # type: ignore[method-assign]
+    rag._vector_search = lambda query, embedding, top_k: dense  # type: ignore[method-assign]
+    rag._lexical_search = lambda query, top_k: [lexical]  # type: ignore[method-assign]
+    # fused nodes carry rank fusion scores
+    fused = [node(n.get_content(), 0.03) for n in (*dense, lexical)]
+    for candidate in fused:
+        candidate.metadata = {"identifikator": candidate.get_content()}
+    rag._fuse = lambda *rankings: fused  # type: ignore[method-assign]
+
+    documents = rag._retrieve_by_similarity("query", set())
+    assert rag.rerank_stats.skipped == 1
+    assert [(doc.id, doc.relevance_score) for doc in documents] == [
+        ("best", 0.9),
+        ("second", 0.7),
+        ("lexical", 0.0),
+    ]
+
+    # the scored candidates are all parts of one document, the rest is unscored
+    rag.decisive_margin = 0.5
+    candidates = [node("x" * length, 0.5) for length in (4, 3, 2, 1, 9)]
+    for candidate in candidates:
+        candidate.metadata = {
+            "identifikator": "B" if len(candidate.get_content()) == 9 else "A"
+        }
+    rag._fuse = lambda *rankings: candidates  # type: ignore[method-assign]
+    documents = rag._retrieve_by_similarity("query", set(), limit=2)
+    assert [(doc.id, doc.relevance_score) for doc in documents] == [
+        ("A", 4.0),
+        ("B", 1.0),
+    ]
+
+
+def test_pair_scores_are_cached():
+    reranker = LengthReranker()
+    rag = RAG(
+        index=None,  # type: ignore[arg-type]
+        database=pd.DataFrame({"identifikator": [], "name": []}),
+        reranker=reranker,
+        pair_score_cache=LRUCache(8),
+    )
+    nodes = [node("x" * length, 0.5) for length in (1, 3, 2)]
+
+    assert [score for _, score in rag._rerank("query", nodes)] == [3, 2, 1]
+    rag._rerank("query", [*nodes, node("xxxx", 0.5)])
+    assert reranker.pairs == 4
+    rag._rerank("other query", nodes)
+    assert reranker.pairs == 7
+
+
+def test_onnx_backends_only_apply_to_the_reranker():
+    with pytest.raises(ValueError, match="only runs on torch"):
+        RAG.load_embed_model("onnx-int8")
@@ -0,0 +1,59 @@
+from campus_plan_bot.streamadapter.rate_control import (
+    FRAME_BYTES,
+    FileRatePolicy,
+    LiveRatePolicy,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_file_policy_follows_throughput():
+    """File uploads are sized to take about target_latency seconds."""
+    policy = FileRatePolicy(target_latency=1.0, initial_frames=167)
+    policy.start(bytes_per_second=32000)
+    assert policy.next_chunk_size() == 167 * FRAME_BYTES
+
+    # a fast link allows larger chunks
+    policy.on_ack(100 * FRAME_BYTES, latency=0.1)
+    assert policy.next_chunk_size() == 1000 * FRAME_BYTES
+
+    # a slow link shrinks them again, but never below min_frames
+    for _ in range(20):
+        policy.on_ack(10 * FRAME_BYTES, latency=10.0)
+    assert policy.next_chunk_size() == policy.min_frames * FRAME_BYTES
+
+
+def test_live_policy_paces_to_wall_clock():
+    """Live streams wait for audio to arrive instead of reading ahead."""
+    clock = FakeClock()
+    policy = LiveRatePolicy(clock=clock, sleep=clock.sleep)
+    policy.start(bytes_per_second=32000)
+
+    size = policy.next_chunk_size()
+    assert size == FRAME_BYTES
+    assert clock.now == FRAME_BYTES / 32000
+    policy.on_chunk(size)
+
+
+def test_live_policy_sends_backlog_after_slow_ack():
+    """Audio that accumulated during a slow upload is sent in one chunk."""
+    clock = FakeClock()
+    policy = LiveRatePolicy(clock=clock, sleep=clock.sleep)
+    policy.start(bytes_per_second=32000)
+
+    policy.on_chunk(policy.next_chunk_size())
+    clock.now += 0.6
+    policy.on_ack(FRAME_BYTES, latency=0.6)
+
+    size = policy.next_chunk_size()
+    assert size >= 10 * FRAME_BYTES
+    assert size <= policy.max_frames * FRAME_BYTES
@@ -0,0 +1,83 @@
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.session_store import (
+    InMemorySessionStore,
+    SQLiteSessionStore,
+    StoredSession,
+)
+from campus_plan_bot.interfaces.interfaces import Role
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemorySessionStore(max_sessions=3)
+    return SQLiteSessionStore(tmp_path / "sessions.db", max_sessions=3)
+
+
+def test_session_store_roundtrip_and_expiry(store):
+    now = datetime.now(timezone.utc)
+    active = StoredSession(config={"temperature": 0.05}, last_used=now)
+    active.conversation.add_message_from_content("Wo ist die Mensa?", Role.USER)
+    idle = StoredSession(config={}, last_used=now - timedelta(hours=2))
+    store.put("idle", idle)
+    store.put("active", active)
+
+    assert store.get("active") == active
+    assert store.get("missing") is None
+    assert store.oldest_use() == idle.last_used
+    assert store.expire(now - timedelta(hours=1)) == ["idle"]
+    assert len(store) == 1
+
+    assert store.delete("active")
+    assert not store.delete("active")
+    assert len(store) == 0
+
+
+def test_session_store_evicts_least_recently_used(store):
+    start = datetime.now(timezone.utc)
+    for minute in range(3):
+        store.put(str(minute), StoredSession(config={}, last_used=start))
+        start += timedelta(minutes=1)
+
+    # touching a session protects it from eviction
+    session = store.get("0")
+    session.last_used = start
+    assert store.put("0", session) == []
+    assert store.put("3", StoredSession(config={}, last_used=start)) == ["1"]
+    assert len(store) == 3 and store.get("1") is None
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    """A session written by one worker can be continued by another."""
+    first = SQLiteSessionStore(tmp_path / "sessions.db")
+    second = SQLiteSessionStore(tmp_path / "sessions.db")
+
+    session = StoredSession(config={"model_name": "Llama3.1-8B"})
+    first.put("abc", session)
+    continued = second.get("abc")
+    continued.conversation.add_message_from_content("Danke!", Role.USER)
+    second.put("abc", continued)
+
+    assert first.get("abc").conversation.messages[-1].content == "Danke!"
+
+
+def test_session_times_are_stored_in_utc(tmp_path):
+    store = SQLiteSessionStore(tmp_path / "sessions.db")
+    now = datetime.now(timezone.utc)
+    # an hour ago, but later on the clock of this timezone
+    earlier = (now - timedelta(hours=1)).astimezone(timezone(timedelta(hours=2)))
+    store.put("earlier", StoredSession(config={}, last_used=earlier))
+    store.put("now", StoredSession(config={}, last_used=now))
+
+    assert store.oldest_use() == earlier
+    assert store.expire(now - timedelta(minutes=30)) == ["earlier"]
+    # sessions serialized with naive UTC times are still readable
+    data = json.loads(zlib.decompress(StoredSession(config={}).to_bytes()))
+    data["last_used"] = "2025-01-01T12:00:00"
+    legacy = StoredSession.from_bytes(zlib.compress(json.dumps(data).encode()))
+    assert legacy.last_used == datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
@@ -0,0 +1,51 @@
+import pytest
+
+from campus_plan_bot.spoken_numbers import normalize_numbers, parse_number
+
+BUILDING_NUMBERS = {"01.12", "50.34"}
+
+
+@pytest.mark.parametrize(
+    "word, number",
+    [
+        ("vierunddreißig", 34),
+        ("vierunddreissig", 34),
+        ("neunhundertfünfzehn", 915),
+        ("zweihundertneunddreißig", 239),
+        ("hunderteins", 101),
+        ("ein", None),
+        ("Jahrhundert", None),
+    ],
+)
+def test_parse_number(word, number):
+    assert parse_number(word) == number
+
+
+@pytest.mark.parametrize(
+    "transcript, normalized",
+    [
+        ("Gebäude fünfzig Punkt vierunddreißig?", "Gebäude 50.34?"),
+        ("Gebäude zehn Komma elf", "Gebäude 10.11"),
+        ("Gebäude neunhundert eins", "Gebäude 901"),
+        ("Gebäude achthundert und drei.", "Gebäude 803."),
+        ("Gebäude sieben, vier, eins?", "Gebäude 741?"),
+        ("Wo finde ich null eins zwölf?", "Wo finde ich 01.12?"),
+        ("Gebäude zehn fünfzig", "Gebäude 10.50"),
+        ("Gebäude 20, 54", "Gebäude 20.54"),
+        ("Gebäude 9.600 und 7", "Gebäude 9607"),
+        ("Gebäude Dreißigsechzig", "Gebäude 30.60"),
+        ("Gebäude 40.40 und 303", "Gebäude 40.40 und 303"),
+        ("Ein Gebäude mit acht Etagen", "Ein Gebäude mit 8 Etagen"),
+        # split numbers outside of building context stay apart
+        ("Die Mensa hat von 10-14 Uhr offen?", "Die Mensa hat von 10-14 Uhr offen?"),
+        ("Hörsaal für zwanzig dreißig Leute", "Hörsaal für 20 30 Leute"),
+        ("Um 11 30 bei Gebäude 50.34", "Um 11 30 bei Gebäude 50.34"),
+        ("Raum 1.000", "Raum 1.000"),
+        ("Noch zwei Komma fünf Kilometer", "Noch 2 Komma 5 Kilometer"),
+        ("Wo ist fünfzig Punkt vierunddreißig?", "Wo ist 50.34?"),
+        ("Raum eins null eins", "Raum 1 0 1"),
+        ("Gebäude eins null eins", "Gebäude 101"),
+    ],
+)
+def test_normalize_numbers(transcript, normalized):
+    assert normalize_numbers(transcript, BUILDING_NUMBERS) == normalized
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import time
+
+from campus_plan_bot import tracing
+
+
+def test_spans_nest_across_tasks_and_link_to_session():
+    finished: list[tracing.Span] = []
+    tracing.add_span_listener(finished.append)
+
+    async def stage() -> None:
+        with tracing.span("child"):
+            await asyncio.sleep(0)
+
+    async def turn() -> None:
+        with tracing.session("abc"), tracing.span("root", {"fix_asr": True}):
+            await asyncio.create_task(stage())
+            tracing.set_attributes({"speculation.hit": False})
+
+    try:
+        asyncio.run(turn())
+    finally:
+        tracing.remove_span_listener(finished.append)
+
+    child, root = finished
+    assert child.parent_id == root.span_id and child.trace_id == root.trace_id
+    assert root.parent_id is None and tracing.current_span() is None
+    assert child.attributes["session.id"] == root.attributes["session.id"] == "abc"
+    assert root.attributes == {
+        "fix_asr": True,
+        "session.id": "abc",
+        "speculation.hit": False,
+    }
+
+
+def test_jsonl_exporter_records_errors(tmp_path):
+    exporter = tracing.JsonlFileExporter(tmp_path / "traces.jsonl")
+    tracing.add_span_listener(exporter)
+    try:
+        with tracing.span("failing"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    finally:
+        tracing.remove_span_listener(exporter)
+
+    (line,) = (tmp_path / "traces.jsonl").read_text().splitlines()
+    (span,) = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert span["name"] == "failing"
+    assert span["status"] == {"code": 2, "message": "ValueError: boom"}
+
+
+def test_durations_ignore_wall_clock_jumps(monkeypatch):
+    # the wall clock is set back by an hour while the span is open
+    wall_clock = iter([2 * 3600 * 10**9, 3600 * 10**9])
+    monkeypatch.setattr(tracing.time, "time_ns", lambda: next(wall_clock))
+
+    with tracing.span("timed") as span:
+        time.sleep(0.01)
+        tracing.time.time_ns()
+
+    assert 0.01 <= span.duration < 1
+    assert span.end_ns == span.start_ns + round(span.duration * 1e9)
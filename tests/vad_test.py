@@ -0,0 +1,78 @@
+from typing import Any
+
+import numpy as np
+
+from campus_plan_bot.streamadapter.input_stream_adapter import BaseAdapter
+from campus_plan_bot.streamadapter.vad import EnergyVAD, VadStream
+
+RATE = 16000
+
+
+def tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (0.001 * rng.standard_normal(int(seconds * RATE))).astype(np.float32)
+
+
+def to_pcm(samples: np.ndarray) -> bytes:
+    return (samples * 32767).astype("<i2").tobytes()
+
+
+class ListAdapter(BaseAdapter):
+    def __init__(self, pcm: bytes, chunk_size: int = 3200) -> None:
+        super().__init__(format=None)
+        self.chunks = [pcm[i : i + chunk_size] for i in range(0, len(pcm), chunk_size)]
+
+    def get_stream(self, **kwargs) -> Any:
+        return None
+
+    def read(self) -> bytes:
+        return self.chunks.pop(0) if self.chunks else b""
+
+    def cleanup(self) -> None:
+        pass
+
+    def set_input(self, input: Any) -> None:
+        pass
+
+
+def test_segments_find_speech_between_silence():
+    """Two utterances separated by a long pause are found separately."""
+    audio = np.concatenate(
+        [silence(1.0), tone(0.5), silence(1.0), tone(0.5), silence(1.0)]
+    )
+    segments = EnergyVAD().segments(audio)
+
+    assert len(segments) == 2
+    assert abs(segments[0].start - 0.85) < 0.1
+    assert abs(segments[1].end - 3.15) < 0.1
+
+
+def test_split_respects_max_length():
+    """Long recordings are split at pauses into chunks of limited
+    length."""
+    audio = np.concatenate([tone(2.0), silence(1.0), tone(2.0), silence(1.0)])
+    chunks = EnergyVAD().split(audio, max_seconds=3.0)
+
+    assert len(chunks) == 2
+    assert all(chunk.duration <= 3.0 for chunk in chunks)
+
+
+def test_stream_trims_silence_and_detects_end_of_utterance():
+    """The stream drops silence and ends after the utterance."""
+    audio = np.concatenate(
+        [silence(1.0), tone(0.5), silence(2.0), tone(0.5), silence(1.0)]
+    )
+    stream = VadStream(ListAdapter(to_pcm(audio)), end_of_utterance=1.0)
+
+    output = b""
+    while chunk := stream.read():
+        output += chunk
+
+    seconds = len(output) / 2 / RATE
+    assert 0.5 <= seconds < 1.0
+    assert len(stream.segments) == 1
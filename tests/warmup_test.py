@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from campus_plan_bot.warmup import BackgroundLoader
+
+
+def test_background_loader_reports_progress():
+    release = threading.Event()
+
+    def load(progress):
+        progress("index")
+        progress("warm-up")
+        release.wait()
+        return "rag"
+
+    loader = BackgroundLoader("RAG", load).start()
+    assert not loader.ready
+    with pytest.raises(TimeoutError):
+        loader.result(timeout=0.01)
+
+    release.set()
+    assert loader.result(timeout=5) == "rag"
+    status = loader.status()
+    assert status["ready"] and status["error"] is None
+    assert list(status["completed"]) == ["index", "warm-up"]
+
+
+def test_background_loader_propagates_errors():
+    def load(progress):
+        progress("index")
+        raise FileNotFoundError("embeddings")
+
+    loader = BackgroundLoader("RAG", load)
+    with pytest.raises(RuntimeError):
+        loader.result(timeout=5)
+    assert not loader.ready and "embeddings" in loader.status()["error"]
+
+
+def test_retrieval_modules_import_without_models():
+    """The heavy model libraries are only imported once a RAG is built."""
+    code = (
+        "import sys, campus_plan_bot.rag, campus_plan_bot.pandas_query_engine;"
+        "heavy = {'torch', 'transformers', 'sentence_transformers', 'llama_index'};"
+        "sys.exit(len(heavy & set(sys.modules)))"
+    )
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0